@@ -0,0 +1,421 @@
+"""
+Article fetching utilities for the Fake News Detector
+Contains the optional evidence stage that fetches the full text of the top
+search results over a pooled HTTP client, strips page boilerplate, and keeps
+the extracted text in a disk cache keyed on the canonical URL
+"""
+
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from dedup_utils import canonicalize_url
+from deadline_utils import Deadline
+from traffic_utils import recorded_provider
+
+logger = logging.getLogger(__name__)
+
+# Article fetch configuration
+FETCH_ARTICLES = os.getenv("FETCH_ARTICLES", "false").lower() in ("1", "true", "yes")
+ARTICLE_FETCH_TOP_N = int(os.getenv("ARTICLE_FETCH_TOP_N", "3"))
+ARTICLE_FETCH_TIMEOUT_SECONDS = float(os.getenv("ARTICLE_FETCH_TIMEOUT_SECONDS", "4"))
+ARTICLE_MAX_BYTES = int(os.getenv("ARTICLE_MAX_BYTES", str(1024 * 1024)))
+ARTICLE_MAX_CHARS = int(os.getenv("ARTICLE_MAX_CHARS", "6000"))
+ARTICLE_MAX_CONNECTIONS = int(os.getenv("ARTICLE_MAX_CONNECTIONS", "20"))
+ARTICLE_MAX_PER_HOST = int(os.getenv("ARTICLE_MAX_PER_HOST", "2"))
+ARTICLE_CACHE_DIR = os.getenv("ARTICLE_CACHE_DIR", "./article_cache")
+ARTICLE_CACHE_TTL_SECONDS = float(os.getenv("ARTICLE_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+ARTICLE_CACHE_MAX_ENTRIES = int(os.getenv("ARTICLE_CACHE_MAX_ENTRIES", "5000"))
+ARTICLE_ALLOW_PRIVATE_HOSTS = os.getenv("ARTICLE_ALLOW_PRIVATE_HOSTS", "false").lower() in ("1", "true", "yes")  # Only for local testing
+
+ARTICLE_USER_AGENT = "Mozilla/5.0 (compatible; FakeNewsDetector/1.0; +evidence-fetcher)"
+ARTICLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+ARTICLE_CACHE_PRUNE_EVERY = 100  # Stores between two prunes of the disk cache
+
+# Boilerplate stripping: elements never holding article text, and class/id hints of page furniture
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "aside", "form", "button", "select"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "td", "tr", "table", "br", "figcaption"}
+BOILERPLATE_CONTAINERS = {"div", "section", "ul", "ol", "span", "p"}
+BOILERPLATE_HINTS = re.compile(r"cookie|consent|newsletter|subscribe|share|social|related|recommend|comment|advert|promo|sponsor|breadcrumb|menu|sidebar|popup|modal", re.IGNORECASE)
+MIN_BLOCK_WORDS = 8
+MAX_LINK_DENSITY = 0.5
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class _ArticleTextParser(HTMLParser):
+    """
+    Collects text blocks outside page furniture, with the share of each block's text inside links
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._text = []
+        self._link_chars = 0
+        self._in_link = 0
+        self._skip_tag = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        hints = " ".join(value or "" for name, value in attrs if name in ("class", "id", "role"))
+        if tag in SKIPPED_TAGS or (tag in BOILERPLATE_CONTAINERS and hints and BOILERPLATE_HINTS.search(hints)):
+            self._flush()
+            self._skip_tag, self._skip_depth = tag, 1
+            return
+        if tag == "a":
+            self._in_link += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag == "a":
+            self._in_link = max(0, self._in_link - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_tag:
+            return
+        self._text.append(data)
+        if self._in_link:
+            self._link_chars += len(data.strip())
+
+    def _flush(self):
+        text = WHITESPACE_PATTERN.sub(" ", "".join(self._text)).strip()
+        if text:
+            self.blocks.append((text, self._link_chars / len(text)))
+        self._text = []
+        self._link_chars = 0
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_article_text(html: str, max_chars: int = ARTICLE_MAX_CHARS) -> str:
+    """
+    Strip navigation, scripts, link lists and other page furniture from an HTML page
+
+    Args:
+        html (str): Page HTML
+        max_chars (int): Maximum characters of text to keep
+
+    Returns:
+        str: Article paragraphs separated by newlines (empty if none were found)
+    """
+    parser = _ArticleTextParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        logger.debug("HTML parsing stopped early: %s", e)
+
+    paragraphs = []
+    seen = set()
+    length = 0
+    for text, link_density in parser.blocks:
+        if len(text.split()) < MIN_BLOCK_WORDS or link_density > MAX_LINK_DENSITY or text in seen:
+            continue
+        seen.add(text)
+        paragraphs.append(text)
+        length += len(text) + 1
+        if length >= max_chars:
+            break
+    return "\n".join(paragraphs)[:max_chars]
+
+
+class ArticleCache:
+    """
+    Disk cache of extracted article text keyed on the canonical URL, with the
+    validators (ETag, Last-Modified) needed to revalidate stale entries
+    """
+
+    def __init__(self, directory: str = ARTICLE_CACHE_DIR, max_entries: int = ARTICLE_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._stores = 0
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(canonicalize_url(url).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, entry: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self._stores += 1
+        if self._stores % ARTICLE_CACHE_PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """
+        Delete the least recently stored entries beyond max_entries
+        """
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def is_public_address(address: str) -> bool:
+    """
+    Whether an IP address is routable on the public internet (not private, loopback,
+    link-local such as cloud metadata endpoints, multicast or reserved)
+    """
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_host(host: str):
+    """
+    Reject a host that is or resolves to a non-public address, so search results
+    (and their redirects) cannot make the server fetch internal endpoints
+
+    Raises:
+        ValueError: If the host is missing, unresolvable or not public
+    """
+    if not host:
+        raise ValueError("missing host")
+    try:
+        addresses = [str(ipaddress.ip_address(host.strip("[]")))]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+        except OSError as e:
+            raise ValueError(f"cannot resolve host {host}: {e}")
+        addresses = [info[4][0] for info in infos]
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        raise ValueError(f"refusing to fetch non-public host {host}")
+
+
+class ArticleFetcher:
+    """
+    Fetches result pages concurrently over one pooled httpx.AsyncClient, with a
+    per-host concurrency limit and byte and time caps per page. Every request,
+    including each redirect hop, is checked against non-public hosts.
+    """
+
+    def __init__(self,
+                 cache: Optional[ArticleCache] = None,
+                 max_connections: int = ARTICLE_MAX_CONNECTIONS,
+                 max_per_host: int = ARTICLE_MAX_PER_HOST,
+                 max_bytes: int = ARTICLE_MAX_BYTES,
+                 timeout_seconds: float = ARTICLE_FETCH_TIMEOUT_SECONDS,
+                 ttl_seconds: float = ARTICLE_CACHE_TTL_SECONDS,
+                 allow_private_hosts: bool = ARTICLE_ALLOW_PRIVATE_HOSTS):
+        """
+        Args:
+            cache (ArticleCache): Disk cache of extracted text (None disables caching)
+            max_connections (int): Size of the shared connection pool
+            max_per_host (int): Concurrent fetches allowed against one host
+            max_bytes (int): Bytes read per page before the download is cut off
+            timeout_seconds (float): Time allowed per page
+            ttl_seconds (float): Age below which a cached page is used without revalidation
+            allow_private_hosts (bool): Allow private, loopback and link-local hosts (local testing only)
+        """
+        self.cache = cache
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.max_bytes = max_bytes
+        self.timeout_seconds = timeout_seconds
+        self.ttl_seconds = ttl_seconds
+        self.allow_private_hosts = allow_private_hosts
+        self._client = None
+        # Only hosts with a download running or queued have a semaphore; it is dropped when the last one leaves
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._host_users: Dict[str, int] = {}
+        self.counts = {"requests": 0, "cache_hits": 0, "revalidated": 0, "fetched": 0, "failures": 0, "truncated": 0, "bytes": 0}
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                timeout=httpx.Timeout(self.timeout_seconds),
+                follow_redirects=True,
+                # Runs before the first request and before every redirect hop
+                event_hooks={"request": [self._check_request]},
+                headers={"User-Agent": ARTICLE_USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8"}
+            )
+        return self._client
+
+    async def _check_request(self, request):
+        if not self.allow_private_hosts:
+            await check_public_host(request.url.host)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """
+        Extracted text of one page, from the cache when fresh or still valid
+
+        Args:
+            url (str): Page URL
+            deadline (Deadline): Request deadline capping the time spent on the page (optional)
+
+        Returns:
+            Optional[str]: Article text, or None if the page could not be fetched
+        """
+        self.counts["requests"] += 1
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        if cached and time.time() - cached.get("fetched_at", 0) < self.ttl_seconds:
+            self.counts["cache_hits"] += 1
+            return cached["text"]
+
+        # The time cap covers waiting for a per-host slot as well as the download
+        timeout = self.timeout_seconds if deadline is None else min(self.timeout_seconds, deadline.remaining())
+        try:
+            return await asyncio.wait_for(self._download_with_host_slot(url, cached), timeout=max(0.0, timeout))
+        except Exception as e:
+            self.counts["failures"] += 1
+            logger.warning("Could not fetch article %s: %s", url, e or type(e).__name__)
+            return cached["text"] if cached else None
+
+    async def _download_with_host_slot(self, url: str, cached: Optional[dict]) -> Optional[str]:
+        host = (urlparse(url).hostname or "").lower()
+        semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        self._host_users[host] = self._host_users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                return await self._download(url, cached)
+        finally:
+            self._host_users[host] -= 1
+            if not self._host_users[host]:
+                del self._host_users[host]
+                del self._host_semaphores[host]
+
+    async def _download(self, url: str, cached: Optional[dict]) -> Optional[str]:
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                self.counts["revalidated"] += 1
+                cached["fetched_at"] = time.time()
+                await asyncio.to_thread(self.cache.put, url, cached)
+                return cached["text"]
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+            if content_type not in ARTICLE_CONTENT_TYPES:
+                raise ValueError(f"unsupported content type {content_type}")
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) >= self.max_bytes:
+                    self.counts["truncated"] += 1
+                    del body[self.max_bytes:]
+                    break
+            self.counts["bytes"] += len(body)
+            page = body.decode(response.encoding or "utf-8", errors="replace")
+
+        if content_type == "text/plain":
+            text = WHITESPACE_PATTERN.sub(" ", page).strip()[:ARTICLE_MAX_CHARS]
+        else:
+            text = await asyncio.to_thread(extract_article_text, page)
+        self.counts["fetched"] += 1
+        if self.cache:
+            entry = {
+                "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched_at": time.time(),
+                "text": text
+            }
+            await asyncio.to_thread(self.cache.put, url, entry)
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Fetcher statistics for the metrics endpoint
+        """
+        fetches = self.counts["requests"]
+        return dict(self.counts, cache_hit_rate=round((self.counts["cache_hits"] + self.counts["revalidated"]) / fetches, 4) if fetches else 0.0)
+
+
+# Shared fetcher of the API process (one connection pool for every request)
+article_fetcher = ArticleFetcher(cache=ArticleCache())
+
+
+@recorded_provider("article_fetch")
+async def fetch_articles(urls: List[str], deadline: Deadline = None) -> Dict[str, str]:
+    """
+    Fetch several pages concurrently
+
+    Returns:
+        Dict[str, str]: URL -> extracted text, for the pages that yielded any text
+    """
+    texts = await asyncio.gather(*(article_fetcher.fetch(url, deadline) for url in urls))
+    return {url: text for url, text in zip(urls, texts) if text}
+
+
+async def attach_article_texts(search_results: list, deadline: Deadline = None, top_n: int = ARTICLE_FETCH_TOP_N) -> list:
+    """
+    Add the full page text of the top search results as a "content" field, for
+    select_evidence to pick the sentences most relevant to the claim from
+
+    Args:
+        search_results (list): Search results from search_web
+        deadline (Deadline): Deadline for the whole stage (optional)
+        top_n (int): Number of results to fetch
+
+    Returns:
+        list: Copies of the search results, with "content" where a page was fetched
+    """
+    urls = []
+    for result in search_results:
+        url = result.get("url", "")
+        if url.startswith(("http://", "https://")) and url not in urls:
+            urls.append(url)
+        if len(urls) >= top_n:
+            break
+    if not urls:
+        return search_results
+
+    texts = await fetch_articles(urls, deadline=deadline)
+    logger.info("Fetched full text for %s of %s top results", len(texts), len(urls))
+    return [dict(result, content=texts[result["url"]]) if result.get("url") in texts else result for result in search_results]
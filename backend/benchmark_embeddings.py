@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for embedding backends
+Measures cold start, latency and peak memory per backend (each in its own
+process) and checks similarity parity against the embeddings already stored
+in claims_history, so SIMILARITY_THRESHOLD keeps its meaning.
+
+Usage:
+    python benchmark_embeddings.py
+    python benchmark_embeddings.py --backends torch onnx-int8 --chroma-path ./chroma_db_data
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+SAMPLE_CLAIMS = [
+    "The Earth orbits around the Sun",
+    "Water boils at 100 degrees Celsius at sea level",
+    "Apple is a technology company",
+    "Climate change is a hoax created by scientists",
+    "The Moon is made of cheese",
+    "Vaccines contain microchips",
+    "A cure for cancer will be discovered next year",
+    "Artificial intelligence will replace all jobs by 2030",
+    "The stock market closed up 3% today",
+    "Bitcoin price reached $50,000 this morning",
+    "Bitcoin hit 50000 dollars this morning",
+    "Shakespeare wrote Romeo and Juliet",
+]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_worker(backend: str, repeats: int, chroma_path: str, threshold: float):
+    """
+    Benchmark a single backend inside the current process and print a JSON report
+    """
+    start = time.perf_counter()
+    from embedding_backends import check_similarity_parity, create_embedding_function
+    embedding_function = create_embedding_function(backend)
+    embedding_function(["warm up"])
+    cold_start_seconds = time.perf_counter() - start
+
+    single_latencies = []
+    for i in range(repeats):
+        claim = SAMPLE_CLAIMS[i % len(SAMPLE_CLAIMS)]
+        started = time.perf_counter()
+        embedding_function([claim])
+        single_latencies.append((time.perf_counter() - started) * 1000.0)
+
+    batch_latencies = []
+    for _ in range(max(1, repeats // 10)):
+        started = time.perf_counter()
+        embedding_function(SAMPLE_CLAIMS * 3)
+        batch_latencies.append((time.perf_counter() - started) * 1000.0)
+
+    report = {
+        "backend": backend,
+        "cold_start_seconds": round(cold_start_seconds, 3),
+        "single_p50_ms": round(statistics.median(single_latencies), 2),
+        "single_p95_ms": round(percentile(single_latencies, 0.95), 2),
+        "batch36_p50_ms": round(statistics.median(batch_latencies), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+    # Parity against vectors already stored in the collection (computed by the torch backend)
+    if chroma_path and os.path.isdir(chroma_path):
+        import chromadb
+        collection = chromadb.PersistentClient(path=chroma_path).get_collection("claims_history")
+        stored = collection.get(limit=200, include=["documents", "embeddings"])
+        if stored["ids"]:
+            report["parity_vs_stored"] = check_similarity_parity(
+                embedding_function, stored["documents"], stored["embeddings"], threshold
+            )
+
+    # Raw embeddings of the sample claims, so the parent can compare backends directly
+    report["sample_embeddings"] = [[float(x) for x in e] for e in embedding_function(SAMPLE_CLAIMS)]
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--chroma-path", default=os.getenv("CHROMA_DB_PATH", "./chroma_db_data"))
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("SIMILARITY_THRESHOLD", "0.8")))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.repeats, args.chroma_path, args.threshold)
+        return
+
+    reports = []
+    for backend in args.backends:
+        print(f"Benchmarking backend: {backend}...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--repeats", str(args.repeats),
+             "--chroma-path", args.chroma_path, "--threshold", str(args.threshold)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            print(f"❌ Backend {backend} failed:\n{completed.stderr[-2000:]}", file=sys.stderr)
+            continue
+        reports.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    print("\nEmbedding Backend Benchmark")
+    print("=" * 90)
+    print(f"{'backend':<12}{'cold start s':>14}{'p50 ms':>10}{'p95 ms':>10}{'batch36 ms':>12}{'peak RSS MB':>14}")
+    for report in reports:
+        print(f"{report['backend']:<12}{report['cold_start_seconds']:>14}{report['single_p50_ms']:>10}"
+              f"{report['single_p95_ms']:>10}{report['batch36_p50_ms']:>12}{report['peak_rss_mb']:>14}")
+
+    print("\nSimilarity parity")
+    print("=" * 90)
+    reference = next((r for r in reports if r["backend"] == "torch"), None)
+    from embedding_backends import check_similarity_parity
+    for report in reports:
+        if "parity_vs_stored" in report:
+            print(f"{report['backend']:<12} vs stored collection: {report['parity_vs_stored']}")
+        if reference and report is not reference:
+            parity = check_similarity_parity(
+                lambda _: report["sample_embeddings"], SAMPLE_CLAIMS, reference["sample_embeddings"], args.threshold
+            )
+            status = "✅" if parity["threshold_decision_agreement"] == 1.0 else "⚠️ "
+            print(f"{status} {report['backend']:<10} vs torch sample claims: {parity}")
+
+
+if __name__ == "__main__":
+    main()
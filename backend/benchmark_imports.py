@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for import time
+Runs `python -X importtime` on the backend modules (each in a fresh process),
+so cold-start cost of workers can be tracked, and summarises the slowest
+top-level packages and the peak memory after import.
+
+Usage:
+    python benchmark_imports.py
+    python benchmark_imports.py --modules search_utils llm_utils main --top 15
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse `-X importtime` output into (package, self_us, cumulative_us, depth) rows
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, package = match.groups()
+            rows.append((package, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def summarise(rows: list, top: int) -> dict:
+    """
+    Total import time and the slowest top-level packages (self time of all their submodules)
+    """
+    by_package = defaultdict(int)
+    for package, self_us, _, _ in rows:
+        by_package[package.split(".")[0]] += self_us
+    slowest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(self_us for _, self_us, _, _ in rows) / 1000.0, 1),
+        "modules_imported": len(rows),
+        "slowest_packages_ms": {package: round(us / 1000.0, 1) for package, us in slowest}
+    }
+
+
+def measure_module(module: str, top: int) -> dict:
+    """
+    Import one module in a fresh interpreter with -X importtime and report the summary
+    """
+    code = f"import resource, json, {module}; print(json.dumps({{'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}}))"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    report = {"module": module, "ok": completed.returncode == 0}
+    report.update(summarise(parse_importtime(completed.stderr), top))
+    if completed.returncode == 0:
+        report["peak_rss_mb"] = round(json.loads(completed.stdout.strip().splitlines()[-1])["peak_rss_mb"], 1)
+    else:
+        report["error"] = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "unknown error"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend import time")
+    parser.add_argument("--modules", nargs="+", default=["search_utils", "llm_utils", "db_utils", "main"])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print the reports as JSON")
+    args = parser.parse_args()
+
+    reports = []
+    for module in args.modules:
+        print(f"Measuring import time of: {module}...", file=sys.stderr)
+        reports.append(measure_module(module, args.top))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    print("\nImport Time Benchmark")
+    print("=" * 70)
+    print(f"{'module':<16}{'import ms':>12}{'modules':>10}{'peak RSS MB':>14}")
+    for report in reports:
+        print(f"{report['module']:<16}{report['total_ms']:>12}{report['modules_imported']:>10}{report.get('peak_rss_mb', '-'):>14}")
+
+    for report in reports:
+        print(f"\nSlowest packages imported by {report['module']}")
+        print("-" * 70)
+        if not report["ok"]:
+            print(f"❌ Import failed: {report['error']}")
+        for package, ms in report["slowest_packages_ms"].items():
+            print(f"  {package:<40}{ms:>10} ms")
+
+
+if __name__ == "__main__":
+    main()
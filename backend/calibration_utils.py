@@ -0,0 +1,208 @@
+"""
+Similarity threshold calibration utilities for the Fake News Detector
+Contains the offline simulation of claim-history lookups over the stored
+claims, the hit-rate vs. inaccuracy curves it produces per claim category,
+and the loader for the recommended thresholds used at startup
+"""
+
+import json
+import logging
+import os
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from feedback_utils import get_feedback_status
+
+logger = logging.getLogger(__name__)
+
+# Calibration configuration
+SIMILARITY_THRESHOLDS_PATH = os.getenv("SIMILARITY_THRESHOLDS_PATH", "./similarity_thresholds.json")
+CALIBRATION_MAX_INACCURACY = float(os.getenv("CALIBRATION_MAX_INACCURACY", "0.05"))
+CALIBRATION_MIN_HITS = int(os.getenv("CALIBRATION_MIN_HITS", "20"))
+CALIBRATION_NEIGHBOURS = 5  # Neighbours fetched per sampled claim (before dropping itself and unusable matches)
+THRESHOLD_GRID = [round(0.5 + 0.01 * step, 2) for step in range(50)]  # 0.50 .. 0.99
+
+CATEGORIES = ("timeless", "time_dependent")
+
+
+def claim_category(info: Optional[dict]) -> str:
+    """
+    Category of a claim given its metadata or time dependency info
+    """
+    return "time_dependent" if info and info.get("is_time_dependent", False) else "timeless"
+
+
+def _parse_timestamp(metadata: dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(metadata.get("timestamp", ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_reusable_match(query_metadata: dict, neighbour_metadata: dict) -> bool:
+    """
+    Whether check_claim_history could have served the neighbour for the query claim:
+    timeless claims only match timeless claims, and time-dependent claims only match
+    time-dependent claims analyzed within the query's dependency duration
+    """
+    category = claim_category(query_metadata)
+    if claim_category(neighbour_metadata) != category:
+        return False
+    if category == "timeless":
+        return True
+    query_time, neighbour_time = _parse_timestamp(query_metadata), _parse_timestamp(neighbour_metadata)
+    if query_time is None or neighbour_time is None:
+        return False
+    duration_days = query_metadata.get("dependency_duration_days", 0) or 0
+    return abs((query_time - neighbour_time).total_seconds()) <= duration_days * 86400
+
+
+def is_wrong_reuse(query_metadata: dict, neighbour_metadata: dict) -> bool:
+    """
+    Whether serving the neighbour's verdict for the query claim would have been wrong:
+    the neighbour was voted inaccurate, or its verdict differs from the query claim's
+    own verdict (unless that verdict was itself voted inaccurate)
+    """
+    if get_feedback_status(neighbour_metadata) == "inaccurate":
+        return True
+    if get_feedback_status(query_metadata) == "inaccurate":
+        return False
+    return (query_metadata.get("verdict") or "").strip().lower() != (neighbour_metadata.get("verdict") or "").strip().lower()
+
+
+def sample_lookups(collection, sample_size: int = 2000, batch_size: int = 100, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Replay a claim-history lookup for a random sample of stored claims, leaving each claim out of its own lookup
+
+    Args:
+        collection: Partitioned claim store (PartitionedClaims)
+        sample_size (int): Number of stored claims to use as queries
+        batch_size (int): Claims queried per round trip
+        seed (int): Random seed for the sample
+
+    Returns:
+        List[Dict[str, Any]]: One entry per sampled claim with its category and, when a
+        reusable neighbour exists, the neighbour's similarity and whether reusing it would be wrong
+    """
+    all_ids = collection.get(include=[])["ids"]
+    sample_ids = random.Random(seed).sample(all_ids, min(sample_size, len(all_ids)))
+    lookups = []
+    for start in range(0, len(sample_ids), batch_size):
+        batch = collection.get(ids=sample_ids[start:start + batch_size], include=["embeddings", "metadatas"])
+        result = collection.query(
+            query_embeddings=[[float(value) for value in embedding] for embedding in batch["embeddings"]],
+            n_results=CALIBRATION_NEIGHBOURS + 1,
+            include=["metadatas", "distances"]
+        )
+        for q, claim_id in enumerate(batch["ids"]):
+            query_metadata = batch["metadatas"][q] or {}
+            lookup = {"category": claim_category(query_metadata), "similarity": None, "wrong": False}
+            # Neighbours come sorted by distance: the first reusable one is what check_claim_history would serve
+            for neighbour_id, distance, neighbour_metadata in zip(result["ids"][q], result["distances"][q], result["metadatas"][q]):
+                if neighbour_id == claim_id or not is_reusable_match(query_metadata, neighbour_metadata or {}):
+                    continue
+                lookup["similarity"] = 1.0 - distance
+                lookup["wrong"] = is_wrong_reuse(query_metadata, neighbour_metadata or {})
+                break
+            lookups.append(lookup)
+    return lookups
+
+
+def threshold_curve(lookups: List[Dict[str, Any]], thresholds: List[float] = THRESHOLD_GRID) -> List[Dict[str, Any]]:
+    """
+    Hit rate and inaccuracy (share of hits that reuse a wrong verdict) at each threshold
+    """
+    curve = []
+    for threshold in thresholds:
+        hits = [lookup for lookup in lookups if lookup["similarity"] is not None and lookup["similarity"] >= threshold]
+        wrong = sum(1 for lookup in hits if lookup["wrong"])
+        curve.append({
+            "threshold": threshold,
+            "hits": len(hits),
+            "hit_rate": round(len(hits) / len(lookups), 4) if lookups else 0.0,
+            "inaccuracy": round(wrong / len(hits), 4) if hits else 0.0
+        })
+    return curve
+
+
+def recommend_threshold(curve: List[Dict[str, Any]], max_inaccuracy: float = CALIBRATION_MAX_INACCURACY, min_hits: int = CALIBRATION_MIN_HITS) -> Optional[float]:
+    """
+    Lowest threshold (highest hit rate) whose inaccuracy, and that of every higher threshold
+    with enough hits to judge, stays within max_inaccuracy
+
+    Returns:
+        Optional[float]: Recommended threshold, or None if the sample has too few hits
+    """
+    recommended = None
+    for point in sorted(curve, key=lambda point: point["threshold"], reverse=True):
+        if point["hits"] < min_hits:
+            continue
+        if point["inaccuracy"] > max_inaccuracy:
+            break
+        recommended = point["threshold"]
+    return recommended
+
+
+def calibrate(collection, sample_size: int = 2000, max_inaccuracy: float = CALIBRATION_MAX_INACCURACY,
+              min_hits: int = CALIBRATION_MIN_HITS, default_threshold: float = 0.8, seed: int = 0) -> Dict[str, Any]:
+    """
+    Build per-category curves from the stored claims and recommend a threshold for each
+
+    Returns:
+        Dict[str, Any]: Report with the recommended "thresholds" (the part loaded at startup),
+        and per category the sample size, hit rate and inaccuracy at the recommendation and the full curve
+    """
+    lookups = sample_lookups(collection, sample_size, seed=seed)
+    report = {
+        "generated_at": datetime.utcnow().isoformat(),
+        "sample_size": len(lookups),
+        "max_inaccuracy": max_inaccuracy,
+        "thresholds": {},
+        "categories": {}
+    }
+    for category in CATEGORIES:
+        category_lookups = [lookup for lookup in lookups if lookup["category"] == category]
+        curve = threshold_curve(category_lookups)
+        recommended = recommend_threshold(curve, max_inaccuracy, min_hits)
+        threshold = recommended if recommended is not None else default_threshold
+        at_threshold = threshold_curve(category_lookups, [threshold])[0]
+        report["thresholds"][category] = threshold
+        report["categories"][category] = {
+            "queries": len(category_lookups),
+            "calibrated": recommended is not None,
+            "hit_rate": at_threshold["hit_rate"],
+            "inaccuracy": at_threshold["inaccuracy"],
+            "curve": curve
+        }
+    return report
+
+
+def load_similarity_thresholds(path: str = SIMILARITY_THRESHOLDS_PATH) -> Dict[str, float]:
+    """
+    Load the per-category thresholds written by `claims_cli.py calibrate`
+
+    Returns:
+        Dict[str, float]: Category -> threshold (empty if the file does not exist or is invalid)
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            thresholds = json.load(f).get("thresholds", {})
+        return {category: float(thresholds[category]) for category in CATEGORIES if category in thresholds}
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.error("Ignoring invalid similarity thresholds file %s: %s", path, e)
+        return {}
+
+
+# Calibrated thresholds of this deployment, loaded once at startup
+SIMILARITY_THRESHOLDS = load_similarity_thresholds()
+
+
+def similarity_threshold_for(time_dependency_info: Optional[dict], default: float, thresholds: Dict[str, float] = None) -> float:
+    """
+    Calibrated similarity threshold for the claim's category, or the default if none was calibrated
+    """
+    thresholds = SIMILARITY_THRESHOLDS if thresholds is None else thresholds
+    return thresholds.get(claim_category(time_dependency_info), default)
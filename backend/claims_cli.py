@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Claim history command line tool for the Fake News Detector
+Bulk-loads claims from fact-check datasets, exports the collection to a compact
+columnar snapshot and restores snapshots without re-embedding.
+
+Usage:
+    python claims_cli.py import dataset.jsonl --batch-size 256
+    python claims_cli.py import dataset.parquet --checkpoint dataset.checkpoint.json
+    python claims_cli.py export snapshot.npz
+    python claims_cli.py restore snapshot.npz
+    python claims_cli.py rekey --replay traffic.jsonl --dry-run
+    python claims_cli.py partition
+    python claims_cli.py calibrate --sample-size 2000 --max-inaccuracy 0.05
+
+Input records are JSON objects (or Parquet rows) with at least "claim_text" (or
+"claim") and "verdict"; "explanation", "timestamp", "source_links"/"search_results",
+"is_time_dependent" and "dependency_duration_days" are optional.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Set
+
+import numpy as np
+
+from db_utils import CHROMA_DB_PATH, CLAIMS_COLLECTION_NAME, build_claim_metadata, generate_claim_id, initialize_chromadb
+from embedding_backends import create_embedding_function
+from feedback_utils import get_feedback_counts
+from calibration_utils import CALIBRATION_MAX_INACCURACY, CALIBRATION_MIN_HITS, SIMILARITY_THRESHOLDS_PATH, calibrate
+from partition_utils import PartitionedClaims, is_expiring
+from logging_utils import configure_logging
+
+
+def open_collection(args):
+    """
+    Open the partitioned claim store directly, or through the claim store service when --store-url/--store-uds is given
+    """
+    if args.store_url or args.store_uds:
+        from store_client import RemoteEmbeddingFunction, StoreClient
+        store_client = StoreClient(base_url=args.store_url, uds_path=args.store_uds)
+        embedding_function = RemoteEmbeddingFunction(store_client)
+        return PartitionedClaims(store_client, embedding_function, CLAIMS_COLLECTION_NAME), embedding_function
+
+    embedding_function = create_embedding_function()
+    chroma_client, _ = initialize_chromadb(args.chroma_path, embedding_function)
+    return PartitionedClaims(chroma_client, embedding_function, CLAIMS_COLLECTION_NAME), embedding_function
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """
+    Stream records from a JSONL or Parquet file
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("❌ Reading Parquet requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=4096):
+            yield from batch.to_pylist()
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def record_to_entry(record: dict):
+    """
+    Convert a dataset record to (id, document, metadata), or None if it has no claim text
+    """
+    claim_text = (record.get("claim_text") or record.get("claim") or "").strip()
+    if not claim_text:
+        return None
+
+    search_results = record.get("search_results") or record.get("source_links") or []
+    if isinstance(search_results, str):
+        search_results = json.loads(search_results)
+
+    time_dependency_info = None
+    if "is_time_dependent" in record:
+        time_dependency_info = {
+            "is_time_dependent": bool(record.get("is_time_dependent")),
+            "dependency_duration_days": int(record.get("dependency_duration_days") or 0)
+        }
+
+    metadata = build_claim_metadata(
+        record.get("verdict", "Unknown"),
+        record.get("explanation", ""),
+        search_results,
+        time_dependency_info,
+        record.get("timestamp")
+    )
+    return generate_claim_id(claim_text), claim_text, metadata
+
+
+def load_checkpoint(path: str) -> int:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("records_done", 0)
+    return 0
+
+
+def save_checkpoint(path: str, source: str, records_done: int):
+    if not path:
+        return
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "records_done": records_done, "updated_at": time.time()}, f)
+    os.replace(temp_path, path)
+
+
+def upsert_chunk(collection, embedding_function, entries: List[tuple]):
+    """
+    Embed a chunk in one batch and upsert it (later duplicates of an id win)
+    """
+    unique = {claim_id: (document, metadata) for claim_id, document, metadata in entries}
+    ids = list(unique)
+    documents = [unique[claim_id][0] for claim_id in ids]
+    metadatas = [unique[claim_id][1] for claim_id in ids]
+    embeddings = embedding_function(documents)
+    collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+
+def command_import(args):
+    collection, embedding_function = open_collection(args)
+    checkpoint_path = args.checkpoint or args.path + ".checkpoint.json"
+    records_done = 0 if args.restart else load_checkpoint(checkpoint_path)
+    if records_done:
+        print(f"Resuming {args.path} after {records_done} records")
+
+    started = time.perf_counter()
+    imported = skipped = 0
+    chunk = []
+
+    def flush():
+        nonlocal imported
+        upsert_chunk(collection, embedding_function, chunk)
+        imported += len(chunk)
+        chunk.clear()
+        save_checkpoint(checkpoint_path, args.path, records_done)
+        elapsed = time.perf_counter() - started
+        print(f"  {records_done} records processed, {imported} imported, {skipped} skipped - {imported / max(elapsed, 1e-9):.1f} claims/s", flush=True)
+
+    for position, record in enumerate(read_records(args.path)):
+        if position < records_done:
+            continue
+        entry = record_to_entry(record)
+        records_done = position + 1
+        if entry is None:
+            skipped += 1
+            continue
+        chunk.append(entry)
+        if len(chunk) >= args.batch_size:
+            flush()
+
+    if chunk:
+        flush()
+    else:
+        save_checkpoint(checkpoint_path, args.path, records_done)
+
+    print(f"✅ Imported {imported} claims ({skipped} skipped) in {time.perf_counter() - started:.1f}s")
+
+
+def command_export(args):
+    collection, _ = open_collection(args)
+    ids, documents, metadatas, embeddings = [], [], [], []
+    started = time.perf_counter()
+
+    offset = 0
+    while True:
+        page = collection.get(limit=args.batch_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(json.dumps(metadata) for metadata in page["metadatas"])
+        embeddings.extend(page["embeddings"])
+        offset += len(page["ids"])
+        print(f"  exported {offset} claims", flush=True)
+
+    np.savez_compressed(
+        args.path,
+        ids=np.array(ids, dtype=str),
+        documents=np.array(documents, dtype=str),
+        metadatas=np.array(metadatas, dtype=str),
+        embeddings=np.asarray(embeddings, dtype=np.float32)
+    )
+    print(f"✅ Exported {len(ids)} claims to {args.path} in {time.perf_counter() - started:.1f}s")
+
+
+def command_restore(args):
+    collection, _ = open_collection(args)
+    snapshot = np.load(args.path)
+    ids, documents, metadatas, embeddings = snapshot["ids"], snapshot["documents"], snapshot["metadatas"], snapshot["embeddings"]
+    started = time.perf_counter()
+
+    for start in range(0, len(ids), args.batch_size):
+        end = start + args.batch_size
+        collection.upsert(
+            ids=ids[start:end].tolist(),
+            documents=documents[start:end].tolist(),
+            metadatas=[json.loads(metadata) for metadata in metadatas[start:end]],
+            embeddings=embeddings[start:end]
+        )
+        print(f"  restored {min(end, len(ids))}/{len(ids)} claims", flush=True)
+
+    print(f"✅ Restored {len(ids)} claims from {args.path} in {time.perf_counter() - started:.1f}s")
+
+
+def legacy_claim_id(claim_text: str) -> str:
+    """
+    Claim ID scheme used before normalize_claim_text (lowercased, stripped text)
+    """
+    return hashlib.md5(claim_text.lower().strip().encode("utf-8")).hexdigest()
+
+
+def replay_exact_hit_rate(claim_texts: Iterable[str], stored_ids: Set[str], id_function) -> float:
+    """
+    Replay claims in order against a set of stored IDs, adding every miss as the
+    pipeline would, and return the fraction answered by an exact ID match
+    """
+    known_ids = set(stored_ids)
+    hits = total = 0
+    for claim_text in claim_texts:
+        claim_id = id_function(claim_text)
+        total += 1
+        if claim_id in known_ids:
+            hits += 1
+        else:
+            known_ids.add(claim_id)
+    return hits / total if total else 0.0
+
+
+def merge_claim_entries(entries: List[dict]) -> dict:
+    """
+    Merge claims that share a canonical ID: keep the most recent analysis and sum their feedback votes
+    """
+    newest = max(entries, key=lambda entry: entry["metadata"].get("timestamp") or "")
+    metadata = dict(newest["metadata"])
+    for feedback_type in ("accurate", "inaccurate"):
+        votes = sum(get_feedback_counts(entry["metadata"])[feedback_type] for entry in entries)
+        if votes:
+            metadata[f"feedback_{feedback_type}"] = votes
+    return {"document": newest["document"], "embedding": newest["embedding"], "metadata": metadata}
+
+
+def command_rekey(args):
+    collection, _ = open_collection(args)
+    started = time.perf_counter()
+
+    # Plan: group stored claims by their canonical ID
+    groups: Dict[str, List[str]] = {}
+    offset = 0
+    while True:
+        page = collection.get(limit=args.batch_size, offset=offset, include=["documents"])
+        if not page["ids"]:
+            break
+        for claim_id, document in zip(page["ids"], page["documents"]):
+            groups.setdefault(generate_claim_id(document or ""), []).append(claim_id)
+        offset += len(page["ids"])
+    old_ids = {claim_id for claim_ids in groups.values() for claim_id in claim_ids}
+    changes = {new_id: claim_ids for new_id, claim_ids in groups.items() if claim_ids != [new_id]}
+    merged = sum(len(claim_ids) - 1 for claim_ids in changes.values())
+    print(f"{len(old_ids)} stored claims, {len(changes)} to re-key, {merged} duplicates to merge")
+
+    if args.replay:
+        claim_texts = [(record.get("claim_text") or record.get("claim") or "").strip() for record in read_records(args.replay)]
+        claim_texts = [claim_text for claim_text in claim_texts if claim_text]
+        before = replay_exact_hit_rate(claim_texts, old_ids, legacy_claim_id)
+        after = replay_exact_hit_rate(claim_texts, set(groups), generate_claim_id)
+        print(f"Replayed {len(claim_texts)} claims: exact-hit rate {before:.1%} -> {after:.1%} ({after - before:+.1%})")
+
+    if args.dry_run:
+        print("Dry run, no changes written")
+        return
+
+    pending = list(changes.items())
+    for start in range(0, len(pending), args.batch_size):
+        chunk = pending[start:start + args.batch_size]
+        fetch_ids = [claim_id for _, claim_ids in chunk for claim_id in claim_ids]
+        page = collection.get(ids=fetch_ids, include=["documents", "metadatas", "embeddings"])
+        entries = {
+            claim_id: {"document": document, "metadata": metadata or {}, "embedding": embedding}
+            for claim_id, document, metadata, embedding in zip(page["ids"], page["documents"], page["metadatas"], page["embeddings"])
+        }
+        new_ids, documents, metadatas, embeddings, stale_ids = [], [], [], [], []
+        for new_id, claim_ids in chunk:
+            merged_entry = merge_claim_entries([entries[claim_id] for claim_id in claim_ids if claim_id in entries])
+            new_ids.append(new_id)
+            documents.append(merged_entry["document"])
+            metadatas.append(merged_entry["metadata"])
+            embeddings.append(merged_entry["embedding"])
+            stale_ids.extend(claim_id for claim_id in claim_ids if claim_id != new_id)
+        # Write the new IDs before deleting the old ones so an interrupted run loses nothing
+        collection.upsert(ids=new_ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+        print(f"  re-keyed {min(start + args.batch_size, len(pending))}/{len(pending)} claims", flush=True)
+
+    print(f"✅ Re-keyed {len(pending)} claims in {time.perf_counter() - started:.1f}s")
+
+
+def command_partition(args):
+    store, _ = open_collection(args)
+    started = time.perf_counter()
+
+    # Move time-dependent claims stored before partitioning out of the permanent collection
+    candidate_ids = store.permanent.get(where={"is_time_dependent": True}, include=[])["ids"]
+    moved = 0
+    for start in range(0, len(candidate_ids), args.batch_size):
+        page = store.permanent.get(ids=candidate_ids[start:start + args.batch_size], include=["documents", "metadatas", "embeddings"])
+        indices = [i for i, metadata in enumerate(page["metadatas"]) if is_expiring(metadata)]
+        if indices:
+            store.upsert(
+                ids=[page["ids"][i] for i in indices],
+                documents=[page["documents"][i] for i in indices],
+                metadatas=[page["metadatas"][i] for i in indices],
+                embeddings=[page["embeddings"][i] for i in indices]
+            )
+            moved += len(indices)
+        print(f"  checked {min(start + args.batch_size, len(candidate_ids))}/{len(candidate_ids)} time-dependent claims", flush=True)
+
+    dropped = store.drop_expired()
+    print(f"✅ Moved {moved} claims to time buckets and dropped {len(dropped)} expired buckets in {time.perf_counter() - started:.1f}s")
+
+
+def command_calibrate(args):
+    """
+    Recommend per-category similarity thresholds from the stored claims and their feedback
+    """
+    store, _ = open_collection(args)
+    started = time.perf_counter()
+    report = calibrate(store, args.sample_size, args.max_inaccuracy, args.min_hits, args.default_threshold, args.seed)
+
+    for category, summary in report["categories"].items():
+        print(f"{category}: {summary['queries']} sampled claims")
+        print("  threshold  hit rate  inaccuracy")
+        for point in summary["curve"][::5]:
+            print(f"  {point['threshold']:9.2f}  {point['hit_rate']:8.1%}  {point['inaccuracy']:10.1%}")
+        status = "" if summary["calibrated"] else " (too few hits to calibrate, using the default)"
+        print(f"  recommended {report['thresholds'][category]:.2f}: hit rate {summary['hit_rate']:.1%}, inaccuracy {summary['inaccuracy']:.1%}{status}")
+
+    if args.dry_run:
+        return
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote thresholds to {args.output} in {time.perf_counter() - started:.1f}s (loaded by the API at startup)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export and maintenance for the claims_history collection")
+    parser.add_argument("--chroma-path", default=CHROMA_DB_PATH, help="ChromaDB storage path (embedded mode)")
+    parser.add_argument("--store-url", default=os.getenv("CLAIM_STORE_URL"), help="Claim store service URL")
+    parser.add_argument("--store-uds", default=os.getenv("CLAIM_STORE_UDS"), help="Claim store service Unix socket")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Bulk-load claims from JSONL or Parquet")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--batch-size", type=int, default=256)
+    import_parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint.json)")
+    import_parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    import_parser.set_defaults(handler=command_import)
+
+    export_parser = subparsers.add_parser("export", help="Export ids, embeddings and metadata to an .npz snapshot")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+    export_parser.set_defaults(handler=command_export)
+
+    restore_parser = subparsers.add_parser("restore", help="Restore an .npz snapshot without re-embedding")
+    restore_parser.add_argument("path")
+    restore_parser.add_argument("--batch-size", type=int, default=1000)
+    restore_parser.set_defaults(handler=command_restore)
+
+    rekey_parser = subparsers.add_parser("rekey", help="Re-key claims to normalized claim IDs, merging duplicates")
+    rekey_parser.add_argument("--replay", help="JSONL/Parquet corpus of claims to measure the exact-hit rate on")
+    rekey_parser.add_argument("--dry-run", action="store_true", help="Only print the plan and hit rates")
+    rekey_parser.add_argument("--batch-size", type=int, default=1000)
+    rekey_parser.set_defaults(handler=command_rekey)
+
+    partition_parser = subparsers.add_parser("partition", help="Move time-dependent claims into time buckets and drop expired buckets")
+    partition_parser.add_argument("--batch-size", type=int, default=1000)
+    partition_parser.set_defaults(handler=command_partition)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="Recommend per-category similarity thresholds from stored claims and feedback")
+    calibrate_parser.add_argument("--sample-size", type=int, default=2000, help="Stored claims replayed as lookups")
+    calibrate_parser.add_argument("--max-inaccuracy", type=float, default=CALIBRATION_MAX_INACCURACY, help="Highest acceptable share of wrong reuses among hits")
+    calibrate_parser.add_argument("--min-hits", type=int, default=CALIBRATION_MIN_HITS, help="Hits a threshold needs before its inaccuracy is trusted")
+    calibrate_parser.add_argument("--default-threshold", type=float, default=float(os.getenv("SIMILARITY_THRESHOLD", "0.8")), help="Threshold kept for categories with too few hits")
+    calibrate_parser.add_argument("--seed", type=int, default=0)
+    calibrate_parser.add_argument("--output", default=SIMILARITY_THRESHOLDS_PATH)
+    calibrate_parser.add_argument("--dry-run", action="store_true", help="Only print the curves")
+    calibrate_parser.set_defaults(handler=command_calibrate)
+
+    args = parser.parse_args()
+    configure_logging(log_format="text")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,14 +9,57 @@ import os
 import json
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
+import chromadb
+
+from embedding_backends import create_embedding_function
+from feedback_utils import get_feedback_counts, get_feedback_status
+from deadline_utils import Deadline, DEADLINE_MIN_SECONDS_FOR_NEW_ANALYSIS, DEADLINE_NEAR_MATCH_THRESHOLD
+from logging_utils import SAMPLED
+from normalization_utils import normalize_claim_text
+from profiling_utils import run_sync_sdk
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# ChromaDB storage configuration
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db_data")
+CLAIMS_COLLECTION_NAME = "claims_history"
+
+def initialize_chromadb(chroma_db_path: str = CHROMA_DB_PATH, embedding_function=None):
+    """
+    Initialize persistent ChromaDB client and claims_history collection
+    
+    Args:
+        chroma_db_path (str): Local path for ChromaDB data storage
+        embedding_function: Embedding function for the collection (created if not provided)
+    
+    Returns:
+        tuple: (chroma_client, claims_collection)
+    """
+    try:
+        logger.info("Initializing ChromaDB client with persistent storage at: %s", chroma_db_path)
+        
+        # Initialize persistent ChromaDB client
+        chroma_client = chromadb.PersistentClient(path=chroma_db_path)
+        
+        # Create embedding function for the configured backend (SentenceTransformer by default)
+        if embedding_function is None:
+            embedding_function = create_embedding_function()
+        
+        # Get or create claims_history collection with embedding function
+        claims_collection = chroma_client.get_or_create_collection(
+            name=CLAIMS_COLLECTION_NAME,
+            embedding_function=embedding_function
+        )
+        
+        logger.info("Successfully initialized ChromaDB collection '%s'", CLAIMS_COLLECTION_NAME)
+        logger.info("Collection contains %s existing entries", claims_collection.count())
+        
+        return chroma_client, claims_collection
+        
+    except Exception as e:
+        logger.error("Error initializing ChromaDB: %s", e)
+        raise e
+
 def generate_claim_id(claim_text: str) -> str:
     """
     Generate a unique ID for the claim using MD5 hash
@@ -25,20 +68,20 @@ def generate_claim_id(claim_text: str) -> str:
         claim_text (str): The original news claim text
     
     Returns:
-        str: MD5 hash of the lowercased, stripped claim text
+        str: MD5 hash of the canonical claim text (see normalize_claim_text)
     """
     try:
-        # Normalize the claim text: lowercase and strip whitespace
-        normalized_claim = claim_text.lower().strip()
+        # Normalize the claim text so trivially different spellings share one ID
+        normalized_claim = normalize_claim_text(claim_text)
         
         # Generate MD5 hash
         claim_id = hashlib.md5(normalized_claim.encode('utf-8')).hexdigest()
         
-        logger.debug(f"Generated claim ID: {claim_id} for claim: {claim_text[:50]}...")
+        logger.debug("Generated claim ID: %s for claim: %s...", claim_id, claim_text[:50])
         return claim_id
         
     except Exception as e:
-        logger.error(f"Error generating claim ID for '{claim_text[:50]}...': {str(e)}")
+        logger.error("Error generating claim ID for '%s...': %s", claim_text[:50], e)
         # Fallback to a simple hash if MD5 fails
         return str(hash(claim_text.lower().strip()))
 
@@ -64,58 +107,132 @@ def is_cached_data_too_old(timestamp_str: str, dependency_duration_days: int) ->
         # Calculate age of cached data
         age_in_days = (current_time - cached_time).days
         
-        logger.debug(f"Cached data age: {age_in_days} days, dependency duration: {dependency_duration_days} days")
+        logger.debug("Cached data age: %s days, dependency duration: %s days", age_in_days, dependency_duration_days)
         
         return age_in_days > dependency_duration_days
         
     except Exception as e:
-        logger.error(f"Error checking cached data age: {str(e)}")
+        logger.error("Error checking cached data age: %s", e)
         return False  # Default to using cached data if we can't determine age
 
-async def check_claim_history(claim_text: str, claims_collection, similarity_threshold: float = 0.8, time_dependency_info: dict = None) -> Optional[Dict[str, Any]]:
+def parse_source_links(source_links_str) -> list:
+    """
+    Parse the source_links JSON string stored in claim metadata back to a list
+    
+    Args:
+        source_links_str (str): JSON string from claim metadata
+    
+    Returns:
+        list: Source links, or an empty list if missing or malformed
+    """
+    try:
+        return json.loads(source_links_str) if source_links_str else []
+    except (json.JSONDecodeError, TypeError) as e:
+        logger.warning("Error parsing source_links JSON: %s, using empty list", e)
+        return []
+
+def get_exact_claim(claim_text: str, claims_collection, time_dependency_info: dict = None) -> Optional[Dict[str, Any]]:
+    """
+    Look up the stored claim with the same canonical text by ID
+    
+    Args:
+        claim_text (str): The news claim text to check
+        claims_collection: Partitioned claim store (PartitionedClaims)
+        time_dependency_info (dict): Time dependency information containing is_time_dependent and dependency_duration_days
+    
+    Returns:
+        Optional[Dict[str, Any]]: Claim data if an exact match exists that is not too old and not voted
+            inaccurate, None otherwise (the similarity search then decides)
+    """
+    claim_id = generate_claim_id(claim_text)
+    try:
+        result = claims_collection.get(ids=[claim_id], include=["metadatas", "documents"], time_dependency_info=time_dependency_info)
+    except Exception as e:
+        logger.warning("Error fetching exact claim match %s: %s", claim_id, e)
+        return None
+    if not result or not result.get("ids"):
+        return None
+    
+    metadata = (result.get("metadatas") or [{}])[0] or {}
+    user_feedback = get_feedback_status(metadata)
+    timestamp = metadata.get("timestamp", "Unknown")
+    if time_dependency_info and time_dependency_info.get("is_time_dependent", False):
+        if is_cached_data_too_old(timestamp, time_dependency_info.get("dependency_duration_days", 0)):
+            return None
+    if user_feedback == "inaccurate":
+        return None
+    
+    logger.info("Using exact cached match - ID: %s, Verdict: %s", claim_id, metadata.get("verdict", "Unknown"))
+    return {
+        "claim_text": (result.get("documents") or [claim_text])[0],
+        "verdict": metadata.get("verdict", "Unknown"),
+        "explanation": metadata.get("explanation", "No explanation available"),
+        "timestamp": timestamp,
+        "source_links": parse_source_links(metadata.get("source_links")),
+        "claim_id": claim_id,
+        "similarity_score": 1.0,
+        "user_feedback": user_feedback,
+        "feedback_counts": get_feedback_counts(metadata),
+        "is_too_old": False,
+        "near_match": False,
+        "exact_match": True
+    }
+
+async def check_claim_history(claim_text: str, claims_collection, similarity_threshold: float = 0.8, time_dependency_info: dict = None, query_embedding=None, deadline: Deadline = None) -> Optional[Dict[str, Any]]:
     """
     Check if a similar claim exists in the claim history database using semantic similarity search
     Now includes time dependency logic: if claim is time-dependent and cached data is too old, proceed with new analysis
-    Also includes feedback-based logic: if previous feedback was "inaccurate", proceed with new analysis
+    Also includes feedback-based logic: if enough users voted the cached verdict "inaccurate", proceed with new analysis
     
     Args:
         claim_text (str): The news claim text to check
-        claims_collection: ChromaDB collection instance
+        claims_collection: Partitioned claim store (PartitionedClaims); only partitions that can hold a valid match are searched
         similarity_threshold (float): Minimum similarity score (0.0-1.0) to consider a match (default: 0.8)
         time_dependency_info (dict): Time dependency information containing is_time_dependent and dependency_duration_days
+        query_embedding (list): Precomputed embedding of the claim text (optional, embedded by the collection otherwise)
+        deadline (Deadline): Request deadline; when too little time is left for a new analysis, the best
+            match above DEADLINE_NEAR_MATCH_THRESHOLD is returned with "near_match" set (optional)
     
     Returns:
         Optional[Dict[str, Any]]: Dictionary containing claim data if found and valid (not too old, good feedback), None otherwise
     """
     try:
-        logger.info(f"Checking claim history for: {claim_text[:100]}...")
+        logger.info("Checking claim history for: %s...", claim_text[:100])
         
         # Check if ChromaDB collection is available
         if not claims_collection:
             logger.warning("ChromaDB collection not available, skipping history check")
             return None
         
-        # Check if collection has any entries
-        collection_count = claims_collection.count()
-        if collection_count == 0:
-            logger.info("Claims collection is empty, no history to check")
-            return None
+        # Near the deadline a new analysis cannot finish, so accept weaker matches instead of timing out
+        accept_threshold = similarity_threshold
+        if deadline is not None and not deadline.has_time_for(DEADLINE_MIN_SECONDS_FOR_NEW_ANALYSIS):
+            accept_threshold = min(similarity_threshold, DEADLINE_NEAR_MATCH_THRESHOLD)
+            logger.warning("Only %.2fs left, accepting near matches above %s", deadline.remaining(), accept_threshold)
         
-        logger.info(f"Searching {collection_count} entries for similar claims with threshold {similarity_threshold}")
+        # Exact-match fast path: a claim with the same canonical text needs no similarity search
+        # (store calls run in a worker thread: with a claim store service each one is a network round trip)
+        exact_claim = await run_sync_sdk(get_exact_claim, claim_text, claims_collection, time_dependency_info)
+        if exact_claim is not None:
+            return exact_claim
+        
+        logger.info("Searching claim history for similar claims with threshold %s", accept_threshold)
         
         # Use semantic similarity search to get multiple similar results for feedback analysis
         try:
             # Query the collection for similar claims using embeddings - get more results to analyze feedback
-            query_result = claims_collection.query(
-                query_texts=[claim_text],
-                n_results=min(5, collection_count),  # Get up to 5 most similar results for feedback analysis
-                include=["metadatas", "documents", "distances"]
+            query_input = {"query_embeddings": [query_embedding]} if query_embedding is not None else {"query_texts": [claim_text]}
+            query_result = await run_sync_sdk(
+                claims_collection.query,
+                **query_input,
+                n_results=5,  # Get up to 5 most similar results for feedback analysis (fewer if fewer are stored)
+                include=["metadatas", "documents", "distances"],
+                time_dependency_info=time_dependency_info
             )
             
-            logger.debug(f"ChromaDB similarity search result: {query_result}")
             
         except Exception as e:
-            logger.error(f"Error querying ChromaDB collection for similarity: {str(e)}")
+            logger.error("Error querying ChromaDB collection for similarity: %s", e)
             return None
         
         # Check if any results were found
@@ -131,8 +248,8 @@ async def check_claim_history(claim_text: str, claims_collection, similarity_thr
             similarity_score = 1.0 - similarity_distance  # Convert distance to similarity score
             
             # Check if similarity score meets the threshold
-            if similarity_score < similarity_threshold:
-                logger.debug(f"Similarity score {similarity_score:.3f} below threshold {similarity_threshold}, skipping")
+            if similarity_score < accept_threshold:
+                logger.debug("Similarity score %.3f below threshold %s, skipping", similarity_score, accept_threshold, extra=SAMPLED)
                 continue
             
             # Extract data from this similar result
@@ -141,8 +258,8 @@ async def check_claim_history(claim_text: str, claims_collection, similarity_thr
                 document = query_result["documents"][0][i] if query_result["documents"] else claim_text
                 metadata = query_result["metadatas"][0][i] if query_result["metadatas"] else {}
                 
-                # Extract feedback information
-                user_feedback = metadata.get("user_feedback", None)
+                # Extract feedback information (vote-threshold status from aggregated counts)
+                user_feedback = get_feedback_status(metadata)
                 timestamp = metadata.get("timestamp", "Unknown")
                 
                 # Check time dependency if provided
@@ -150,36 +267,27 @@ async def check_claim_history(claim_text: str, claims_collection, similarity_thr
                 if time_dependency_info and time_dependency_info.get("is_time_dependent", False):
                     dependency_duration = time_dependency_info.get("dependency_duration_days", 0)
                     is_too_old = is_cached_data_too_old(timestamp, dependency_duration)
-                    logger.debug(f"Time dependency check - Is time dependent: True, Duration: {dependency_duration} days, Is too old: {is_too_old}")
-                
-                # Parse source_links JSON string back to list
-                try:
-                    source_links_str = metadata.get("source_links", "[]")
-                    if source_links_str:
-                        source_links = json.loads(source_links_str)
-                    else:
-                        source_links = []
-                except (json.JSONDecodeError, TypeError) as e:
-                    logger.warning(f"Error parsing source_links JSON: {str(e)}, using empty list")
-                    source_links = []
+                    logger.debug("Time dependency check - Is time dependent: True, Duration: %s days, Is too old: %s", dependency_duration, is_too_old, extra=SAMPLED)
                 
                 similar_claim_data = {
                     "claim_text": document,
                     "verdict": metadata.get("verdict", "Unknown"),
                     "explanation": metadata.get("explanation", "No explanation available"),
                     "timestamp": timestamp,
-                    "source_links": source_links,
+                    "source_links": metadata.get("source_links", "[]"),  # JSON string, parsed only for the chosen claim
                     "claim_id": claim_id,
                     "similarity_score": similarity_score,
                     "user_feedback": user_feedback,
-                    "is_too_old": is_too_old
+                    "feedback_counts": get_feedback_counts(metadata),
+                    "is_too_old": is_too_old,
+                    "near_match": similarity_score < similarity_threshold
                 }
                 
                 similar_claims.append(similar_claim_data)
-                logger.debug(f"Found similar claim - Similarity: {similarity_score:.3f}, Feedback: {user_feedback}, Too old: {is_too_old}")
+                logger.debug("Found similar claim - Similarity: %.3f, Feedback: %s, Too old: %s", similarity_score, user_feedback, is_too_old, extra=SAMPLED)
                 
             except (IndexError, KeyError) as e:
-                logger.error(f"Error extracting data from similarity search result {i}: {str(e)}")
+                logger.error("Error extracting data from similarity search result %s: %s", i, e)
                 continue
         
         if not similar_claims:
@@ -209,32 +317,82 @@ async def check_claim_history(claim_text: str, claims_collection, similarity_thr
         
         # Get the best claim based on feedback priority and time dependency
         best_claim = similar_claims[0]
+        best_claim["source_links"] = parse_source_links(best_claim["source_links"])
         best_feedback = best_claim.get("user_feedback")
         is_too_old = best_claim.get("is_too_old", False)
         
-        logger.info(f"Best similar claim found - Similarity: {best_claim['similarity_score']:.3f}, Feedback: {best_feedback}, Too old: {is_too_old}")
+        logger.info("Best similar claim found - Similarity: %.3f, Feedback: %s, Too old: %s", best_claim['similarity_score'], best_feedback, is_too_old)
         
         # Decision logic based on feedback and time dependency
         if is_too_old:
-            logger.info(f"Best matching claim is too old for time-dependent analysis - proceeding with new analysis")
+            logger.info("Best matching claim is too old for time-dependent analysis - proceeding with new analysis")
             return None  # This will trigger new web search and analysis
         elif best_feedback == "inaccurate":
-            logger.info(f"Best matching claim has 'inaccurate' feedback - proceeding with new analysis instead of using cached result")
+            logger.info("Best matching claim has 'inaccurate' feedback - proceeding with new analysis instead of using cached result")
             return None  # This will trigger new web search and analysis
         elif best_feedback == "accurate" or best_feedback is None:
             # Return the cached result for accurate feedback or no feedback (and not too old)
-            logger.info(f"Using cached result - Verdict: {best_claim['verdict']}, Similarity: {best_claim['similarity_score']:.3f}, Feedback: {best_feedback}")
+            logger.info("Using cached result - Verdict: %s, Similarity: %.3f, Feedback: %s", best_claim['verdict'], best_claim['similarity_score'], best_feedback)
             return best_claim
         else:
             # Unknown feedback type, default to using cached result (if not too old)
-            logger.info(f"Unknown feedback type '{best_feedback}', defaulting to cached result")
+            logger.info("Unknown feedback type '%s', defaulting to cached result", best_feedback)
             return best_claim
             
     except Exception as e:
-        logger.error(f"Unexpected error during claim history similarity check for '{claim_text[:50]}...': {str(e)}")
+        logger.error("Unexpected error during claim history similarity check for '%s...': %s", claim_text[:50], e)
         return None
 
-async def update_claim_history(claim_text: str, verdict: str, explanation: str, claims_collection, search_results: list = None, time_dependency_info: dict = None) -> bool:
+def build_claim_metadata(verdict: str, explanation: str, search_results: list = None, time_dependency_info: dict = None, timestamp: str = None) -> Dict[str, Any]:
+    """
+    Build the claims_history metadata for an analysis result
+    
+    Args:
+        verdict (str): The verdict from LLM analysis
+        explanation (str): The explanation from LLM analysis
+        search_results (list): List of search results with source URLs (optional)
+        time_dependency_info (dict): Time dependency information containing is_time_dependent and dependency_duration_days
+        timestamp (str): ISO timestamp of the analysis (defaults to current UTC time)
+    
+    Returns:
+        Dict[str, Any]: Metadata dictionary ready to store in ChromaDB
+    """
+    metadata = {
+        "verdict": verdict,
+        "explanation": explanation,
+        "timestamp": timestamp or datetime.utcnow().isoformat()
+    }
+    
+    # Add time dependency information if provided
+    if time_dependency_info:
+        metadata["is_time_dependent"] = time_dependency_info.get("is_time_dependent", False)
+        metadata["dependency_duration_days"] = time_dependency_info.get("dependency_duration_days", 0)
+        logger.debug("Added time dependency info: is_time_dependent=%s, duration=%s days", metadata['is_time_dependent'], metadata['dependency_duration_days'])
+    
+    # Add source links if search results are provided
+    if search_results and isinstance(search_results, list):
+        source_links = []
+        for result in search_results:
+            if isinstance(result, dict) and result.get("url") and result.get("url") != "No URL available":
+                source_info = {
+                    "title": result.get("title", "No title"),
+                    "url": result.get("url"),
+                    "source": result.get("source", "Unknown"),
+                    "snippet": result.get("snippet", "No content available")
+                }
+                source_links.append(source_info)
+        
+        if source_links:
+            metadata["source_links"] = json.dumps(source_links)
+            logger.debug("Added %s source links to claim metadata", len(source_links))
+        else:
+            logger.debug("No valid source links found in search results")
+    else:
+        logger.debug("No search results provided, storing claim without source links")
+    
+    return metadata
+
+async def update_claim_history(claim_text: str, verdict: str, explanation: str, claims_collection, search_results: list = None, time_dependency_info: dict = None, embedding=None) -> bool:
     """
     Update claim history database with new analysis results
     
@@ -242,15 +400,16 @@ async def update_claim_history(claim_text: str, verdict: str, explanation: str,
         claim_text (str): The original news claim text
         verdict (str): The verdict from LLM analysis
         explanation (str): The explanation from LLM analysis
-        claims_collection: ChromaDB collection instance
+        claims_collection: Partitioned claim store (PartitionedClaims), which routes the claim by time dependency
         search_results (list): List of search results with source URLs (optional)
         time_dependency_info (dict): Time dependency information containing is_time_dependent and dependency_duration_days
+        embedding (list): Precomputed embedding of the claim text (optional, embedded by the collection otherwise)
     
     Returns:
         bool: True if update was successful, False otherwise
     """
     try:
-        logger.info(f"Updating claim history for: {claim_text[:100]}...")
+        logger.info("Updating claim history for: %s...", claim_text[:100])
         
         # Check if ChromaDB collection is available
         if not claims_collection:
@@ -264,65 +423,32 @@ async def update_claim_history(claim_text: str, verdict: str, explanation: str,
         
         # Generate unique ID for the claim
         claim_id = generate_claim_id(claim_text)
-        logger.info(f"Generated claim ID for history update: {claim_id}")
+        logger.info("Generated claim ID for history update: %s", claim_id)
         
         # Create metadata dictionary with verdict, explanation, current UTC timestamp, and source links
-        current_timestamp = datetime.utcnow().isoformat()
-        metadata = {
-            "verdict": verdict,
-            "explanation": explanation,
-            "timestamp": current_timestamp
-        }
-        
-        # Add time dependency information if provided
-        if time_dependency_info:
-            metadata["is_time_dependent"] = time_dependency_info.get("is_time_dependent", False)
-            metadata["dependency_duration_days"] = time_dependency_info.get("dependency_duration_days", 0)
-            logger.debug(f"Added time dependency info: is_time_dependent={metadata['is_time_dependent']}, duration={metadata['dependency_duration_days']} days")
-        
-        # Add source links if search results are provided
-        if search_results and isinstance(search_results, list):
-            source_links = []
-            for result in search_results:
-                if isinstance(result, dict) and result.get("url") and result.get("url") != "No URL available":
-                    source_info = {
-                        "title": result.get("title", "No title"),
-                        "url": result.get("url"),
-                        "source": result.get("source", "Unknown"),
-                        "snippet": result.get("snippet", "No content available")
-                    }
-                    source_links.append(source_info)
-            
-            if source_links:
-                metadata["source_links"] = json.dumps(source_links)
-                logger.info(f"Added {len(source_links)} source links to claim metadata")
-            else:
-                logger.info("No valid source links found in search results")
-        else:
-            logger.info("No search results provided, storing claim without source links")
+        metadata = build_claim_metadata(verdict, explanation, search_results, time_dependency_info)
+        current_timestamp = metadata["timestamp"]
         
-        logger.debug(f"Prepared metadata for claim {claim_id}: verdict={verdict}, timestamp={current_timestamp}, source_links={len(metadata.get('source_links', []))}")
+        logger.debug("Prepared metadata for claim %s: verdict=%s, timestamp=%s, source_links=%s", claim_id, verdict, current_timestamp, len(metadata.get('source_links', [])))
         
         # Use upsert method to add or update the claim in the collection
         try:
-            claims_collection.upsert(
+            upsert_input = {"embeddings": [embedding]} if embedding is not None else {}
+            await run_sync_sdk(
+                claims_collection.upsert,
                 ids=[claim_id],
                 documents=[claim_text],
-                metadatas=[metadata]
+                metadatas=[metadata],
+                **upsert_input
             )
             
-            logger.info(f"Successfully upserted claim to database - ID: {claim_id}, Verdict: {verdict}")
-            
-            # Verify the update by checking collection count
-            collection_count = claims_collection.count()
-            logger.info(f"Claims collection now contains {collection_count} entries")
-            
+            logger.info("Successfully upserted claim to database - ID: %s, Verdict: %s", claim_id, verdict)
             return True
             
         except Exception as e:
-            logger.error(f"Error upserting claim to ChromaDB collection: {str(e)}")
+            logger.error("Error upserting claim to ChromaDB collection: %s", e)
             return False
         
     except Exception as e:
-        logger.error(f"Unexpected error during claim history update for '{claim_text[:50]}...': {str(e)}")
+        logger.error("Unexpected error during claim history update for '%s...': %s", claim_text[:50], e)
         return False 
\ No newline at end of file
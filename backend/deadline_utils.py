@@ -0,0 +1,107 @@
+"""
+Request deadline utilities for the Fake News Detector
+Contains the per-request time budget that is carried through every pipeline stage
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Deadline configuration
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+MAX_REQUEST_DEADLINE_SECONDS = float(os.getenv("MAX_REQUEST_DEADLINE_SECONDS", "60"))
+
+# Graceful degradation thresholds (remaining seconds)
+DEADLINE_MIN_SECONDS_FOR_REFINEMENT = float(os.getenv("DEADLINE_MIN_SECONDS_FOR_REFINEMENT", "12"))
+DEADLINE_MIN_SECONDS_FOR_ALL_ENGINES = float(os.getenv("DEADLINE_MIN_SECONDS_FOR_ALL_ENGINES", "8"))
+DEADLINE_MIN_SECONDS_FOR_ARTICLES = float(os.getenv("DEADLINE_MIN_SECONDS_FOR_ARTICLES", "8"))
+DEADLINE_MIN_SECONDS_FOR_NEW_ANALYSIS = float(os.getenv("DEADLINE_MIN_SECONDS_FOR_NEW_ANALYSIS", "5"))
+DEADLINE_NEAR_MATCH_THRESHOLD = float(os.getenv("DEADLINE_NEAR_MATCH_THRESHOLD", "0.6"))
+
+
+class Deadline:
+    """
+    Absolute point in time by which a request must be answered
+    """
+
+    def __init__(self, budget_seconds: float, expires_at: Optional[float] = None):
+        """
+        Args:
+            budget_seconds (float): Time budget from now, in seconds
+            expires_at (float): Absolute time.monotonic() expiry (overrides budget_seconds)
+        """
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + budget_seconds
+
+    @classmethod
+    def from_header(cls, header_value: Optional[str]) -> "Deadline":
+        """
+        Build a deadline from the X-Request-Deadline-Ms header, falling back to REQUEST_DEADLINE_SECONDS
+
+        Args:
+            header_value (str): Remaining client budget in milliseconds (optional)
+
+        Returns:
+            Deadline: Request deadline, capped at MAX_REQUEST_DEADLINE_SECONDS
+        """
+        budget = REQUEST_DEADLINE_SECONDS
+        if header_value:
+            try:
+                budget = float(header_value) / 1000.0
+            except ValueError:
+                logger.warning("Ignoring invalid %s header: %s", DEADLINE_HEADER, header_value)
+        return cls(min(max(budget, 0.0), MAX_REQUEST_DEADLINE_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def has_time_for(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def stage(self, share: float) -> "Deadline":
+        """
+        Sub-deadline for one pipeline stage that may use a share of the remaining time
+
+        Args:
+            share (float): Fraction (0.0-1.0) of the remaining time the stage may use
+
+        Returns:
+            Deadline: Stage deadline, never later than this deadline
+        """
+        return Deadline(0.0, expires_at=time.monotonic() + self.remaining() * share)
+
+
+async def with_deadline(awaitable: Awaitable, deadline: Optional[Deadline], stage: str) -> Any:
+    """
+    Await a pipeline call within the remaining deadline
+
+    Args:
+        awaitable: Coroutine to run
+        deadline (Deadline): Deadline to respect (no limit if None)
+        stage (str): Stage name for logging
+
+    Returns:
+        Any: Result of the awaitable
+
+    Raises:
+        asyncio.TimeoutError: If the deadline passes first
+    """
+    if deadline is None:
+        return await awaitable
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise asyncio.TimeoutError(f"Deadline already passed before {stage}")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=remaining)
+    except asyncio.TimeoutError:
+        logger.warning("Stage '%s' exceeded its deadline of %.2fs", stage, remaining)
+        raise
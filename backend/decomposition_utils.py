@@ -0,0 +1,73 @@
+"""
+Claim decomposition utilities for the Fake News Detector
+Contains the configuration of the optional sub-claim mode and the rule that
+aggregates sub-claim verdicts into one verdict for the compound claim
+"""
+
+import logging
+import os
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Decomposition configuration
+DECOMPOSE_CLAIMS = os.getenv("DECOMPOSE_CLAIMS", "false").lower() in ("1", "true", "yes")
+DECOMPOSITION_MAX_SUB_CLAIMS = int(os.getenv("DECOMPOSITION_MAX_SUB_CLAIMS", "4"))
+SUB_CLAIM_CONCURRENCY = int(os.getenv("SUB_CLAIM_CONCURRENCY", "3"))
+
+VERDICT_TRUE = "Likely True"
+VERDICT_FALSE = "Likely False"
+VERDICT_UNCERTAIN = "Uncertain/Needs More Info"
+
+
+def clean_sub_claims(claim_text: str, sub_claims: List[str], max_sub_claims: int = DECOMPOSITION_MAX_SUB_CLAIMS) -> List[str]:
+    """
+    Drop empty and repeated sub-claims and cap their number
+
+    Args:
+        claim_text (str): The original compound claim
+        sub_claims (List[str]): Sub-claims proposed by the LLM
+        max_sub_claims (int): Maximum number of sub-claims to keep
+
+    Returns:
+        List[str]: Atomic sub-claims, or [claim_text] when the claim is not compound
+    """
+    cleaned = []
+    seen = set()
+    for sub_claim in sub_claims:
+        sub_claim = " ".join((sub_claim or "").split())
+        key = sub_claim.lower().rstrip(".")
+        if sub_claim and key not in seen:
+            seen.add(key)
+            cleaned.append(sub_claim)
+    if len(cleaned) < 2:
+        return [claim_text]
+    return cleaned[:max_sub_claims]
+
+
+def aggregate_sub_verdicts(sub_results: List[dict]) -> dict:
+    """
+    Combine sub-claim verdicts into one verdict for the compound claim.
+    A compound claim is only true if every part is; one false part makes it
+    false; anything else (uncertain or failed parts) leaves it uncertain.
+
+    Args:
+        sub_results (List[dict]): Dictionaries with 'claim', 'verdict' and 'explanation'
+
+    Returns:
+        dict: Dictionary containing 'verdict' and 'explanation' keys
+    """
+    verdicts = [result.get("verdict") for result in sub_results]
+    if any(verdict == VERDICT_FALSE for verdict in verdicts):
+        verdict = VERDICT_FALSE
+    elif verdicts and all(verdict == VERDICT_TRUE for verdict in verdicts):
+        verdict = VERDICT_TRUE
+    else:
+        verdict = VERDICT_UNCERTAIN
+
+    explanation = f"The claim was checked as {len(sub_results)} separate parts:\n" + "\n".join(
+        f"- \"{result.get('claim', '')}\": {result.get('verdict', VERDICT_UNCERTAIN)}. {result.get('explanation', '')}"
+        for result in sub_results
+    )
+    logger.info("Aggregated %s sub-claim verdicts %s into: %s", len(sub_results), verdicts, verdict)
+    return {"verdict": verdict, "explanation": explanation}
@@ -0,0 +1,169 @@
+"""
+Result de-duplication utilities for the Fake News Detector
+Contains URL canonicalization, MinHash near-duplicate detection and
+reciprocal-rank fusion used to merge results from several search engines
+"""
+
+import hashlib
+import logging
+import re
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from logging_utils import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track the visitor and never change the article
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ocid", "cmpid",
+    "ref", "ref_src", "ref_url", "src", "smid", "ito", "_ga", "amp", "outputtype"
+}
+TRACKING_PARAM_PREFIXES = ("utm_", "pk_", "at_")
+MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# MinHash configuration
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 64
+NEAR_DUPLICATE_JACCARD = 0.6
+NEAR_DUPLICATE_MIN_SHINGLES = 5  # Shorter snippets (or "No snippet available") are never matched on content
+_MERSENNE_PRIME = (1 << 61) - 1
+_MINHASH_PARAMS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME | 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME)
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+# Reciprocal-rank fusion constant (the usual value from the RRF paper)
+RRF_K = 60
+
+WORD_PATTERN = re.compile(r"\w+")
+PLACEHOLDER_TITLES = {"no title", "no title available"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonicalize a result URL so syndicated, AMP, mobile and tracked variants compare equal
+
+    Args:
+        url (str): Result URL
+
+    Returns:
+        str: Canonical URL (lowercase host without www/m/amp prefixes, no tracking
+        parameters, no AMP path suffix, no fragment or trailing slash)
+    """
+    if not url or "://" not in url:
+        return (url or "").strip().lower()
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return url.strip().lower()
+
+    host = (parsed.hostname or "").lower()
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in MOBILE_HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host = host[len(prefix):]
+                stripped = True
+
+    path = parsed.path or "/"
+    path = re.sub(r"/amp(/|\.html)?$", "/", path)
+    path = re.sub(r"\.amp(\.html)?$", "", path)
+    path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    )
+
+    return urlunparse(("https", host, path, "", urlencode(query), ""))
+
+
+def text_shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """
+    Word shingles of a snippet, used for near-duplicate detection
+    """
+    words = WORD_PATTERN.findall((text or "").lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(shingles: set) -> Tuple[int, ...]:
+    """
+    MinHash signature of a shingle set
+    """
+    if not shingles:
+        return tuple()
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in shingles]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _MINHASH_PARAMS)
+
+
+def estimate_jaccard(signature_a: Tuple[int, ...], signature_b: Tuple[int, ...]) -> float:
+    """
+    Estimate the Jaccard similarity of two shingle sets from their MinHash signatures
+    """
+    if not signature_a or not signature_b:
+        return 0.0
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / len(signature_a)
+
+
+def fuse_results(engine_results: Dict[str, list], max_results: int) -> Tuple[list, int]:
+    """
+    Merge ranked result lists from several engines with reciprocal-rank fusion.
+    Results that share a canonical URL or normalized title, or whose snippets are
+    near-duplicates, are merged into one entry whose fused score sums their ranks.
+
+    Args:
+        engine_results (Dict[str, list]): Ranked results per engine, in engine preference order
+        max_results (int): Maximum number of fused results to return
+
+    Returns:
+        Tuple[list, int]: Fused results (best first) and the number of duplicates merged
+    """
+    clusters: List[dict] = []
+    by_url: Dict[str, dict] = {}
+    by_title: Dict[str, dict] = {}
+    duplicates = 0
+
+    for engine_order, (engine, results) in enumerate(engine_results.items()):
+        for rank, result in enumerate(results):
+            url = result.get("url", "")
+            canonical_url = canonicalize_url(url) if "://" in url else ""  # Skip "No URL available" placeholders
+            title = " ".join(WORD_PATTERN.findall(result.get("title", "").lower()))
+            title = "" if title in PLACEHOLDER_TITLES else title
+            shingles = text_shingles(result.get("snippet", ""))
+            signature = minhash_signature(shingles) if len(shingles) >= NEAR_DUPLICATE_MIN_SHINGLES else tuple()
+
+            cluster = (by_url.get(canonical_url) if canonical_url else None) or (by_title.get(title) if title else None)
+            if cluster is None:
+                cluster = next(
+                    (c for c in clusters if estimate_jaccard(c["signature"], signature) >= NEAR_DUPLICATE_JACCARD),
+                    None
+                )
+
+            score = 1.0 / (RRF_K + rank + 1)
+            if cluster is None:
+                cluster = {
+                    "result": result,
+                    "score": 0.0,
+                    "engine_order": engine_order,
+                    "rank": rank,
+                    "signature": signature
+                }
+                clusters.append(cluster)
+            else:
+                duplicates += 1
+                logger.debug("Merged duplicate result from %s: %s", engine, result.get('url', ''), extra=SAMPLED)
+
+            cluster["score"] += score
+            if canonical_url:
+                by_url.setdefault(canonical_url, cluster)
+            if title:
+                by_title.setdefault(title, cluster)
+
+    # Highest fused score first; ties keep engine preference order, then original rank
+    clusters.sort(key=lambda c: (-c["score"], c["engine_order"], c["rank"]))
+    return [cluster["result"] for cluster in clusters[:max_results]], duplicates
@@ -0,0 +1,176 @@
+"""
+Embedding backends for the Fake News Detector
+Runs all-MiniLM-L6-v2 either through PyTorch SentenceTransformer or through
+ONNX Runtime (optionally int8 dynamic-quantized) for CPU-only hosts
+"""
+
+import logging
+import os
+from functools import cached_property
+from typing import Any, Dict, List
+
+import chromadb
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction
+from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2, SentenceTransformerEmbeddingFunction
+
+logger = logging.getLogger(__name__)
+
+# Embedding backend configuration
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# chromadb releases whose ONNXMiniLM_L6_V2 internals the int8 backend was checked against (requirements.txt pins 1.0.12)
+ONNX_INT8_CHROMADB_VERSIONS = ("1.0.12",)
+
+
+def check_onnx_int8_support(onnx_function: ONNXMiniLM_L6_V2):
+    """
+    The int8 backend swaps a quantized session into chromadb's ONNX MiniLM function,
+    which relies on its model download layout and its cached "model" property
+
+    Raises:
+        RuntimeError: If the installed chromadb was not checked or no longer has those internals
+    """
+    internals = ("_download_model_if_not_exists", "DOWNLOAD_PATH", "EXTRACTED_FOLDER_NAME", "ort")
+    missing = [name for name in internals if not hasattr(onnx_function, name)]
+    if not isinstance(type(onnx_function).__dict__.get("model"), cached_property):
+        missing.append("model")
+    if chromadb.__version__ not in ONNX_INT8_CHROMADB_VERSIONS or missing:
+        raise RuntimeError(
+            f"EMBEDDING_BACKEND=onnx-int8 supports chromadb {', '.join(ONNX_INT8_CHROMADB_VERSIONS)} "
+            f"(installed: {chromadb.__version__}, missing internals: {missing or 'none'}); use EMBEDDING_BACKEND=onnx"
+        )
+
+
+class OnnxEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    all-MiniLM-L6-v2 served through ONNX Runtime instead of PyTorch.
+
+    It reports the sentence_transformer name and configuration so existing
+    claims_history collections open without an embedding function conflict;
+    the parity check below verifies the vectors match the stored ones closely
+    enough for that.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, quantize: bool = False):
+        """
+        Args:
+            model_name (str): SentenceTransformer model the ONNX export corresponds to
+            quantize (bool): Use int8 dynamic quantization of the model weights
+
+        Raises:
+            RuntimeError: If quantize is set and the installed chromadb is not supported
+        """
+        self.model_name = model_name
+        self.quantize = quantize
+        self._onnx = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+
+        if quantize:
+            check_onnx_int8_support(self._onnx)
+            self._onnx.__dict__["model"] = self._load_quantized_session()
+
+    @staticmethod
+    def name() -> str:
+        return SentenceTransformerEmbeddingFunction.name()
+
+    def default_space(self) -> str:
+        return "cosine"
+
+    def supported_spaces(self) -> List[str]:
+        return ["cosine", "l2", "ip"]
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "OnnxEmbeddingFunction":
+        return OnnxEmbeddingFunction(config.get("model_name", EMBEDDING_MODEL_NAME))
+
+    def get_config(self) -> Dict[str, Any]:
+        # Same configuration the torch backend persists with the collection
+        return {"model_name": self.model_name, "device": "cpu", "normalize_embeddings": False, "kwargs": {}}
+
+    def _load_quantized_session(self):
+        """
+        Quantize the ONNX model weights to int8 once and open an inference session on the result
+        """
+        self._onnx._download_model_if_not_exists()
+        model_dir = os.path.join(self._onnx.DOWNLOAD_PATH, self._onnx.EXTRACTED_FOLDER_NAME)
+        source_path = os.path.join(model_dir, "model.onnx")
+        quantized_path = os.path.join(model_dir, "model.int8.onnx")
+
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            logger.info("Quantizing ONNX embedding model to int8: %s", quantized_path)
+            quantize_dynamic(source_path, quantized_path, weight_type=QuantType.QInt8)
+
+        ort = self._onnx.ort
+        session_options = ort.SessionOptions()
+        session_options.log_severity_level = 3
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(quantized_path, providers=["CPUExecutionProvider"], sess_options=session_options)
+
+    def __call__(self, input: List[str]) -> List[Any]:
+        return [np.array(embedding, dtype=np.float32) for embedding in self._onnx(list(input))]
+
+
+def create_embedding_function(backend: str = EMBEDDING_BACKEND):
+    """
+    Create the embedding function used for claim similarity
+
+    Args:
+        backend (str): One of "torch", "onnx" or "onnx-int8"
+
+    Returns:
+        Embedding function for the claims collection
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+
+    logger.info("Loading embedding model %s with backend: %s", EMBEDDING_MODEL_NAME, backend)
+    if backend == "torch":
+        return SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL_NAME)
+    return OnnxEmbeddingFunction(EMBEDDING_MODEL_NAME, quantize=(backend == "onnx-int8"))
+
+
+def check_similarity_parity(embedding_function, documents: List[str], reference_embeddings: List[Any], similarity_threshold: float) -> Dict[str, Any]:
+    """
+    Compare a backend's embeddings against reference embeddings of the same documents
+    (e.g. the vectors already stored in claims_history by the torch backend)
+
+    Args:
+        embedding_function: Backend embedding function to check
+        documents (List[str]): Documents to re-embed
+        reference_embeddings (List[Any]): Reference embeddings, one per document
+        similarity_threshold (float): Cache similarity threshold whose decisions must be preserved
+
+    Returns:
+        Dict[str, Any]: Self-similarity statistics, the largest pairwise similarity
+        difference and the fraction of pairs whose threshold decision is unchanged
+    """
+    reference = _normalize(np.asarray(reference_embeddings, dtype=np.float32))
+    candidate = _normalize(np.asarray(embedding_function(documents), dtype=np.float32))
+
+    self_similarity = np.sum(reference * candidate, axis=1)
+    reference_pairs = reference @ reference.T
+    candidate_pairs = candidate @ candidate.T
+    upper = np.triu_indices(len(documents), k=1)
+
+    if len(upper[0]):
+        pair_difference = float(np.max(np.abs(reference_pairs[upper] - candidate_pairs[upper])))
+        decision_agreement = float(np.mean((reference_pairs[upper] >= similarity_threshold) == (candidate_pairs[upper] >= similarity_threshold)))
+    else:
+        pair_difference = 0.0
+        decision_agreement = 1.0
+
+    return {
+        "documents": len(documents),
+        "min_self_similarity": float(np.min(self_similarity)),
+        "mean_self_similarity": float(np.mean(self_similarity)),
+        "max_pair_similarity_difference": pair_difference,
+        "threshold_decision_agreement": decision_agreement
+    }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
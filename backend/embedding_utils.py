@@ -0,0 +1,196 @@
+"""
+Embedding utilities for the Fake News Detector
+Contains a micro-batcher that coalesces concurrent embedding requests into
+batched forward passes on a dedicated thread
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Dict, List
+
+from profiling_utils import current_stage, stage_counters
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching configuration
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+EMBED_CALL_TIMEOUT_SECONDS = float(os.getenv("EMBED_CALL_TIMEOUT_SECONDS", "30"))  # Limit for blocking (ChromaDB-style) calls
+
+
+class EmbeddingBatcher:
+    """
+    Collects embedding requests for up to max_wait_ms or max_batch_size texts,
+    runs one batched call of the wrapped embedding function on a dedicated
+    thread and resolves each caller's future with its own embeddings
+    """
+
+    def __init__(self, embedding_function, max_batch_size: int = EMBED_MAX_BATCH_SIZE, max_wait_ms: float = EMBED_MAX_WAIT_MS,
+                 call_timeout_seconds: float = EMBED_CALL_TIMEOUT_SECONDS):
+        """
+        Args:
+            embedding_function: Callable taking a list of texts and returning one embedding per text
+            max_batch_size (int): Maximum number of texts per forward pass
+            max_wait_ms (float): Maximum time to wait for more requests after the first one arrives
+            call_timeout_seconds (float): Maximum time a blocking __call__ waits for its embeddings
+        """
+        self.embedding_function = embedding_function
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_ms) / 1000.0
+        self.call_timeout_seconds = call_timeout_seconds
+        self.batch_size_histogram = Counter()
+        self.total_batches = 0
+        self.total_texts = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+        logger.info("Embedding batcher started - max batch size: %s, max wait: %s ms", self.max_batch_size, max_wait_ms)
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queue texts for embedding
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            Future: Resolves to a list with one embedding per text
+        """
+        future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        self._queue.put((list(texts), future, current_stage.get()))
+        return future
+
+    async def embed(self, texts: List[str]) -> List[Any]:
+        """
+        Embed texts without blocking the event loop
+        """
+        return await asyncio.wrap_future(self.submit(texts))
+
+    async def embed_one(self, text: str) -> Any:
+        """
+        Embed a single text without blocking the event loop
+        """
+        embeddings = await self.embed([text])
+        return embeddings[0]
+
+    def __call__(self, input: List[str]) -> List[Any]:
+        """
+        Blocking embedding call, so the batcher can stand in for a ChromaDB embedding function
+
+        Raises:
+            concurrent.futures.TimeoutError: If the embeddings are not ready within call_timeout_seconds
+        """
+        future = self.submit(input)
+        try:
+            return future.result(timeout=self.call_timeout_seconds)
+        except Exception:
+            future.cancel()
+            raise
+
+    @staticmethod
+    def _claim(item) -> bool:
+        # Mark the caller's future as running; callers cancelled while queued are dropped
+        return item[1].set_running_or_notify_cancel()
+
+    def _collect_batch(self) -> list:
+        first = self._queue.get()
+        while not self._claim(first):
+            first = self._queue.get()
+        batch = [first]
+        batch_texts = len(first[0])
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        while batch_texts < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if not self._claim(item):
+                continue
+            batch.append(item)
+            batch_texts += len(item[0])
+
+        return batch
+
+    @staticmethod
+    def _resolve(future: Future, result=None, exception: Exception = None):
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass  # Already resolved or cancelled
+
+    def _embed_texts(self, texts: List[str]) -> List[Any]:
+        # One forward pass per max_batch_size texts, so a single large submit is split too
+        embeddings = []
+        for start in range(0, len(texts), self.max_batch_size):
+            chunk = texts[start:start + self.max_batch_size]
+            self.total_batches += 1
+            self.batch_size_histogram[len(chunk)] += 1
+            embeddings.extend(self.embedding_function(chunk))
+        return embeddings
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch = self._collect_batch()
+                self._run_batch(batch)
+            except Exception as e:
+                # Never let one batch end the thread: every later caller would wait forever
+                logger.error("Embedding batcher error: %s", e)
+                for _, future, _ in batch:
+                    self._resolve(future, exception=e)
+
+    def _run_batch(self, batch: list):
+        texts = [text for item_texts, _, _ in batch for text in item_texts]
+        self.total_texts += len(texts)
+
+        cpu_start = time.thread_time()
+        try:
+            embeddings = self._embed_texts(texts)
+        except Exception as e:
+            logger.error("Error embedding batch of %s texts: %s", len(texts), e)
+            for _, future, _ in batch:
+                self._resolve(future, exception=e)
+            return
+        finally:
+            # Split the batch's CPU time across the pipeline stages that submitted its texts
+            cpu_per_text = (time.thread_time() - cpu_start) / len(texts)
+            for item_texts, _, stage in batch:
+                stage_counters.add(stage, "embedding_cpu_seconds", cpu_per_text * len(item_texts))
+
+        offset = 0
+        for item_texts, future, _ in batch:
+            self._resolve(future, list(embeddings[offset:offset + len(item_texts)]))
+            offset += len(item_texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Batch statistics for the metrics endpoint
+
+        Returns:
+            Dict[str, Any]: Configuration, totals and a batch-size histogram
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000.0,
+            "total_batches": self.total_batches,
+            "total_texts": self.total_texts,
+            "queue_depth": self._queue.qsize(),
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_size_histogram.items())}
+        }
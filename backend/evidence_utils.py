@@ -0,0 +1,203 @@
+"""
+Evidence selection utilities for the Fake News Detector
+Contains functions for fitting search results into a prompt token budget
+before they are sent to the LLM
+"""
+
+import logging
+import os
+import re
+from typing import List
+from urllib.parse import urlparse
+
+import numpy as np
+
+from logging_utils import SAMPLED
+
+logger = logging.getLogger(__name__)
+
+# Evidence budget configuration
+EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "1200"))
+EVIDENCE_MAX_SENTENCES = int(os.getenv("EVIDENCE_MAX_SENTENCES", "3"))
+EVIDENCE_DUPLICATE_SIMILARITY = float(os.getenv("EVIDENCE_DUPLICATE_SIMILARITY", "0.92"))
+EVIDENCE_MAX_CANDIDATE_SENTENCES = int(os.getenv("EVIDENCE_MAX_CANDIDATE_SENTENCES", "24"))  # Sentences per result that get embedded
+
+# Source priority used by the verdict prompt: government > news > other
+GOVERNMENT_SUFFIXES = (".gov", ".mil", ".gc.ca", ".gouv.fr", ".europa.eu", ".who.int", ".un.org", ".nic.in")
+NEWS_DOMAINS = {
+    "reuters.com", "apnews.com", "bbc.com", "bbc.co.uk", "nytimes.com", "washingtonpost.com",
+    "theguardian.com", "npr.org", "cnn.com", "aljazeera.com", "bloomberg.com", "wsj.com",
+    "ft.com", "economist.com", "cbsnews.com", "nbcnews.com", "abcnews.go.com", "pbs.org",
+    "factcheck.org", "politifact.com", "snopes.com", "fullfact.org", "afp.com", "thehindu.com"
+}
+SOURCE_PRIORITY_BONUS = {3: 0.10, 2: 0.05, 1: 0.0}
+
+# Per-result formatting overhead in get_llm_verdict ("1. Title: ...\n   Content: ...\n   Source: ...")
+RESULT_OVERHEAD_TOKENS = 12
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens in a text (roughly 4 characters per token)
+    """
+    return max(1, len(text) // 4) if text else 0
+
+
+def get_source_priority(url: str) -> int:
+    """
+    Classify a result URL by the source priority rule in the verdict prompt
+
+    Returns:
+        int: 3 for government sources, 2 for news sources, 1 for everything else
+    """
+    try:
+        host = (urlparse(url).hostname or "").lower()
+    except ValueError:
+        return 1
+    host = host[4:] if host.startswith("www.") else host
+    if host.endswith(GOVERNMENT_SUFFIXES) or ".gov." in host:
+        return 3
+    if host in NEWS_DOMAINS or any(host.endswith("." + domain) for domain in NEWS_DOMAINS):
+        return 2
+    return 1
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_SPLIT_PATTERN.split(text or "") if sentence.strip()]
+
+
+def candidate_sentences(claim_text: str, sentences: List[str], max_candidates: int = EVIDENCE_MAX_CANDIDATE_SENTENCES) -> List[str]:
+    """
+    Pre-filter a long article to the sentences sharing the most words with the claim,
+    in their original order, so only those are embedded
+    """
+    if len(sentences) <= max_candidates:
+        return sentences
+    claim_words = set(WORD_PATTERN.findall(claim_text.lower()))
+    overlap = [len(claim_words & set(WORD_PATTERN.findall(sentence.lower()))) for sentence in sentences]
+    keep = sorted(sorted(range(len(sentences)), key=lambda i: overlap[i], reverse=True)[:max_candidates])
+    return [sentences[i] for i in keep]
+
+
+def count_evidence_tokens(search_results: list) -> int:
+    """
+    Estimate the prompt tokens that a list of search results adds to get_llm_verdict
+    """
+    return sum(
+        estimate_tokens(result.get("title", "")) + estimate_tokens(result.get("snippet", "")) + RESULT_OVERHEAD_TOKENS
+        for result in search_results
+    )
+
+
+async def select_evidence(claim_text: str, search_results: list, embedding_batcher=None, token_budget: int = EVIDENCE_TOKEN_BUDGET) -> list:
+    """
+    Select and compress search results to fit the verdict prompt token budget.
+    Results are ranked by embedding similarity to the claim (with a bonus for
+    government and news sources), near-duplicates are dropped and each snippet
+    is trimmed to its most relevant sentences. Results carrying the fetched page
+    text ("content", see article_utils) take those sentences from the full article.
+
+    Args:
+        claim_text (str): The original news claim
+        search_results (list): Search results from search_web
+        embedding_batcher: EmbeddingBatcher used to embed claim, results and sentences (optional)
+        token_budget (int): Maximum estimated tokens of evidence to send to the LLM
+
+    Returns:
+        list: Selected search results with trimmed snippets, in ranked order
+    """
+    if not search_results:
+        return []
+
+    tokens_before = count_evidence_tokens(search_results)
+
+    try:
+        if embedding_batcher is None:
+            raise ValueError("no embedding batcher available")
+        selected = await _rank_and_trim(claim_text, search_results, embedding_batcher, token_budget)
+    except Exception as e:
+        logger.warning("Evidence ranking unavailable (%s), falling back to search order", e)
+        selected = _fit_to_budget(search_results, token_budget)
+
+    tokens_after = count_evidence_tokens(selected)
+    logger.info("Evidence selection: %s -> %s results, ~%s -> ~%s tokens (budget %s)", len(search_results), len(selected), tokens_before, tokens_after, token_budget)
+    return selected
+
+
+async def _rank_and_trim(claim_text: str, search_results: list, embedding_batcher, token_budget: int) -> list:
+    result_texts = [f"{result.get('title', '')}. {result.get('snippet', '')}" for result in search_results]
+    result_sentences = [
+        candidate_sentences(claim_text, split_sentences(result.get("content") or result.get("snippet", "")))
+        for result in search_results
+    ]
+    flat_sentences = [sentence for sentences in result_sentences for sentence in sentences]
+
+    # One embedding request for the claim, every result and the candidate sentences
+    # (the batcher runs it in passes of at most its max batch size)
+    embeddings = await embedding_batcher.embed([claim_text] + result_texts + flat_sentences)
+    vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+    claim_vector = vectors[0]
+    result_vectors = vectors[1:1 + len(search_results)]
+    sentence_scores = vectors[1 + len(search_results):] @ claim_vector if flat_sentences else np.zeros(0)
+
+    scores = result_vectors @ claim_vector
+    ranked = sorted(
+        range(len(search_results)),
+        key=lambda i: scores[i] + SOURCE_PRIORITY_BONUS[get_source_priority(search_results[i].get("url", ""))],
+        reverse=True
+    )
+
+    sentence_offsets = np.cumsum([0] + [len(sentences) for sentences in result_sentences])
+    selected = []
+    selected_vectors = []
+    used_tokens = 0
+
+    for i in ranked:
+        # Drop near-duplicates of results already selected (syndicated copies, mirrors)
+        if any(float(result_vectors[i] @ kept) >= EVIDENCE_DUPLICATE_SIMILARITY for kept in selected_vectors):
+            logger.debug("Dropping near-duplicate evidence: %s", search_results[i].get('title', '')[:60], extra=SAMPLED)
+            continue
+
+        snippet = _top_sentences(result_sentences[i], sentence_scores[sentence_offsets[i]:sentence_offsets[i + 1]])
+        result = dict(search_results[i], snippet=snippet or search_results[i].get("snippet", ""))
+        result.pop("content", None)
+        cost = count_evidence_tokens([result])
+        if used_tokens + cost > token_budget:
+            continue
+
+        selected.append(result)
+        selected_vectors.append(result_vectors[i])
+        used_tokens += cost
+
+    return selected
+
+
+def _top_sentences(sentences: List[str], scores: np.ndarray, max_sentences: int = EVIDENCE_MAX_SENTENCES) -> str:
+    """
+    Keep the sentences most similar to the claim, in their original order
+    """
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+    keep = sorted(np.argsort(-scores)[:max_sentences])
+    return " ".join(sentences[i] for i in keep)
+
+
+def _fit_to_budget(search_results: list, token_budget: int) -> list:
+    selected = []
+    used_tokens = 0
+    for result in search_results:
+        result = {key: value for key, value in result.items() if key != "content"}
+        cost = count_evidence_tokens([result])
+        if used_tokens + cost > token_budget:
+            continue
+        selected.append(result)
+        used_tokens += cost
+    return selected
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,270 @@
+"""
+Feedback utilities for the Fake News Detector
+Contains the feedback aggregator that appends votes to a local log, keeps
+per-claim counts in memory (one vote per client and claim) and flushes them
+to the claim store in batches
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Feedback configuration
+FEEDBACK_LOG_PATH = os.getenv("FEEDBACK_LOG_PATH", "./feedback_log.jsonl")
+FEEDBACK_LOG_MAX_BYTES = int(os.getenv("FEEDBACK_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+FEEDBACK_FLUSH_INTERVAL_SECONDS = float(os.getenv("FEEDBACK_FLUSH_INTERVAL_SECONDS", "5"))
+FEEDBACK_FLUSH_BATCH_SIZE = int(os.getenv("FEEDBACK_FLUSH_BATCH_SIZE", "200"))
+FEEDBACK_MIN_VOTES = int(os.getenv("FEEDBACK_MIN_VOTES", "3"))
+FEEDBACK_INACCURATE_RATIO = float(os.getenv("FEEDBACK_INACCURATE_RATIO", "0.5"))
+FEEDBACK_VOTERS_MAX = int(os.getenv("FEEDBACK_VOTERS_MAX", "100000"))  # Client/claim votes remembered for deduplication
+FEEDBACK_TYPES = ("accurate", "inaccurate")
+
+
+def get_feedback_counts(metadata: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Read aggregated feedback counts from claim metadata, counting a legacy
+    single-click "user_feedback" value as one vote
+
+    Args:
+        metadata (Dict[str, Any]): Claim metadata from ChromaDB
+
+    Returns:
+        Dict[str, int]: Counts for "accurate" and "inaccurate"
+    """
+    counts = {
+        "accurate": int(metadata.get("feedback_accurate", 0) or 0),
+        "inaccurate": int(metadata.get("feedback_inaccurate", 0) or 0)
+    }
+    legacy_feedback = metadata.get("user_feedback")
+    if legacy_feedback in FEEDBACK_TYPES and not (counts["accurate"] or counts["inaccurate"]):
+        counts[legacy_feedback] += 1
+    return counts
+
+
+def get_feedback_status(metadata: Dict[str, Any]) -> Optional[str]:
+    """
+    Decide the feedback status of a cached claim with a vote-threshold rule
+
+    A claim is only "inaccurate" (forcing re-analysis) once it has at least
+    FEEDBACK_MIN_VOTES inaccurate votes making up at least FEEDBACK_INACCURATE_RATIO
+    of all votes, so a single user cannot flip a verdict for everyone.
+
+    Args:
+        metadata (Dict[str, Any]): Claim metadata from ChromaDB
+
+    Returns:
+        Optional[str]: "inaccurate", "accurate" or None when there is no feedback
+    """
+    counts = get_feedback_counts(metadata)
+    total = counts["accurate"] + counts["inaccurate"]
+    if total == 0:
+        return None
+    if counts["inaccurate"] >= FEEDBACK_MIN_VOTES and counts["inaccurate"] / total >= FEEDBACK_INACCURATE_RATIO:
+        return "inaccurate"
+    return "accurate" if counts["accurate"] > 0 else None
+
+
+def voter_key(client: str) -> str:
+    """
+    Hash a client name so the feedback log does not store API client names or addresses
+    """
+    return hashlib.sha256(client.encode("utf-8")).hexdigest()[:16]
+
+
+class FeedbackAggregator:
+    """
+    Appends feedback votes to a local JSONL log, aggregates them per claim id in
+    memory and flushes the aggregated counts to the claim store in batches.
+    Each client holds one vote per claim: repeating it is ignored and changing it
+    moves the vote. Votes that were logged but not flushed are replayed from the
+    log on restart.
+    """
+
+    def __init__(self, log_path: str = FEEDBACK_LOG_PATH, voters_max: int = FEEDBACK_VOTERS_MAX):
+        """
+        Args:
+            log_path (str): Path of the append-only feedback log
+            voters_max (int): Client/claim votes remembered for deduplication; the least recent is forgotten beyond this
+        """
+        self.log_path = log_path
+        self.voters_max = max(1, voters_max)
+        self.pending = defaultdict(lambda: {"accurate": 0, "inaccurate": 0})
+        self.votes: "OrderedDict[tuple, str]" = OrderedDict()
+        self.sequence = 0
+        self.total_votes = 0
+        self.duplicate_votes = 0
+        self.total_flushed = 0
+        self._lock = threading.Lock()
+        self._replay_log()
+        self._log_file = open(self.log_path, "a", encoding="utf-8")
+
+    def _remember_vote(self, voter: str, claim_id: str, feedback_type: str):
+        self.votes[(voter, claim_id)] = feedback_type
+        self.votes.move_to_end((voter, claim_id))
+        if len(self.votes) > self.voters_max:
+            self.votes.popitem(last=False)
+
+    def _apply_vote(self, entry: Dict[str, Any]):
+        counts = self.pending[entry["claim_id"]]
+        counts[entry["feedback"]] += 1
+        if entry.get("previous") in FEEDBACK_TYPES:
+            # A changed vote; the count may go below zero until the flush takes it off the stored total
+            counts[entry["previous"]] -= 1
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return
+        flushed_through = 0
+        # Batches written before a flush failed part-way: claim id -> last sequence it was flushed through
+        claims_flushed_through = {}
+        entries = []
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "flushed_through" in entry:
+                    if "claim_ids" in entry:
+                        for claim_id in entry["claim_ids"]:
+                            claims_flushed_through[claim_id] = entry["flushed_through"]
+                    else:
+                        flushed_through = entry["flushed_through"]
+                    self.sequence = max(self.sequence, entry["flushed_through"])
+                else:
+                    entries.append(entry)
+                    self.sequence = max(self.sequence, entry.get("seq", 0))
+
+        for entry in entries:
+            if entry.get("voter"):
+                self._remember_vote(entry["voter"], entry["claim_id"], entry["feedback"])
+            if entry.get("seq", 0) > max(flushed_through, claims_flushed_through.get(entry["claim_id"], 0)):
+                self._apply_vote(entry)
+        if self.pending:
+            logger.info("Replayed unflushed feedback for %s claims from %s", len(self.pending), self.log_path)
+
+    def record(self, claim_id: str, feedback_type: str, client: Optional[str] = None) -> bool:
+        """
+        Log one feedback vote and add it to the in-memory counts
+
+        Args:
+            claim_id (str): Claim ID from generate_claim_id
+            feedback_type (str): "accurate" or "inaccurate"
+            client (Optional[str]): Client casting the vote; a client's later votes on the same claim
+                replace its earlier one instead of adding to it
+
+        Returns:
+            bool: False if the client had already cast the same vote on this claim
+        """
+        if feedback_type not in FEEDBACK_TYPES:
+            raise ValueError(f"Unknown feedback type: {feedback_type}")
+        with self._lock:
+            entry = {"claim_id": claim_id, "feedback": feedback_type, "ts": time.time()}
+            if client is not None:
+                entry["voter"] = voter_key(client)
+                previous = self.votes.get((entry["voter"], claim_id))
+                if previous == feedback_type:
+                    self.duplicate_votes += 1
+                    return False
+                if previous:
+                    entry["previous"] = previous
+                self._remember_vote(entry["voter"], claim_id, feedback_type)
+            self.sequence += 1
+            entry["seq"] = self.sequence
+            self._log_file.write(json.dumps(entry) + "\n")
+            self._log_file.flush()
+            self._apply_vote(entry)
+            self.total_votes += 1
+            return True
+
+    def flush(self, claims_collection) -> int:
+        """
+        Write pending counts to the claim store with one get and one update per batch
+
+        Args:
+            claims_collection: ChromaDB collection instance
+
+        Returns:
+            int: Number of claims updated
+        """
+        with self._lock:
+            if not self.pending:
+                return 0
+            pending, self.pending = self.pending, defaultdict(lambda: {"accurate": 0, "inaccurate": 0})
+            flushed_through = self.sequence
+
+        updated = 0
+        claim_ids = list(pending)
+        try:
+            for start in range(0, len(claim_ids), FEEDBACK_FLUSH_BATCH_SIZE):
+                batch_ids = claim_ids[start:start + FEEDBACK_FLUSH_BATCH_SIZE]
+                existing = claims_collection.get(ids=batch_ids, include=["metadatas"])
+                if existing["ids"]:
+                    feedback_timestamp = datetime.utcnow().isoformat()
+                    metadatas = []
+                    for claim_id, metadata in zip(existing["ids"], existing["metadatas"]):
+                        metadata = dict(metadata or {})
+                        counts = get_feedback_counts(metadata)
+                        metadata["feedback_accurate"] = max(0, counts["accurate"] + pending[claim_id]["accurate"])
+                        metadata["feedback_inaccurate"] = max(0, counts["inaccurate"] + pending[claim_id]["inaccurate"])
+                        metadata["feedback_timestamp"] = feedback_timestamp
+                        metadatas.append(metadata)
+
+                    claims_collection.update(ids=existing["ids"], metadatas=metadatas)
+                    updated += len(existing["ids"])
+
+                # Mark the batch as flushed right away, so a later failing batch does not get it replayed twice
+                with self._lock:
+                    self._log_file.write(json.dumps({"flushed_through": flushed_through, "claim_ids": batch_ids}) + "\n")
+                    self._log_file.flush()
+        except Exception as e:
+            logger.error("Error flushing feedback to the claim store: %s", e)
+            # Keep the unflushed votes for the next attempt
+            with self._lock:
+                for claim_id in claim_ids[start:]:
+                    for feedback_type in FEEDBACK_TYPES:
+                        self.pending[claim_id][feedback_type] += pending[claim_id][feedback_type]
+            return updated
+
+        with self._lock:
+            self._log_file.write(json.dumps({"flushed_through": flushed_through}) + "\n")
+            self._log_file.flush()
+            self.total_flushed += updated
+            self._rotate_log_if_needed()
+
+        logger.info("Flushed feedback for %s of %s claims", updated, len(claim_ids))
+        return updated
+
+    def _rotate_log_if_needed(self):
+        # Only called with the lock held, right after a flush marker
+        if self.pending or os.path.getsize(self.log_path) < FEEDBACK_LOG_MAX_BYTES:
+            return
+        self._log_file.close()
+        os.replace(self.log_path, self.log_path + ".1")
+        self._log_file = open(self.log_path, "a", encoding="utf-8")
+        self._log_file.write(json.dumps({"flushed_through": self.sequence}) + "\n")
+        self._log_file.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Feedback statistics for the metrics endpoint
+        """
+        with self._lock:
+            return {
+                "pending_claims": len(self.pending),
+                "total_votes": self.total_votes,
+                "duplicate_votes": self.duplicate_votes,
+                "total_flushed_claims": self.total_flushed
+            }
+
+    def close(self):
+        with self._lock:
+            self._log_file.close()
@@ -6,28 +6,59 @@ Contains functions for generating verdicts using Google Gemini
 import logging
 import os
 import json
-import google.generativeai as genai
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, List
 from dotenv import load_dotenv
 from pydantic import BaseModel
 
+from deadline_utils import Deadline, with_deadline
+from decomposition_utils import clean_sub_claims
+from provider_registry import LazyProvider
+from profiling_utils import run_sync_sdk
+from prompt_utils import DECOMPOSITION_PROMPT, REFINEMENT_PROMPT, TIME_DEPENDENCY_PROMPT, VERDICT_PROMPT, PromptTemplate, TemplateModels
+from streaming_utils import VerdictStreamParser, events_from_result
+from traffic_utils import recorded_provider
+import traffic_utils
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Configure Google Gemini API
+# Configure Google Gemini API (the SDK is imported on first use)
 api_key = os.getenv("GOOGLE_API_KEY")
-if api_key:
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+def _create_gemini_client():
+    import google.generativeai as genai
     genai.configure(api_key=api_key)
-    logger.info("Google Gemini API configured successfully")
-else:
+    return genai
+
+gemini_provider = LazyProvider("gemini", _create_gemini_client, enabled=bool(api_key), disabled_reason="GOOGLE_API_KEY not configured")
+if not api_key:
     logger.error("GOOGLE_API_KEY not found in environment variables")
 
+# One model per prompt template, carrying the template's static instructions
+template_models = TemplateModels(GEMINI_MODEL_NAME)
+
+
+async def get_gemini_model(template: PromptTemplate):
+    """
+    Get the Gemini model of a prompt template, importing and configuring the SDK on first use
+    
+    Args:
+        template (PromptTemplate): Prompt template whose instructions the model carries
+    
+    Raises:
+        RuntimeError: If the Gemini SDK could not be loaded
+    """
+    genai = await gemini_provider.get_async()
+    if genai is None:
+        raise RuntimeError("Gemini SDK not available")
+    return await run_sync_sdk(template_models.get, genai, template)
+
 
 class RefinedClaimResponse(BaseModel):
     refined_claim: str
@@ -43,65 +74,133 @@ class TimeDependencyResponse(BaseModel):
     dependency_duration_days: int
 
 
-async def refine_claim_text(claim_text: str) -> str:
+class DecompositionResponse(BaseModel):
+    sub_claims: List[str]
+
+
+async def generate_json_content(model, prompt: str, stage: str, deadline: Deadline = None):
+    """
+    Run a blocking Gemini JSON generation call in a worker thread within the request deadline
+    
+    Args:
+        model: Gemini GenerativeModel instance
+        prompt (str): Prompt to send
+        stage (str): Pipeline stage name for logging
+        deadline (Deadline): Request deadline (optional)
+    
+    Returns:
+        Gemini response object
+    
+    Raises:
+        asyncio.TimeoutError: If the deadline passes before Gemini answers
+    """
+    request_options = {"timeout": deadline.remaining()} if deadline else None
+    start = time.perf_counter()
+    response = await with_deadline(
+        run_sync_sdk(
+            model.generate_content,
+            prompt,
+            generation_config={"response_mime_type": "application/json"},
+            request_options=request_options
+        ),
+        deadline,
+        stage
+    )
+    template_models.record_usage(stage, getattr(response, "usage_metadata", None), prompt, time.perf_counter() - start)
+    return response
+
+
+async def stream_json_content(model, prompt: str, stage: str, deadline: Deadline = None) -> AsyncIterator[str]:
+    """
+    Stream a Gemini JSON generation: the blocking SDK iterator runs in a worker thread
+    and hands each chunk's text to the event loop as soon as it arrives
+    
+    Args:
+        model: Gemini GenerativeModel instance
+        prompt (str): Prompt to send
+        stage (str): Pipeline stage name for logging
+        deadline (Deadline): Request deadline for the whole generation (optional)
+    
+    Yields:
+        str: Text of each response chunk
+    
+    Raises:
+        asyncio.TimeoutError: If the deadline passes before Gemini finishes
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    finished = object()
+    stopped = threading.Event()
+    usage = {"metadata": None}
+    request_options = {"timeout": deadline.remaining()} if deadline else None
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    def produce():
+        try:
+            response = model.generate_content(
+                prompt,
+                generation_config={"response_mime_type": "application/json"},
+                request_options=request_options,
+                stream=True
+            )
+            for chunk in response:
+                if stopped.is_set():
+                    return
+                # Usage metadata is complete on the last chunk
+                usage["metadata"] = getattr(chunk, "usage_metadata", None) or usage["metadata"]
+                put(chunk.text)
+            put(finished)
+        except Exception as e:
+            put(e)
+
+    start = time.perf_counter()
+    producer = asyncio.ensure_future(run_sync_sdk(produce))
+    try:
+        while True:
+            item = await with_deadline(chunks.get(), deadline, stage)
+            if item is finished:
+                template_models.record_usage(stage, usage["metadata"], prompt, time.perf_counter() - start)
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Let the worker thread stop at the next chunk if the consumer went away
+        stopped.set()
+        producer.add_done_callback(lambda future: future.exception() if not future.cancelled() else None)
+
+
+@recorded_provider("gemini.refine_claim")
+async def refine_claim_text(claim_text: str, deadline: Deadline = None) -> str:
     """
     Refine the claim text using LLM to make it more suitable for web search
     
     Args:
         claim_text (str): The original news claim to refine
+        deadline (Deadline): Stage deadline; on timeout the original claim is returned (optional)
     
     Returns:
         str: Refined claim text optimized for web search
     """
     try:
-        logger.info(f"Starting claim text refinement for: {claim_text[:100]}...")
+        logger.info("Starting claim text refinement for: %s...", claim_text[:100])
         
         # Check if API key is configured
         if not api_key:
             logger.error("Google API key not configured")
             return claim_text
         
-        # Construct prompt for claim refinement
-        prompt = f"""You are an expert fact-checker. Your task is to refine the following news claim to make it more suitable for web search while preserving its core meaning.
-
-ORIGINAL CLAIM:
-{claim_text}
-
-INSTRUCTIONS:
-
-1. Break down the claim into specific, verifiable elements:
-   - Exact numbers and quantities
-   - Specific time periods
-   - Precise locations
-   - Specific entities or names
-
-2. Rewrite the claim to be more searchable by:
-   - Adding specific dates if time period is mentioned
-   - Including full names of locations
-   - Specifying exact numbers
-   - Adding relevant context
-
-3. Format the claim as a question that can be fact-checked:
-   - Start with "Is it true that..."
-   - Include specific details that can be verified
-   - Make the claim more precise and unambiguous
-
-4. Important rules:
-   - Do not add information that wasn't in the original claim
-   - Keep the refined claim concise but specific
-   - If the claim is already well-formed, still format it as a question
-   - Ensure the refined claim maintains the original claim's meaning
-
-Return your response as JSON with the refined claim."""
-
-        # Initialize Gemini model and send prompt
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Only the claim is sent per request; the instructions travel with the template's model
+        prompt = template_models.contents(REFINEMENT_PROMPT, claim_text)
+        model = await get_gemini_model(REFINEMENT_PROMPT)
         
         logger.info("Sending prompt to Gemini API for claim refinement...")
-        response = model.generate_content(
-            prompt, 
-            generation_config={"response_mime_type": "application/json"}
-        )
+        response = await generate_json_content(model, prompt, "refinement", deadline)
         
         if not response or not response.text:
             logger.error("Empty or invalid response from Gemini API")
@@ -111,26 +210,71 @@ Return your response as JSON with the refined claim."""
         response_data = json.loads(response.text)
         refined_response = RefinedClaimResponse(**response_data)
         
-        logger.info(f"Successfully refined claim text. Original: {claim_text[:100]}... Refined: {refined_response.refined_claim[:100]}...")
+        logger.info("Successfully refined claim text. Original: %s... Refined: %s...", claim_text[:100], refined_response.refined_claim[:100])
         return refined_response.refined_claim
         
     except Exception as e:
-        logger.error(f"Error during claim text refinement: {str(e)}")
+        logger.error("Error during claim text refinement: %s", e)
         return claim_text
 
-async def get_llm_verdict(claim_text: str, search_results: list) -> dict:
+@recorded_provider("gemini.decompose_claim")
+async def decompose_claim(claim_text: str, deadline: Deadline = None) -> List[str]:
+    """
+    Split a compound claim into atomic, independently verifiable sub-claims
+    
+    Args:
+        claim_text (str): The original news claim
+        deadline (Deadline): Stage deadline; on timeout the claim is kept whole (optional)
+    
+    Returns:
+        List[str]: Sub-claims, or [claim_text] if the claim is atomic or decomposition fails
+    """
+    try:
+        logger.info("Decomposing claim into sub-claims: %s...", claim_text[:100])
+        
+        # Check if API key is configured
+        if not api_key:
+            logger.error("Google API key not configured")
+            return [claim_text]
+        
+        # Only the claim is sent per request; the instructions travel with the template's model
+        prompt = template_models.contents(DECOMPOSITION_PROMPT, claim_text)
+        model = await get_gemini_model(DECOMPOSITION_PROMPT)
+        
+        logger.info("Sending decomposition prompt to Gemini API...")
+        response = await generate_json_content(model, prompt, "decomposition", deadline)
+        
+        if not response or not response.text:
+            logger.error("Empty or invalid response from Gemini API for claim decomposition")
+            return [claim_text]
+        
+        # Parse JSON response using Pydantic model
+        response_data = json.loads(response.text)
+        decomposition_response = DecompositionResponse(**response_data)
+        sub_claims = clean_sub_claims(claim_text, decomposition_response.sub_claims)
+        
+        logger.info("Claim decomposed into %s sub-claims", len(sub_claims))
+        return sub_claims
+        
+    except Exception as e:
+        logger.error("Error during claim decomposition: %s", e)
+        return [claim_text]
+
+@recorded_provider("gemini.verdict")
+async def get_llm_verdict(claim_text: str, search_results: list, deadline: Deadline = None) -> dict:
     """
     Generate verdict and explanation using Google Gemini LLM
     
     Args:
         claim_text (str): The original news claim to analyze
         search_results (list): List of search result dictionaries with 'title' and 'snippet'
+        deadline (Deadline): Stage deadline; on timeout an error verdict is returned (optional)
     
     Returns:
         dict: Dictionary containing 'verdict' and 'explanation' keys
     """
     try:
-        logger.info(f"Starting LLM analysis for claim: {claim_text[:100]}...")
+        logger.info("Starting LLM analysis for claim: %s...", claim_text[:100])
         
         # Check if API key is configured
         if not api_key:
@@ -140,43 +284,12 @@ async def get_llm_verdict(claim_text: str, search_results: list) -> dict:
                 "explanation": "LLM service not available - API key not configured"
             }
         
-        # Construct detailed prompt for Gemini model
-        search_summary = ""
-        if search_results:
-            search_summary = "Based on the following web search results from multiple sources:\n\n"
-            for i, result in enumerate(search_results, 1):
-                source = result.get('source', 'Unknown')
-                search_summary += f"{i}. Title: {result.get('title', 'No title')}\n"
-                search_summary += f"   Content: {result.get('snippet', 'No content')}\n"
-                search_summary += f"   Source: {source}\n\n"
-        else:
-            search_summary = "No web search results were available for analysis.\n\n"
-        
-        prompt = f"""You are an expert fact-checker analyzing news claims for truthfulness. Please analyze the following claim based ONLY on the provided search results.
-
-CLAIM TO ANALYZE:
-"{claim_text}"
-
-GROUND TRUTH (SEARCH RESULTS):
-{search_summary}
-
-INSTRUCTIONS:
-1. Assess the likely truthfulness of the claim based ONLY on the provided information
-2. Provide one of these verdicts: "Likely True", "Likely False", "Uncertain/Needs More Info"
-3. Provide a brief explanation for your verdict
-4. If search results are insufficient, indicate this in your verdict
-5. Give higher priority to government sources, then news sources, then other sources
-
-Return your response as JSON with "verdict" and "explanation" fields."""
-
-        # Initialize Gemini model and send prompt
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Only the claim and search results are sent per request; the instructions travel with the template's model
+        prompt = template_models.contents(VERDICT_PROMPT, claim_text, search_results)
+        model = await get_gemini_model(VERDICT_PROMPT)
         
         logger.info("Sending prompt to Gemini API...")
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
+        response = await generate_json_content(model, prompt, "verdict", deadline)
         
         if not response or not response.text:
             logger.error("Empty or invalid response from Gemini API")
@@ -191,32 +304,86 @@ Return your response as JSON with "verdict" and "explanation" fields."""
         response_data = json.loads(response.text)
         verdict_response = VerdictResponse(**response_data)
         
-        logger.info(f"LLM analysis completed successfully - Verdict: {verdict_response.verdict}")
+        logger.info("LLM analysis completed successfully - Verdict: %s", verdict_response.verdict)
         
         return {
             "verdict": verdict_response.verdict,
             "explanation": verdict_response.explanation
         }
         
+    except asyncio.TimeoutError:
+        logger.error("LLM analysis did not finish within the request deadline")
+        return {
+            "verdict": "Error",
+            "explanation": "Analysis could not be completed within the request time budget. Please try again.",
+            "timed_out": True
+        }
     except Exception as e:
-        logger.error(f"Error during LLM analysis: {str(e)}")
+        logger.error("Error during LLM analysis: %s", e)
         return {
             "verdict": "Error",
             "explanation": f"Analysis failed due to technical error: {str(e)}"
         }
 
-async def check_time_dependency(claim_text: str) -> dict:
+async def stream_llm_verdict(claim_text: str, search_results: list, deadline: Deadline = None) -> AsyncIterator[dict]:
+    """
+    Streaming variant of get_llm_verdict for the streaming endpoint
+    
+    Args:
+        claim_text (str): The original news claim to analyze
+        search_results (list): List of search result dictionaries with 'title' and 'snippet'
+        deadline (Deadline): Stage deadline; on timeout an error verdict is returned (optional)
+    
+    Yields:
+        dict: {"type": "verdict", "verdict"} as soon as the label is parsed, {"type": "explanation", "delta"}
+        as the explanation arrives, and finally {"type": "done", "verdict", "explanation"} with the complete result
+    """
+    if not api_key or traffic_utils.traffic_recorder is not None or traffic_utils.provider_tape is not None:
+        # Captured and replayed traffic goes through the recorded, non-streaming call
+        for event in events_from_result(await get_llm_verdict(claim_text, search_results, deadline)):
+            yield event
+        return
+
+    parser = VerdictStreamParser()
+    try:
+        logger.info("Starting streaming LLM analysis for claim: %s...", claim_text[:100])
+        model = await get_gemini_model(VERDICT_PROMPT)
+        async for text in stream_json_content(model, template_models.contents(VERDICT_PROMPT, claim_text, search_results), "verdict", deadline):
+            for event in parser.feed(text):
+                yield event
+        verdict_response = VerdictResponse(**parser.result())
+        logger.info("Streaming LLM analysis completed successfully - Verdict: %s", verdict_response.verdict)
+        result = {"verdict": verdict_response.verdict, "explanation": verdict_response.explanation}
+    except asyncio.TimeoutError:
+        logger.error("Streaming LLM analysis did not finish within the request deadline")
+        result = {
+            "verdict": "Error",
+            "explanation": "Analysis could not be completed within the request time budget. Please try again.",
+            "timed_out": True
+        }
+    except Exception as e:
+        logger.error("Error during streaming LLM analysis: %s", e)
+        result = {
+            "verdict": "Error",
+            "explanation": f"Analysis failed due to technical error: {str(e)}"
+        }
+    yield dict(result, type="done")
+
+@recorded_provider("gemini.time_dependency")
+async def check_time_dependency(claim_text: str, deadline: Deadline = None) -> dict:
     """
     Check if a claim is time-dependent and determine its dependency duration
     
     Args:
         claim_text (str): The news claim to analyze for time dependency
+        deadline (Deadline): Stage deadline; on timeout the claim is treated as not time-dependent
+            for the lookup and the result is marked "timed_out" so its verdict is not stored (optional)
     
     Returns:
         dict: Dictionary containing 'is_time_dependent' and 'dependency_duration_days'
     """
     try:
-        logger.info(f"Checking time dependency for claim: {claim_text[:100]}...")
+        logger.info("Checking time dependency for claim: %s...", claim_text[:100])
         
         # Check if API key is configured
         if not api_key:
@@ -226,49 +393,12 @@ async def check_time_dependency(claim_text: str) -> dict:
                 "dependency_duration_days": 0
             }
         
-        # Construct prompt for time dependency analysis
-        prompt = f"""You are an expert fact-checker analyzing news claims for time dependency. Analyze the following claim to determine if its truthfulness depends on current or recent events that change over time.
-
-CLAIM TO ANALYZE:
-"{claim_text}"
-
-INSTRUCTIONS:
-
-1. Determine if this claim is time-dependent by checking if it relates to:
-   - Current events (politics, breaking news, ongoing situations)
-   - Stock prices, market conditions, or financial data
-   - Weather or environmental conditions
-   - Sports scores, rankings, or current competitions
-   - Real-time statistics or data
-   - Ongoing conflicts, elections, or political situations
-   - Current policies, laws, or regulations that change frequently
-   - Social media trends or viral content
-   - Technology updates, software versions, or product releases
-
-2. If the claim is time-dependent, estimate how many days the information remains relevant:
-   - Breaking news, stock prices, weather: 1-3 days
-   - Political developments, ongoing events: 7-14 days
-   - Sports seasons, quarterly reports: 30-90 days
-   - Annual statistics, yearly reports: 180-365 days
-
-3. If the claim is NOT time-dependent, it includes:
-   - Historical facts and events
-   - Scientific principles and laws
-   - Biographical information
-   - Geographic facts
-   - Mathematical or logical statements
-   - Established scientific discoveries
-
-Return your response as JSON with "is_time_dependent" (boolean) and "dependency_duration_days" (integer) fields only."""
-
-        # Initialize Gemini model and send prompt
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Only the claim is sent per request; the instructions travel with the template's model
+        prompt = template_models.contents(TIME_DEPENDENCY_PROMPT, claim_text)
+        model = await get_gemini_model(TIME_DEPENDENCY_PROMPT)
         
         logger.info("Sending time dependency analysis prompt to Gemini API...")
-        response = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "application/json"}
-        )
+        response = await generate_json_content(model, prompt, "time_dependency", deadline)
         
         if not response or not response.text:
             logger.error("Empty or invalid response from Gemini API for time dependency check")
@@ -283,15 +413,22 @@ Return your response as JSON with "is_time_dependent" (boolean) and "dependency_
         response_data = json.loads(response.text)
         time_dependency_response = TimeDependencyResponse(**response_data)
         
-        logger.info(f"Time dependency analysis completed - Is time dependent: {time_dependency_response.is_time_dependent}, Duration: {time_dependency_response.dependency_duration_days} days")
+        logger.info("Time dependency analysis completed - Is time dependent: %s, Duration: %s days", time_dependency_response.is_time_dependent, time_dependency_response.dependency_duration_days)
         
         return {
             "is_time_dependent": time_dependency_response.is_time_dependent,
             "dependency_duration_days": time_dependency_response.dependency_duration_days
         }
         
+    except asyncio.TimeoutError:
+        logger.error("Time dependency analysis did not finish within its deadline")
+        return {
+            "is_time_dependent": False,
+            "dependency_duration_days": 0,
+            "timed_out": True
+        }
     except Exception as e:
-        logger.error(f"Error during time dependency analysis: {str(e)}")
+        logger.error("Error during time dependency analysis: %s", e)
         return {
             "is_time_dependent": False,
             "dependency_duration_days": 0
@@ -0,0 +1,129 @@
+"""
+Logging utilities for the Fake News Detector
+Contains the process-wide logging setup: structured JSON records written by a
+background queue listener, per-request correlation ids and sampling of
+high-volume per-result messages
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+# Logging configuration
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+LOG_RESULT_SAMPLE_RATE = float(os.getenv("LOG_RESULT_SAMPLE_RATE", "0.01"))
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Pass as extra= to mark a per-result message that is only logged for a sample of calls
+SAMPLED = {"sampled": True}
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sampled"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """
+    Set the correlation id of the current request (reusing the caller's id if given)
+
+    Returns:
+        str: The request id now stored in the context
+    """
+    request_id = (incoming or "").strip()[:64] or uuid.uuid4().hex[:16]
+    request_id_var.set(request_id)
+    return request_id
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampledQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that tags records with the request id and drops all but a
+    sample of records marked with extra=SAMPLED. Sampled-out records are dropped
+    before their message is formatted; the rest are formatted here, so arguments
+    the caller mutates later (lists, dicts) are logged as they were at the call.
+    """
+
+    def __init__(self, log_queue: queue.Queue, sample_rate: float = LOG_RESULT_SAMPLE_RATE):
+        super().__init__(log_queue)
+        self.sample_rate = sample_rate
+
+    def emit(self, record: logging.LogRecord):
+        if getattr(record, "sampled", False) and random.random() >= self.sample_rate:
+            return
+        super().emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            # Tracebacks must be rendered before the frames they reference go away
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    """
+    Route all logging through a queue to a background listener that writes to stderr.
+    Safe to call more than once; only the first call configures logging.
+
+    Args:
+        level (str): Root log level
+        log_format (str): "json" for structured records, "text" for human-readable lines
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if log_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(SampledQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -3,77 +3,120 @@ AI-Powered Fake News Detector - Backend API
 Main FastAPI application with health check endpoint
 """
 
+import asyncio
 import logging
+import math
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from typing import Optional
+from fastapi import Depends, FastAPI, HTTPException, Header, Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
-import chromadb
-from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
 
-from search_utils import search_web
-from llm_utils import get_llm_verdict, refine_claim_text, check_time_dependency
-from db_utils import check_claim_history, update_claim_history, generate_claim_id
+# Configure logging before the pipeline modules log their startup configuration
+from logging_utils import configure_logging, new_request_id, REQUEST_ID_HEADER
+configure_logging()
+
+from search_utils import search_web, search_providers
+from llm_utils import get_llm_verdict, stream_llm_verdict, refine_claim_text, check_time_dependency, decompose_claim, gemini_provider, template_models
+from db_utils import check_claim_history, update_claim_history, generate_claim_id, initialize_chromadb, CLAIMS_COLLECTION_NAME
+from store_client import StoreClient, RemoteEmbeddingFunction
+from embedding_utils import EmbeddingBatcher
+from embedding_backends import create_embedding_function
+from evidence_utils import select_evidence
+from deadline_utils import Deadline, DEADLINE_MIN_SECONDS_FOR_REFINEMENT, DEADLINE_MIN_SECONDS_FOR_ALL_ENGINES, DEADLINE_MIN_SECONDS_FOR_ARTICLES
+from feedback_utils import FeedbackAggregator, FEEDBACK_FLUSH_INTERVAL_SECONDS, FEEDBACK_LOG_PATH
+from decomposition_utils import aggregate_sub_verdicts, DECOMPOSE_CLAIMS, SUB_CLAIM_CONCURRENCY
+from dedup_utils import canonicalize_url
+from refinement_cache import RefinementCache
+from response_utils import AnalyzeClaimResponse, build_response, GZIP_MIN_SIZE
+from profiling_utils import pipeline_stage, profiler, stage_counters, PROFILING_ENABLED, PROFILING_ADMIN_TOKEN, PROFILER_MAX_SECONDS
+from traffic_utils import traffic_recorder, provider_tape, CAPTURED_PATHS
+from partition_utils import PartitionedClaims, PARTITION_DROP_INTERVAL_SECONDS
+from streaming_utils import encode_event, NDJSON_MEDIA_TYPE
+from calibration_utils import similarity_threshold_for, SIMILARITY_THRESHOLDS
+from article_utils import attach_article_texts, article_fetcher, FETCH_ARTICLES
+from quota_utils import ClientQuotas, FairScheduler, QuotaExceeded, ANALYSIS_QUEUE_RETRY_AFTER_SECONDS
 
 # Configuration constants
-SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))  # Optimized to 0.6 for better spelling mistake tolerance
+# Claim-history similarity threshold, used for claim categories (timeless / time-dependent)
+# without a calibrated threshold in SIMILARITY_THRESHOLDS_PATH (see `claims_cli.py calibrate`)
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.8"))
+
+# Deployment configuration: set CLAIM_STORE_URL or CLAIM_STORE_UDS to use the shared
+# claim store service (store_server.py) instead of an embedded ChromaDB client
+CLAIM_STORE_URL = os.getenv("CLAIM_STORE_URL")
+CLAIM_STORE_UDS = os.getenv("CLAIM_STORE_UDS")
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
+# Comma-separated origins allowed to call the API from a browser ("*" allows any origin)
+CORS_ALLOW_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",") if origin.strip()]
+
+# Share of the remaining request deadline each pipeline stage may use
+TIME_DEPENDENCY_DEADLINE_SHARE = 0.2
+REFINEMENT_DEADLINE_SHARE = 0.25
+DECOMPOSITION_DEADLINE_SHARE = 0.25
+SEARCH_DEADLINE_SHARE = 0.5
+ARTICLE_DEADLINE_SHARE = 0.3
+
+# How often a running analysis checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+CLIENT_CLOSED_REQUEST = 499  # nginx convention for "client closed the connection"
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-logger.info(f"Configured similarity threshold: {SIMILARITY_THRESHOLD}")
+logger.info("Configured similarity threshold: %s (calibrated per category: %s)", SIMILARITY_THRESHOLD, SIMILARITY_THRESHOLDS or "none")
 
-# Initialize ChromaDB client and collection
-def initialize_chromadb():
+# Initialize the claim store (embedded ChromaDB or the shared store service)
+def initialize_claim_store():
     """
-    Initialize persistent ChromaDB client and claims_history collection
+    Initialize the claims_history collection, either embedded in this process or
+    through the shared claim store service when running several workers
     """
-    try:
-        # Specify local path for ChromaDB data storage
-        chroma_db_path = "./chroma_db_data"
-        
-        logger.info(f"Initializing ChromaDB client with persistent storage at: {chroma_db_path}")
-        
-        # Initialize persistent ChromaDB client
-        chroma_client = chromadb.PersistentClient(path=chroma_db_path)
-        
-        # Create embedding function using SentenceTransformer
-        embedding_function = SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
-        
-        # Get or create claims_history collection with embedding function
-        claims_collection = chroma_client.get_or_create_collection(
-            name="claims_history",
-            embedding_function=embedding_function
-        )
-        
-        logger.info(f"Successfully initialized ChromaDB collection 'claims_history'")
-        logger.info(f"Collection contains {claims_collection.count()} existing entries")
-        
-        return chroma_client, claims_collection
-        
-    except Exception as e:
-        logger.error(f"Error initializing ChromaDB: {str(e)}")
-        raise e
+    if CLAIM_STORE_URL or CLAIM_STORE_UDS:
+        logger.info("Connecting to shared claim store service at: %s", CLAIM_STORE_UDS or CLAIM_STORE_URL)
+        store_client = StoreClient(base_url=CLAIM_STORE_URL, uds_path=CLAIM_STORE_UDS)
+        embedding_function = RemoteEmbeddingFunction(store_client)
+        claims_collection = PartitionedClaims(store_client, embedding_function, CLAIMS_COLLECTION_NAME)
+        logger.info("Collection contains %s existing entries", claims_collection.count())
+        return store_client, claims_collection, embedding_function
+    
+    embedding_function = create_embedding_function()
+    chroma_client, _ = initialize_chromadb(embedding_function=embedding_function)
+    # Timeless claims stay in claims_history, time-dependent claims go to expiring time buckets
+    claims_collection = PartitionedClaims(chroma_client, embedding_function, CLAIMS_COLLECTION_NAME)
+    return chroma_client, claims_collection, embedding_function
 
 # Initialize ChromaDB at startup
 try:
-    chroma_client, claims_collection = initialize_chromadb()
+    chroma_client, claims_collection, embedding_function = initialize_claim_store()
+    # Coalesce concurrent claim embeddings into batched forward passes
+    embedding_batcher = EmbeddingBatcher(embedding_function)
     logger.info("ChromaDB initialization completed successfully")
 except Exception as e:
-    logger.error(f"Failed to initialize ChromaDB: {str(e)}")
+    logger.error("Failed to initialize ChromaDB: %s", e)
     # For MVP, we'll continue without database if initialization fails
     chroma_client = None
     claims_collection = None
+    embedding_batcher = None
+
+# Feedback votes are logged locally and flushed to the claim store in batches
+# (one log per worker process so workers never interleave writes)
+feedback_aggregator = FeedbackAggregator(FEEDBACK_LOG_PATH if API_WORKERS == 1 else f"{FEEDBACK_LOG_PATH}.{os.getpid()}")
+
+# Refined search queries of recent claims, reused for paraphrases without an LLM call
+refinement_cache = RefinementCache()
+
+# Per-client (X-API-Key) quotas, and the slots full analyses are fair-queued for
+client_quotas = ClientQuotas()
+analysis_scheduler = FairScheduler()
 
 # Pydantic models
 class ClaimRequest(BaseModel):
     claim_text: str
+    decompose: Optional[bool] = None  # Split compound claims into sub-claims (defaults to DECOMPOSE_CLAIMS)
 
 class FeedbackRequest(BaseModel):
     claim_text: str
@@ -83,18 +126,88 @@ class FeedbackRequest(BaseModel):
 app = FastAPI(
     title="AI-Powered Fake News Detector",
     description="Backend API for analyzing news claims using web search and LLM",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS for frontend development
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
+    allow_origins=CORS_ALLOW_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REQUEST_ID_HEADER, "ETag", "Retry-After"],
 )
 
+# Compress larger responses (brotli when brotli-asgi is installed, gzip otherwise)
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=GZIP_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """
+    Tag every log record of a request with a correlation id (the caller's X-Request-ID if given)
+    """
+    request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+    response = await call_next(request)
+    response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+@app.middleware("http")
+async def capture_traffic(request: Request, call_next):
+    """
+    Record anonymized claim and feedback requests with their timing (opt-in with TRAFFIC_CAPTURE_PATH)
+    """
+    if traffic_recorder is None or request.method != "POST" or request.url.path not in CAPTURED_PATHS:
+        return await call_next(request)
+    body = await request.body()
+    started_at = time.time()
+    start = time.perf_counter()
+    response = await call_next(request)
+    traffic_recorder.record_request(request.url.path, body, request.query_params, request.headers, response.status_code, started_at, time.perf_counter() - start)
+    return response
+
+async def flush_feedback_periodically():
+    """
+    Background task that flushes aggregated feedback votes to the claim store
+    """
+    while True:
+        await asyncio.sleep(FEEDBACK_FLUSH_INTERVAL_SECONDS)
+        if claims_collection:
+            await asyncio.to_thread(feedback_aggregator.flush, claims_collection)
+
+async def drop_expired_partitions_periodically():
+    """
+    Background task that drops time buckets of the claim store once they have expired
+    """
+    while True:
+        if claims_collection:
+            try:
+                await asyncio.to_thread(claims_collection.drop_expired)
+            except Exception as e:
+                logger.error("Error dropping expired claim partitions: %s", e)
+        await asyncio.sleep(PARTITION_DROP_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_feedback_flusher():
+    app.state.feedback_flusher = asyncio.create_task(flush_feedback_periodically())
+    app.state.partition_dropper = asyncio.create_task(drop_expired_partitions_periodically())
+
+@app.on_event("shutdown")
+async def stop_feedback_flusher():
+    app.state.feedback_flusher.cancel()
+    app.state.partition_dropper.cancel()
+    if claims_collection:
+        await asyncio.to_thread(feedback_aggregator.flush, claims_collection)
+    feedback_aggregator.close()
+    await article_fetcher.aclose()
+    if traffic_recorder is not None:
+        traffic_recorder.close()
+
 @app.get("/health")
 async def health_check():
     """
@@ -103,35 +216,346 @@ async def health_check():
     logger.info("Health check endpoint called")
     return {"status": "ok"}
 
-@app.post("/analyze_claim")
-async def analyze_claim(request: ClaimRequest):
+@app.get("/metrics")
+async def metrics():
     """
-    API endpoint for claim submission and analysis with claim history integration
+    Metrics endpoint exposing embedding batcher, feedback, refinement cache, provider, per-stage timing, claim partition,
+    traffic capture, per-client usage and article fetch statistics
+    """
+    return {
+        "embedding_batcher": embedding_batcher.stats() if embedding_batcher else None,
+        "feedback": feedback_aggregator.stats(),
+        "refinement_cache": refinement_cache.stats(),
+        "providers": {provider.name: provider.stats() for provider in [gemini_provider, *search_providers.values()]},
+        "stages": stage_counters.stats(),
+        "partitions": await asyncio.to_thread(claims_collection.stats) if claims_collection else None,
+        "traffic": {
+            "capture": traffic_recorder.stats() if traffic_recorder else None,
+            "replay": provider_tape.stats() if provider_tape else None
+        },
+        "clients": client_quotas.stats(),
+        "analysis_scheduler": analysis_scheduler.stats(),
+        "articles": article_fetcher.stats() if FETCH_ARTICLES else None,
+        "prompts": template_models.stats()
+    }
+
+@app.post("/admin/profile", response_class=PlainTextResponse)
+async def profile(seconds: Optional[float] = None, requests: Optional[int] = None, x_admin_token: Optional[str] = Header(default=None)):
     """
+    Admin endpoint (opt-in with PROFILING_ENABLED) that samples all threads for the given
+    number of seconds, or until the next given number of /analyze_claim requests finished,
+    and returns collapsed stacks for flamegraph.pl or speedscope
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if PROFILING_ADMIN_TOKEN and x_admin_token != PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if requests is not None and requests < 1:
+        raise HTTPException(status_code=400, detail="requests must be at least 1")
+    
+    timeout = min(seconds if seconds else PROFILER_MAX_SECONDS, PROFILER_MAX_SECONDS)
+    try:
+        profiler.start(requests=requests)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     try:
-        logger.info(f"Received claim analysis request: {request.claim_text[:100]}...")
+        await profiler.wait(timeout)
+    finally:
+        collapsed_stacks = profiler.stop()
+    return collapsed_stacks
+
+def identify_client(request: Request, x_api_key: Optional[str] = Header(default=None)) -> str:
+    """
+    Resolve the caller's client name from its X-API-Key header, or from its address when it sends no key
+    """
+    try:
+        return client_quotas.identify(x_api_key, request.client.host if request.client else None)
+    except PermissionError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+def charge_quota(client: str, kind: str):
+    """
+    Charge one request or analysis to the client, answering 429 with Retry-After when its quota is used up
+    """
+    try:
+        client_quotas.charge(client, kind)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+async def acquire_analysis_slot(client: str, deadline: Deadline):
+    """
+    Wait for a full-analysis slot, answering 503 if none frees up before the request deadline
+    """
+    wait_started = time.perf_counter()
+    try:
+        await asyncio.wait_for(analysis_scheduler.acquire(client), timeout=max(0.0, deadline.remaining()))
+    except asyncio.TimeoutError:
+        logger.warning("No analysis slot for client %s before the deadline", client)
+        raise HTTPException(status_code=503, detail="Too many analyses in progress, retry later",
+                            headers={"Retry-After": str(ANALYSIS_QUEUE_RETRY_AFTER_SECONDS)})
+    client_quotas.record_queue_wait(client, time.perf_counter() - wait_started)
+
+async def add_article_texts(search_results: list, deadline: Deadline, degraded_stages: Optional[list] = None) -> list:
+    """
+    Fetch the full text of the top search results (FETCH_ARTICLES) when the deadline leaves time for it
+    """
+    if not FETCH_ARTICLES or not search_results:
+        return search_results
+    if not deadline.has_time_for(DEADLINE_MIN_SECONDS_FOR_ARTICLES):
+        logger.warning("Only %.2fs left, skipping article fetch", deadline.remaining())
+        if degraded_stages is not None:
+            degraded_stages.append("articles_skipped")
+        return search_results
+    with pipeline_stage("article_fetch"):
+        return await attach_article_texts(search_results, deadline.stage(ARTICLE_DEADLINE_SHARE))
+
+async def embed_claim(claim_text: str):
+    """
+    Embed the claim once through the batcher so history lookup and storage reuse it
+    """
+    if not embedding_batcher:
+        return None
+    try:
+        return await embedding_batcher.embed_one(claim_text)
+    except Exception as e:
+        logger.error("Error embedding claim, falling back to collection embedding: %s", e)
+        return None
+
+async def analyze_sub_claim(sub_claim: str, time_dependency_info: dict, deadline: Deadline, semaphore: asyncio.Semaphore) -> dict:
+    """
+    Check one atomic sub-claim against the claim history and, on a miss, search,
+    judge and cache it on its own so overlapping compound claims can reuse it.
+    Sub-claims inherit the time dependency of the compound claim.
+    """
+    async with semaphore:
+        sub_claim_embedding = await embed_claim(sub_claim)
+        historical_entry = await check_claim_history(
+            sub_claim,
+            claims_collection,
+            similarity_threshold_for(time_dependency_info, SIMILARITY_THRESHOLD),
+            time_dependency_info,
+            sub_claim_embedding,
+            deadline
+        )
+        if historical_entry:
+            logger.info("Sub-claim found in claim history - Verdict: %s", historical_entry['verdict'])
+            return {
+                "claim": sub_claim,
+                "verdict": historical_entry["verdict"],
+                "explanation": historical_entry["explanation"],
+                "source": "claim_history",
+                "search_results": historical_entry.get("source_links", [])
+            }
+        
+        search_results = await search_web(sub_claim, deadline=deadline.stage(SEARCH_DEADLINE_SHARE))
+        evidence_candidates = await add_article_texts(search_results, deadline)
+        evidence = await select_evidence(sub_claim, evidence_candidates, embedding_batcher)
+        llm_result = await get_llm_verdict(sub_claim, evidence, deadline)
+        
+        if not llm_result.get("timed_out") and not time_dependency_info.get("timed_out") and llm_result["verdict"] != "Error":
+            await update_claim_history(
+                sub_claim,
+                llm_result["verdict"],
+                llm_result["explanation"],
+                claims_collection,
+                search_results,
+                time_dependency_info,
+                sub_claim_embedding
+            )
+        
+        return {
+            "claim": sub_claim,
+            "verdict": llm_result["verdict"],
+            "explanation": llm_result["explanation"],
+            "source": "new_analysis",
+            "search_results": search_results,
+            "timed_out": llm_result.get("timed_out", False)
+        }
+
+async def analyze_compound_claim(claim_text: str, sub_claims: list, time_dependency_info: dict, claim_embedding, deadline: Deadline, degraded_stages: list) -> dict:
+    """
+    Analyze the sub-claims of a compound claim concurrently (at most SUB_CLAIM_CONCURRENCY
+    at a time) and aggregate their verdicts into one verdict for the whole claim
+    """
+    logger.info("Analyzing %s sub-claims with concurrency %s...", len(sub_claims), SUB_CLAIM_CONCURRENCY)
+    semaphore = asyncio.Semaphore(SUB_CLAIM_CONCURRENCY)
+    with pipeline_stage("sub_claims"):
+        sub_results = await asyncio.gather(*(
+            analyze_sub_claim(sub_claim, time_dependency_info, deadline, semaphore) for sub_claim in sub_claims
+        ))
+    llm_result = aggregate_sub_verdicts(sub_results)
+    
+    # Evidence of all sub-claims, without the same page appearing twice
+    search_results = []
+    seen_urls = set()
+    for sub_result in sub_results:
+        for result in sub_result["search_results"]:
+            url = canonicalize_url(result.get("url", ""))
+            if url not in seen_urls:
+                seen_urls.add(url)
+                search_results.append(result)
+    
+    if any(sub_result.get("timed_out") for sub_result in sub_results):
+        # Never cache a verdict that was cut short by the deadline
+        degraded_stages.append("verdict_timed_out")
+    elif time_dependency_info.get("timed_out"):
+        logger.warning("Time dependency unknown, not storing the compound claim analysis")
+    else:
+        logger.info("Saving aggregated compound claim analysis to claim history database...")
+        with pipeline_stage("storage"):
+            await update_claim_history(
+                claim_text,
+                llm_result["verdict"],
+                llm_result["explanation"],
+                claims_collection,
+                search_results,
+                time_dependency_info,
+                claim_embedding
+            )
+    
+    response = {
+        "received_claim": claim_text,
+        "refined_claim": claim_text,
+        "sub_claims": [
+            {key: sub_result[key] for key in ("claim", "verdict", "explanation", "source")}
+            for sub_result in sub_results
+        ],
+        "search_results": search_results,
+        "verdict": llm_result["verdict"],
+        "explanation": llm_result["explanation"],
+        "source": "new_analysis"
+    }
+    if degraded_stages:
+        response["degraded"] = degraded_stages
+    
+    logger.info("Successfully completed compound claim analysis - Verdict: %s", llm_result['verdict'])
+    return response
+
+# The handler returns build_response's Response, which FastAPI does not re-validate:
+# response_model documents the schema, build_response enforces it
+@app.post("/analyze_claim", response_model=AnalyzeClaimResponse, response_model_exclude_none=True)
+async def analyze_claim(request: ClaimRequest, http_request: Request, fields: Optional[str] = None, verbose: bool = True,
+                        x_request_deadline_ms: Optional[str] = Header(default=None), client: str = Depends(identify_client)):
+    """
+    API endpoint for claim submission and analysis with claim history integration.
+    The whole pipeline runs within a deadline taken from the X-Request-Deadline-Ms header
+    (or REQUEST_DEADLINE_SECONDS); stages degrade gracefully as the deadline approaches.
+    Clients can trim the payload with fields= (comma-separated) and verbose=false.
+    The pipeline is cancelled if the client disconnects before it finishes.
+    Every request is charged to the caller's (X-API-Key) request quota; new analyses
+    are also charged to its analysis quota and queued fairly against other clients.
+    """
+    charge_quota(client, "request")
+    return await cancel_on_disconnect(
+        http_request,
+        run_claim_analysis(request, http_request, fields, verbose, x_request_deadline_ms, client)
+    )
+
+@app.post("/analyze_claim/stream")
+async def analyze_claim_stream(request: ClaimRequest, http_request: Request, fields: Optional[str] = None, verbose: bool = True,
+                               x_request_deadline_ms: Optional[str] = Header(default=None), client: str = Depends(identify_client)):
+    """
+    Streaming variant of /analyze_claim answering with NDJSON events: for a new analysis
+    {"type": "verdict"} as soon as Gemini has produced the label, then {"type": "explanation", "delta"}
+    chunks, and finally {"type": "result", "result"} with the same payload /analyze_claim returns
+    (the only event for claim-history hits). Failures after the stream started are sent as
+    {"type": "error", "status", "detail"}.
+    """
+    charge_quota(client, "request")
+    events = asyncio.Queue()
+
+    async def pipeline():
+        try:
+            response = await run_claim_analysis(request, http_request, fields, verbose, x_request_deadline_ms, client, stream_events=events)
+            if response.status_code == 200:
+                await events.put(b'{"type":"result","result":' + response.body + b"}\n")
+            else:
+                await events.put({"type": "error", "status": response.status_code, "detail": "Unexpected response status"})
+        except HTTPException as e:
+            error = {"type": "error", "status": e.status_code, "detail": e.detail}
+            if e.headers and "Retry-After" in e.headers:
+                error["retry_after"] = int(e.headers["Retry-After"])
+            await events.put(error)
+        finally:
+            await events.put(None)
+
+    async def stream():
+        # Starlette cancels this generator when the client disconnects, which cancels the pipeline
+        task = asyncio.ensure_future(pipeline())
+        try:
+            while (event := await events.get()) is not None:
+                yield event if isinstance(event, bytes) else encode_event(event)
+        finally:
+            if not task.done():
+                task.cancel()
+
+    # Content-Encoding keeps the compression middleware from buffering the events
+    return StreamingResponse(stream(), media_type=NDJSON_MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"})
+
+async def cancel_on_disconnect(http_request: Request, pipeline):
+    """
+    Run a pipeline coroutine, cancelling it when the client goes away so an abandoned
+    request stops spending LLM and search calls
+    """
+    task = asyncio.ensure_future(pipeline)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.info("Client disconnected, cancelling claim analysis")
+                task.cancel()
+                return Response(status_code=CLIENT_CLOSED_REQUEST)
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def run_claim_analysis(request: ClaimRequest, http_request: Request, fields: Optional[str], verbose: bool,
+                             x_request_deadline_ms: Optional[str], client: str, stream_events: Optional[asyncio.Queue] = None):
+    """
+    The /analyze_claim pipeline: time dependency, claim history, refinement, search,
+    evidence selection, verdict and storage. With stream_events, the verdict is streamed
+    and its partial events are put on that queue as they arrive.
+    """
+    start = time.perf_counter()
+    outcome = None
+    holds_analysis_slot = False
+    try:
+        logger.info("Received claim analysis request: %s...", request.claim_text[:100])
+        deadline = Deadline.from_header(x_request_deadline_ms)
+        degraded_stages = []
         
         # Step 1: Check time dependency first to determine cache strategy
         logger.info("Analyzing time dependency of the claim...")
-        time_dependency_info = await check_time_dependency(request.claim_text)
+        with pipeline_stage("time_dependency"):
+            time_dependency_info = await check_time_dependency(request.claim_text, deadline.stage(TIME_DEPENDENCY_DEADLINE_SHARE))
         is_time_dependent = time_dependency_info.get("is_time_dependent", False)
         dependency_duration = time_dependency_info.get("dependency_duration_days", 0)
+        if time_dependency_info.get("timed_out"):
+            degraded_stages.append("time_dependency_timed_out")
         
-        logger.info(f"Time dependency analysis - Is time dependent: {is_time_dependent}, Duration: {dependency_duration} days")
+        logger.info("Time dependency analysis - Is time dependent: %s, Duration: %s days", is_time_dependent, dependency_duration)
         
         # Step 2: Check claim history with time dependency consideration
-        logger.info(f"Checking claim history for existing analysis with similarity threshold {SIMILARITY_THRESHOLD}...")
-        historical_entry = await check_claim_history(
-            request.claim_text, 
-            claims_collection, 
-            SIMILARITY_THRESHOLD,
-            time_dependency_info
-        )
+        with pipeline_stage("history_lookup"):
+            claim_embedding = await embed_claim(request.claim_text)
+            similarity_threshold = similarity_threshold_for(time_dependency_info, SIMILARITY_THRESHOLD)
+            logger.info("Checking claim history for existing analysis with similarity threshold %s...", similarity_threshold)
+            historical_entry = await check_claim_history(
+                request.claim_text, 
+                claims_collection, 
+                similarity_threshold,
+                time_dependency_info,
+                claim_embedding,
+                deadline
+            )
         
         if historical_entry:
             # Return historical data if found and still valid
             similarity_score = historical_entry.get('similarity_score', 0.0)
-            logger.info(f"Found existing analysis in claim history - Verdict: {historical_entry['verdict']}, Similarity: {similarity_score:.3f}")
+            logger.info("Found existing analysis in claim history - Verdict: %s, Similarity: %.3f", historical_entry['verdict'], similarity_score)
             response = {
                 "received_claim": request.claim_text,
                 "verdict": historical_entry["verdict"],
@@ -141,33 +565,102 @@ async def analyze_claim(request: ClaimRequest):
                 "source_links": historical_entry.get("source_links", []),
                 "similarity_score": similarity_score
             }
-            return response
+            if historical_entry.get("near_match"):
+                # Best cached near-match returned because a new analysis would miss the deadline
+                response["degraded"] = ["near_match"]
+            outcome = "hit"
+            # Streamed results are wrapped in a result event, so they are never answered with 304
+            return build_response(http_request, response, fields, verbose, cacheable=stream_events is None)
         
-        # Step 3: No valid historical entry found, proceed with new analysis
+        # Step 3: No valid historical entry found, proceed with new analysis once the client's
+        # analysis quota allows it and a slot is free (slots are shared round-robin between clients)
         logger.info("No valid historical entry found, proceeding with new analysis...")
+        charge_quota(client, "analysis")
+        try:
+            await acquire_analysis_slot(client, deadline)
+        except (HTTPException, asyncio.CancelledError):
+            # No analysis ran (503 or the client went away while queued): the quota is not spent
+            client_quotas.refund(client, "analysis")
+            raise
+        holds_analysis_slot = True
+        outcome = "analysis"
         
-        # Step 4: Refine the claim text using LLM
-        logger.info("Starting claim text refinement...")
-        refined_claim = await refine_claim_text(request.claim_text)
+        # Optional: split a compound claim into atomic sub-claims that are checked in parallel
+        decompose = DECOMPOSE_CLAIMS if request.decompose is None else request.decompose
+        if decompose and deadline.has_time_for(DEADLINE_MIN_SECONDS_FOR_REFINEMENT):
+            with pipeline_stage("decomposition"):
+                sub_claims = await decompose_claim(request.claim_text, deadline.stage(DECOMPOSITION_DEADLINE_SHARE))
+            if len(sub_claims) > 1:
+                response = await analyze_compound_claim(request.claim_text, sub_claims, time_dependency_info, claim_embedding, deadline, degraded_stages)
+                return build_response(http_request, response, fields, verbose)
+        elif decompose:
+            logger.warning("Only %.2fs left, skipping claim decomposition", deadline.remaining())
+            degraded_stages.append("decomposition_skipped")
+        
+        # Step 4: Refine the claim text, reusing the refinement of a paraphrased claim if one
+        # is cached, otherwise with the LLM (skipped when the deadline is close)
+        cached_refinement = refinement_cache.lookup(claim_embedding)
+        if cached_refinement:
+            refined_claim = cached_refinement
+        elif deadline.has_time_for(DEADLINE_MIN_SECONDS_FOR_REFINEMENT):
+            logger.info("Starting claim text refinement...")
+            with pipeline_stage("refinement"):
+                refined_claim = await refine_claim_text(request.claim_text, deadline.stage(REFINEMENT_DEADLINE_SHARE))
+            if refined_claim != request.claim_text:
+                # refine_claim_text returns the claim unchanged on failure; never cache that
+                refinement_cache.store(generate_claim_id(request.claim_text), claim_embedding, refined_claim)
+        else:
+            logger.warning("Only %.2fs left, skipping claim refinement", deadline.remaining())
+            refined_claim = request.claim_text
+            degraded_stages.append("refinement_skipped")
         
         # Step 5: Call web search function using refined claim as query
         logger.info("Starting web search for claim analysis...")
-        search_results = await search_web(refined_claim)
+        search_deadline = deadline.stage(SEARCH_DEADLINE_SHARE)
+        if not search_deadline.has_time_for(DEADLINE_MIN_SECONDS_FOR_ALL_ENGINES):
+            degraded_stages.append("reduced_search")
+        with pipeline_stage("search"):
+            search_results = await search_web(refined_claim, deadline=search_deadline)
         
-        # Step 6: Call LLM verdict generation function
+        # Step 6: Select the most relevant evidence within the prompt token budget, from the
+        # full text of the top result pages when article fetching is enabled
+        evidence_candidates = await add_article_texts(search_results, deadline, degraded_stages)
+        with pipeline_stage("evidence_selection"):
+            evidence = await select_evidence(request.claim_text, evidence_candidates, embedding_batcher)
+        
+        # Step 7: Call LLM verdict generation function
         logger.info("Starting LLM analysis for claim verification...")
-        llm_result = await get_llm_verdict(request.claim_text, search_results)
-        
-        # Step 7: Update claim history database with new analysis including time dependency info
-        logger.info("Saving new analysis to claim history database...")
-        update_success = await update_claim_history(
-            request.claim_text, 
-            llm_result["verdict"], 
-            llm_result["explanation"], 
-            claims_collection,
-            search_results,
-            time_dependency_info
-        )
+        with pipeline_stage("verdict"):
+            if stream_events is None:
+                llm_result = await get_llm_verdict(request.claim_text, evidence, deadline)
+            else:
+                async for event in stream_llm_verdict(request.claim_text, evidence, deadline):
+                    if event["type"] == "done":
+                        llm_result = {key: value for key, value in event.items() if key != "type"}
+                    else:
+                        await stream_events.put(event)
+        
+        # Step 8: Update claim history database with new analysis including time dependency info
+        if llm_result.get("timed_out"):
+            # Never cache a verdict that was cut short by the deadline
+            degraded_stages.append("verdict_timed_out")
+            update_success = False
+        elif time_dependency_info.get("timed_out"):
+            # Unknown time dependency: stored as timeless, the verdict would be served indefinitely
+            logger.warning("Time dependency unknown, not storing the new analysis")
+            update_success = False
+        else:
+            logger.info("Saving new analysis to claim history database...")
+            with pipeline_stage("storage"):
+                update_success = await update_claim_history(
+                    request.claim_text, 
+                    llm_result["verdict"], 
+                    llm_result["explanation"], 
+                    claims_collection,
+                    search_results,
+                    time_dependency_info,
+                    claim_embedding
+                )
         
         if update_success:
             logger.info("Successfully saved new analysis to claim history database")
@@ -183,65 +676,61 @@ async def analyze_claim(request: ClaimRequest):
             "explanation": llm_result["explanation"],
             "source": "new_analysis"
         }
+        if degraded_stages:
+            response["degraded"] = degraded_stages
         
-        logger.info(f"Successfully completed claim analysis pipeline - Verdict: {llm_result['verdict']}, Time dependent: {is_time_dependent}")
-        return response
+        logger.info("Successfully completed claim analysis pipeline - Verdict: %s, Time dependent: %s", llm_result['verdict'], is_time_dependent)
+        return build_response(http_request, response, fields, verbose)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing claim analysis: {str(e)}")
+        logger.error("Error processing claim analysis: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error processing claim analysis")
+    finally:
+        if holds_analysis_slot:
+            analysis_scheduler.release()
+        if outcome:
+            client_quotas.record_latency(client, outcome, time.perf_counter() - start)
+        profiler.request_finished()
 
 @app.post("/submit_feedback")
-async def submit_feedback(request: FeedbackRequest):
+async def submit_feedback(request: FeedbackRequest, client: str = Depends(identify_client)):
     """
     API endpoint for receiving user feedback on claim analysis accuracy
     """
+    charge_quota(client, "request")
     try:
-        logger.info(f"Received feedback - Claim: {request.claim_text[:50]}... | Feedback: {request.feedback_type}")
+        logger.info("Received feedback - Claim: %s... | Feedback: %s", request.claim_text[:50], request.feedback_type)
         
         # Generate the claim ID using same method as database operations
         claim_id = generate_claim_id(request.claim_text)
         
-        # Try to retrieve the existing entry from ChromaDB
-        if claims_collection:
-            try:
-                query_result = claims_collection.get(
-                    ids=[claim_id],
-                    include=["metadatas", "documents"]
-                )
-                
-                if query_result['ids']:
-                    # Entry found, update metadata with feedback
-                    current_metadata = query_result['metadatas'][0] if query_result['metadatas'] else {}
-                    
-                    # Add feedback to metadata
-                    from datetime import datetime
-                    current_metadata['user_feedback'] = request.feedback_type
-                    current_metadata['feedback_timestamp'] = datetime.utcnow().isoformat()
-                    
-                    # Update the entry
-                    claims_collection.update(
-                        ids=[claim_id],
-                        metadatas=[current_metadata]
-                    )
-                    
-                    logger.info(f"Successfully updated claim {claim_id} with feedback: {request.feedback_type}")
-                    return {"message": "Feedback submitted and logged successfully.", "status": "success"}
-                else:
-                    logger.warning(f"Claim not found in database for feedback: {claim_id}")
-                    return {"message": "Feedback logged but claim not found in database.", "status": "logged"}
-                    
-            except Exception as db_error:
-                logger.error(f"Database error while updating feedback: {str(db_error)}")
-                return {"message": "Feedback logged but database update failed.", "status": "error"}
+        # Log the vote and aggregate it in memory; it reaches the claim store on the next flush
+        try:
+            counted = feedback_aggregator.record(claim_id, request.feedback_type, client)
+        except ValueError as validation_error:
+            raise HTTPException(status_code=400, detail=str(validation_error))
+        
+        if counted:
+            logger.info("Recorded feedback for claim %s: %s", claim_id, request.feedback_type)
         else:
-            logger.warning("ChromaDB not available, feedback only logged to console")
-            return {"message": "Feedback logged successfully.", "status": "logged"}
+            logger.info("Ignored repeated feedback for claim %s: %s", claim_id, request.feedback_type)
+        return {"message": "Feedback submitted and logged successfully.", "status": "success"}
             
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing feedback submission: {str(e)}")
+        logger.error("Error processing feedback submission: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error processing feedback")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000, reload=True) 
\ No newline at end of file
+    if API_WORKERS > 1:
+        if not (CLAIM_STORE_URL or CLAIM_STORE_UDS):
+            # Several workers with embedded clients would each load the model and write to the same store
+            logger.error("API_WORKERS > 1 requires CLAIM_STORE_URL or CLAIM_STORE_UDS (start store_server.py first)")
+            raise SystemExit(1)
+        uvicorn.run("main:app", host="127.0.0.1", port=8000, workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="127.0.0.1", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Claim normalization utilities for the Fake News Detector
+Contains the canonical form of a claim used for claim ids, so trivially
+different spellings of the same claim ("Bitcoin hit $50,000!" and
+"bitcoin hit 50000 dollars") share one history entry.
+
+frontend/script.js (normalizeClaimText) implements the same steps; keep the
+two in sync.
+"""
+
+import re
+import unicodedata
+
+QUOTE_CHARACTERS = "\"'`‘’‚‛“”„‟«»‹›"
+QUOTE_PATTERN = re.compile("[" + re.escape(QUOTE_CHARACTERS) + "]")
+STRIPPED_CATEGORIES = {"So", "Cf", "Cs", "Co"}  # Emoji and other symbols, zero-width joiners, surrogates, private use
+
+NUMBER = r"[0-9]+(?:\.[0-9]+)?"
+THOUSANDS_SEPARATOR_PATTERN = re.compile(r"([0-9]),(?=[0-9]{2,3}(?![0-9]))")  # Also Indian grouping (1,00,000)
+MAGNITUDE_PATTERN = re.compile(r"(" + NUMBER + r")\s*(k|thousand|million|mn|bn|billion|trillion)(?![a-z0-9])")
+MAGNITUDE_ZEROS = {"k": 3, "thousand": 3, "million": 6, "mn": 6, "bn": 9, "billion": 9, "trillion": 12}
+
+CURRENCY_SYMBOLS = {"us$": "usd", "$": "usd", "€": "eur", "£": "gbp", "¥": "jpy", "₹": "inr"}
+CURRENCY_SYMBOL = "(us\\$|\\$|€|£|¥|₹)"
+CURRENCY_BEFORE_NUMBER_PATTERN = re.compile(CURRENCY_SYMBOL + r"\s*(" + NUMBER + r")")
+CURRENCY_AFTER_NUMBER_PATTERN = re.compile(r"(" + NUMBER + r")\s*" + CURRENCY_SYMBOL)
+CURRENCY_WORDS = {"us dollars": "usd", "us dollar": "usd", "dollars": "usd", "dollar": "usd", "euros": "eur", "euro": "eur", "rupees": "inr", "rupee": "inr", "yen": "jpy"}
+CURRENCY_WORD_PATTERN = re.compile(r"(?<![a-z0-9])(us dollars|us dollar|dollars|dollar|euros|euro|rupees|rupee|yen)(?![a-z0-9])")
+
+PERCENT_PATTERN = re.compile(r"\s*(%|(?<![a-z0-9])per cent(?![a-z0-9]))")
+NUMBER_PATTERN = re.compile(NUMBER)
+# Signs and comparators change a claim's meaning ("-2%" vs "2%", "> 5%" vs "< 5%"), so they become words before punctuation is folded
+COMPARATOR_WORDS = {
+    ">=": "greater than or equal to", "≥": "greater than or equal to", "<=": "less than or equal to", "≤": "less than or equal to",
+    "!=": "not equal to", "≠": "not equal to", ">": "greater than", "<": "less than"
+}
+COMPARATOR_PATTERN = re.compile(r"(>=|<=|!=|≥|≤|≠|>|<)")
+SIGN_WORDS = {"-": "minus", "−": "minus", "+": "plus"}
+SIGN_PATTERN = re.compile(r"(?<![\w.])([-−+])(?=[0-9])")  # A sign directly before a number, not a hyphen inside a word or range
+STRAY_PERIOD_PATTERN = re.compile(r"(?<![0-9])\.|\.(?![0-9])")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def shift_decimal(number: str, zeros: int) -> str:
+    """
+    Multiply a decimal number string by 10**zeros without floating point rounding
+    """
+    integer_part, _, fraction = number.partition(".")
+    fraction = fraction.ljust(zeros, "0")
+    shifted = integer_part + fraction[:zeros]
+    return shifted + ("." + fraction[zeros:] if fraction[zeros:] else "")
+
+
+def canonical_number(number: str) -> str:
+    """
+    Drop leading zeros and trailing fractional zeros ("050000.00" -> "50000", "3.50" -> "3.5")
+    """
+    integer_part, _, fraction = number.partition(".")
+    integer_part = integer_part.lstrip("0") or "0"
+    fraction = fraction.rstrip("0")
+    return integer_part + ("." + fraction if fraction else "")
+
+
+def normalize_claim_text(claim_text: str) -> str:
+    """
+    Canonicalize a claim for exact matching
+
+    Steps: Unicode NFKC; strip emoji, symbols and quotes; lowercase; fold thousands
+    separators, magnitudes ("50k", "1.5 million"), currency symbols and words
+    ("$", "dollars" -> "usd") and "%"; canonicalize numbers; spell out signs
+    and comparators ("-5" -> "minus 5", ">" -> "greater than"); replace remaining
+    punctuation with spaces and collapse whitespace.
+
+    Args:
+        claim_text (str): The original news claim text
+
+    Returns:
+        str: Canonical claim text
+    """
+    if not claim_text:
+        return ""
+    text = unicodedata.normalize("NFKC", claim_text)
+    text = "".join(
+        ch for ch in text
+        if unicodedata.category(ch) not in STRIPPED_CATEGORIES and not "︀" <= ch <= "️"  # Variation selectors
+    )
+    text = QUOTE_PATTERN.sub("", text)
+    text = text.lower()
+
+    text = THOUSANDS_SEPARATOR_PATTERN.sub(r"\1", text)
+    text = MAGNITUDE_PATTERN.sub(lambda m: shift_decimal(m.group(1), MAGNITUDE_ZEROS[m.group(2)]), text)
+    text = CURRENCY_BEFORE_NUMBER_PATTERN.sub(lambda m: f"{m.group(2)} {CURRENCY_SYMBOLS[m.group(1)]}", text)
+    text = CURRENCY_AFTER_NUMBER_PATTERN.sub(lambda m: f"{m.group(1)} {CURRENCY_SYMBOLS[m.group(2)]}", text)
+    text = CURRENCY_WORD_PATTERN.sub(lambda m: CURRENCY_WORDS[m.group(1)], text)
+    text = PERCENT_PATTERN.sub(" percent", text)
+    text = NUMBER_PATTERN.sub(lambda m: canonical_number(m.group(0)), text)
+    text = SIGN_PATTERN.sub(lambda m: SIGN_WORDS[m.group(1)] + " ", text)
+    text = COMPARATOR_PATTERN.sub(lambda m: " " + COMPARATOR_WORDS[m.group(1)] + " ", text)
+
+    # Fold punctuation (keeping decimal points) and whitespace
+    text = STRAY_PERIOD_PATTERN.sub(" ", text)
+    text = "".join(ch if ch == "." or ch.isspace() or unicodedata.category(ch)[0] in "LMN" else " " for ch in text)
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
@@ -0,0 +1,391 @@
+"""
+Claim partition utilities for the Fake News Detector
+Contains the partitioned claim store: timeless claims stay in the permanent
+claims_history collection, time-dependent claims go to rolling time buckets
+(claims_history_YYYYMMDD, one per day or week) that are dropped wholesale
+once no query could still accept them, and lookups only search the partitions
+that can hold a valid match
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from chromadb.errors import NotFoundError
+
+from db_utils import CLAIMS_COLLECTION_NAME
+
+logger = logging.getLogger(__name__)
+
+# Partition configuration
+CLAIM_PARTITIONING = os.getenv("CLAIM_PARTITIONING", "true").lower() in ("1", "true", "yes")
+PARTITION_BUCKET_DAYS = int(os.getenv("PARTITION_BUCKET_DAYS", "7"))  # 7 = weekly buckets, 1 = daily buckets
+PARTITION_MAX_AGE_DAYS = int(os.getenv("PARTITION_MAX_AGE_DAYS", "365"))  # Longest dependency duration the time dependency check assigns
+PARTITION_DROP_INTERVAL_SECONDS = float(os.getenv("PARTITION_DROP_INTERVAL_SECONDS", "3600"))
+PARTITION_LIST_REFRESH_SECONDS = float(os.getenv("PARTITION_LIST_REFRESH_SECONDS", "30"))  # Picks up buckets created by other workers
+PARTITION_INDEX_MAX_ENTRIES = int(os.getenv("PARTITION_INDEX_MAX_ENTRIES", "100000"))  # Claim id -> partition entries remembered for routing writes
+
+
+def is_expiring(info: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether a claim (time dependency info or stored metadata) belongs in a time bucket
+    """
+    return bool(info) and bool(info.get("is_time_dependent")) and int(info.get("dependency_duration_days") or 0) > 0
+
+
+def bucket_start(day: date, bucket_days: int = PARTITION_BUCKET_DAYS) -> date:
+    # date.fromordinal(1) is a Monday, so weekly buckets start on Mondays
+    ordinal = day.toordinal()
+    return date.fromordinal(ordinal - (ordinal - 1) % bucket_days)
+
+
+def bucket_name(day: date, base_name: str = CLAIMS_COLLECTION_NAME, bucket_days: int = PARTITION_BUCKET_DAYS) -> str:
+    return f"{base_name}_{bucket_start(day, bucket_days):%Y%m%d}"
+
+
+def parse_bucket_name(name: str, base_name: str = CLAIMS_COLLECTION_NAME) -> Optional[date]:
+    """
+    Start date of a bucket collection, or None if the name is not a bucket of base_name
+    """
+    prefix = base_name + "_"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def claim_date(metadata: Dict[str, Any]) -> date:
+    try:
+        return datetime.fromisoformat(str(metadata.get("timestamp")).replace("Z", "+00:00")).date()
+    except ValueError:
+        return datetime.utcnow().date()
+
+
+class PartitionedClaims:
+    """
+    Claim store spread over a permanent collection and time-bucket collections,
+    with the ChromaDB collection interface used by the backend. count, get and
+    query take an optional time_dependency_info to search only the partitions
+    that can hold a valid match for that claim; without it they cover every partition.
+    """
+
+    def __init__(self,
+                 client,
+                 embedding_function=None,
+                 base_name: str = CLAIMS_COLLECTION_NAME,
+                 enabled: bool = CLAIM_PARTITIONING,
+                 bucket_days: int = PARTITION_BUCKET_DAYS,
+                 max_age_days: int = PARTITION_MAX_AGE_DAYS,
+                 index_max_entries: int = PARTITION_INDEX_MAX_ENTRIES):
+        """
+        Args:
+            client: ChromaDB client or StoreClient
+            embedding_function: Embedding function of the collections (embeds query_texts once for all partitions)
+            base_name (str): Name of the permanent collection, also the prefix of the buckets
+            enabled (bool): If False, every claim stays in the permanent collection
+            bucket_days (int): Days covered by one bucket
+            max_age_days (int): Age after which a bucket is dropped
+            index_max_entries (int): Claims whose partition is remembered (least recently seen are forgotten first)
+        """
+        self.client = client
+        self.embedding_function = embedding_function
+        self.name = base_name
+        self.enabled = enabled
+        self.bucket_days = max(1, bucket_days)
+        self.max_age_days = max_age_days
+        self.buckets_dropped = 0
+        self.index_max_entries = index_max_entries
+        self._owners: "OrderedDict[str, str]" = OrderedDict()  # Claim id -> partition it was last seen in
+        self._collections = {}
+        self._bucket_names = set()
+        self._listed_at = float("-inf")
+        self._lock = threading.Lock()
+        self.permanent = self._open(base_name)
+        self._refresh_buckets(force=True)
+
+    def _open(self, name: str, create: bool = True):
+        with self._lock:
+            if name in self._collections:
+                return self._collections[name]
+        kwargs = {"embedding_function": self.embedding_function} if self.embedding_function is not None else {}
+        if create:
+            collection = self.client.get_or_create_collection(name=name, **kwargs)
+        else:
+            collection = self.client.get_collection(name=name, **kwargs)
+        with self._lock:
+            self._collections[name] = collection
+            if name != self.name:
+                self._bucket_names.add(name)
+        return collection
+
+    def _forget(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+            self._bucket_names.discard(name)
+
+    def _remember(self, name: str, ids):
+        with self._lock:
+            for claim_id in ids:
+                self._owners[claim_id] = name
+                self._owners.move_to_end(claim_id)
+            while len(self._owners) > self.index_max_entries:
+                self._owners.popitem(last=False)
+
+    def _read(self, name: str, operation: Callable, default: Any = None) -> Any:
+        """
+        Run an operation on an existing partition without creating it; a bucket
+        dropped in the meantime (by this or another worker) reads as empty
+        """
+        try:
+            return operation(self._open(name, create=False))
+        except NotFoundError:
+            self._forget(name)
+            return default
+
+    def _refresh_buckets(self, force: bool = False):
+        if not force and time.monotonic() - self._listed_at < PARTITION_LIST_REFRESH_SECONDS:
+            return
+        names = {getattr(collection, "name", collection) for collection in self.client.list_collections()}
+        with self._lock:
+            self._bucket_names = {name for name in names if parse_bucket_name(name, self.name)}
+            self._listed_at = time.monotonic()
+
+    def partition_names(self, time_dependency_info: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Partitions to search, newest bucket first: the buckets inside the dependency
+        window for a time-dependent claim, the permanent collection for a timeless one,
+        and everything when no time dependency info is given
+        """
+        self._refresh_buckets()
+        with self._lock:
+            buckets = sorted(self._bucket_names, reverse=True)
+        if time_dependency_info is None:
+            return buckets + [self.name]
+        if not self.enabled or not is_expiring(time_dependency_info):
+            return [self.name]
+        window_days = min(int(time_dependency_info["dependency_duration_days"]), self.max_age_days)
+        oldest = bucket_start(datetime.utcnow().date() - timedelta(days=window_days), self.bucket_days)
+        return [name for name in buckets if parse_bucket_name(name, self.name) >= oldest]
+
+    def partition_for(self, metadata: Optional[Dict[str, Any]]) -> str:
+        if not self.enabled or not is_expiring(metadata):
+            return self.name
+        return bucket_name(claim_date(metadata), self.name, self.bucket_days)
+
+    def count(self, time_dependency_info: Optional[Dict[str, Any]] = None) -> int:
+        return sum(self._read(name, lambda collection: collection.count(), 0) for name in self.partition_names(time_dependency_info))
+
+    def query(self, query_texts=None, query_embeddings=None, n_results: int = 10, where=None, include=None, time_dependency_info=None) -> Dict[str, Any]:
+        """
+        Query the relevant partitions and merge their nearest neighbours by distance
+        """
+        if query_embeddings is None and self.embedding_function is not None:
+            query_embeddings = self.embedding_function(query_texts)
+        query_input = {"query_embeddings": query_embeddings} if query_embeddings is not None else {"query_texts": query_texts}
+        include = list(include or ["metadatas", "documents", "distances"])
+        if "distances" not in include:
+            include.append("distances")
+        fields = [field for field in include if field != "distances"]
+
+        query_count = len(query_embeddings if query_embeddings is not None else query_texts)
+        candidates = [[] for _ in range(query_count)]
+        # One store call per partition: ChromaDB returns fewer than n_results (or none) from a
+        # partition holding fewer claims, so no count round trip is needed first
+        for name in self.partition_names(time_dependency_info):
+            result = self._read(name, lambda collection: collection.query(**query_input, n_results=n_results, where=where, include=include))
+            if result is None:
+                continue
+            self._remember(name, [claim_id for ids in result["ids"] for claim_id in ids])
+            for q in range(query_count):
+                for i, claim_id in enumerate(result["ids"][q]):
+                    values = {field: result[field][q][i] for field in fields if result.get(field) is not None}
+                    candidates[q].append((result["distances"][q][i], claim_id, values))
+
+        merged = {"ids": [], "distances": [], **{field: [] for field in fields}}
+        for query_candidates in candidates:
+            query_candidates.sort(key=lambda candidate: candidate[0])
+            # A claim can briefly have a stale copy in an older bucket (see upsert); keep its closest copy
+            seen = set()
+            top = [candidate for candidate in query_candidates if not (candidate[1] in seen or seen.add(candidate[1]))][:n_results]
+            merged["ids"].append([claim_id for _, claim_id, _ in top])
+            merged["distances"].append([distance for distance, _, _ in top])
+            for field in fields:
+                merged[field].append([values.get(field) for _, _, values in top])
+        return merged
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None, time_dependency_info=None) -> Dict[str, Any]:
+        """
+        Get claims by ID from the relevant partitions, or page through all of them
+        """
+        include = list(include if include is not None else ["metadatas", "documents"])
+        merged = {"ids": [], **{field: [] for field in include}}
+
+        def extend(result):
+            merged["ids"].extend(result["ids"])
+            for field in include:
+                values = result.get(field)
+                merged[field].extend(list(values) if values is not None else [None] * len(result["ids"]))
+
+        names = self.partition_names(time_dependency_info)
+        if ids is not None or where is not None:
+            seen = set()
+            for name in names:
+                result = self._read(name, lambda collection: collection.get(ids=ids, where=where, include=include))
+                if result is None:
+                    continue
+                self._remember(name, result["ids"])
+                keep = [i for i, claim_id in enumerate(result["ids"]) if claim_id not in seen]
+                seen.update(result["ids"])
+                extend({"ids": [result["ids"][i] for i in keep],
+                        **{field: [result[field][i] for i in keep] if result.get(field) is not None else None for field in include}})
+            start = offset or 0
+            end = start + limit if limit is not None else None
+            return {key: values[start:end] for key, values in merged.items()}
+
+        # Page through the partitions in order without loading them whole
+        skip = offset or 0
+        remaining = limit
+        for name in names:
+            if remaining is not None and remaining <= 0:
+                break
+            count = self._read(name, lambda collection: collection.count(), 0)
+            if skip >= count:
+                skip -= count
+                continue
+            result = self._read(name, lambda collection: collection.get(limit=remaining, offset=skip, include=include))
+            if result is None:
+                continue
+            self._remember(name, result["ids"])
+            extend(result)
+            if remaining is not None:
+                remaining = limit - len(merged["ids"])
+            skip = 0
+        return merged
+
+    def _locate(self, ids) -> Dict[str, List[str]]:
+        """
+        Find the partition holding each claim (a claim is stored in one partition only):
+        remembered partitions first, then the others until every claim is found
+
+        Returns:
+            Dict[str, List[str]]: Partition name -> IDs of the claims it holds
+        """
+        located = self._remembered(ids)
+        missing = set(ids) - {claim_id for found in located.values() for claim_id in found}
+        for name in self.partition_names():
+            if not missing:
+                break
+            existing = self._read(name, lambda collection: collection.get(ids=list(missing), include=[]))
+            found = [claim_id for claim_id in (existing or {"ids": []})["ids"] if claim_id in missing]
+            if found:
+                located.setdefault(name, []).extend(found)
+                missing.difference_update(found)
+        return located
+
+    def _remembered(self, ids) -> Dict[str, List[str]]:
+        located = {}
+        with self._lock:
+            for claim_id in ids:
+                if claim_id in self._owners:
+                    located.setdefault(self._owners[claim_id], []).append(claim_id)
+        return located
+
+    def upsert(self, ids, documents=None, embeddings=None, metadatas=None) -> None:
+        """
+        Write claims to the partition chosen by their metadata. A re-analyzed claim that
+        changed partition is deleted from its previous one, taken from the claim id ->
+        partition index that reads and writes keep (a lookup always precedes a re-analysis);
+        claims missing from the index are only looked for in the permanent collection.
+        A copy left behind in an older bucket expires with it, and lookups keep one copy per claim.
+        """
+        groups = {}
+        for i in range(len(ids)):
+            groups.setdefault(self.partition_for(metadatas[i] if metadatas else None), []).append(i)
+
+        for name, indices in groups.items():
+            group_ids = [ids[i] for i in indices]
+            previous = self._remembered(group_ids)
+            unknown = set(group_ids) - {claim_id for found in previous.values() for claim_id in found}
+            if unknown and name != self.name:
+                existing = self._read(self.name, lambda collection: collection.get(ids=list(unknown), include=[]))
+                if existing and existing["ids"]:
+                    previous.setdefault(self.name, []).extend(existing["ids"])
+            self._open(name).upsert(
+                ids=group_ids,
+                documents=[documents[i] for i in indices] if documents is not None else None,
+                embeddings=[embeddings[i] for i in indices] if embeddings is not None else None,
+                metadatas=[metadatas[i] for i in indices] if metadatas is not None else None
+            )
+            # A re-analyzed claim may have changed partition (time dependency or day)
+            for other, moved_ids in previous.items():
+                if other != name:
+                    self._read(other, lambda collection: collection.delete(ids=moved_ids))
+            self._remember(name, group_ids)
+
+    def update(self, ids, documents=None, embeddings=None, metadatas=None) -> None:
+        """
+        Update claims in place, in whichever partition holds them
+        """
+        positions = {claim_id: i for i, claim_id in enumerate(ids)}
+        for name, found in self._locate(ids).items():
+            indices = [positions[claim_id] for claim_id in found]
+            self._read(name, lambda collection: collection.update(
+                ids=found,
+                documents=[documents[i] for i in indices] if documents is not None else None,
+                embeddings=[embeddings[i] for i in indices] if embeddings is not None else None,
+                metadatas=[metadatas[i] for i in indices] if metadatas is not None else None
+            ))
+
+    def delete(self, ids) -> None:
+        for name in self.partition_names():
+            self._read(name, lambda collection: collection.delete(ids=ids))
+
+    def drop_expired(self, today: Optional[date] = None) -> List[str]:
+        """
+        Drop buckets whose newest possible claim is older than max_age_days.
+        Expiry deliberately ignores the dependency_duration_days stored with each
+        claim: a lookup accepts a stored claim within the dependency window of the
+        claim being checked (see partition_names and is_cached_data_too_old), so a
+        claim stored with a 3-day duration still answers a 90-day lookup. A bucket
+        can only go once no lookup window (at most max_age_days) reaches it.
+
+        Returns:
+            List[str]: Names of the dropped buckets
+        """
+        self._refresh_buckets(force=True)
+        cutoff = (today or datetime.utcnow().date()) - timedelta(days=self.max_age_days)
+        with self._lock:
+            expired = [name for name in self._bucket_names if parse_bucket_name(name, self.name) + timedelta(days=self.bucket_days) <= cutoff]
+        dropped = []
+        for name in sorted(expired):
+            try:
+                self.client.delete_collection(name)
+                dropped.append(name)
+            except Exception as e:
+                # Another worker may have dropped it first
+                logger.warning("Error dropping expired partition %s: %s", name, e)
+            self._forget(name)
+        if dropped:
+            self.buckets_dropped += len(dropped)
+            logger.info("Dropped %s expired claim partitions: %s", len(dropped), dropped)
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Partition statistics for the metrics endpoint
+        """
+        names = self.partition_names()
+        return {
+            "enabled": self.enabled,
+            "bucket_days": self.bucket_days,
+            "max_age_days": self.max_age_days,
+            "buckets": len(names) - 1,
+            "buckets_dropped": self.buckets_dropped,
+            "claims": {name: self._read(name, lambda collection: collection.count(), 0) for name in names}
+        }
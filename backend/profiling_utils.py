@@ -0,0 +1,179 @@
+"""
+Profiling utilities for the Fake News Detector
+Contains per-stage time counters (wall time, time blocked in sync SDK calls,
+embedding CPU time) and an on-demand sampling profiler that produces
+collapsed stacks for flamegraph tools
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Profiling configuration
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+current_stage: ContextVar[str] = ContextVar("pipeline_stage", default="other")
+
+
+class StageCounters:
+    """
+    Thread-safe accumulated timings per pipeline stage
+    """
+
+    def __init__(self):
+        self._counters = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, counter: str, value: float):
+        with self._lock:
+            self._counters[stage][counter] += value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage counters for the metrics endpoint; awaiting_seconds is the part of a
+        stage's wall time not spent blocked in its own sync SDK calls
+        """
+        with self._lock:
+            snapshot = {stage: dict(counters) for stage, counters in self._counters.items()}
+        for counters in snapshot.values():
+            if "wall_seconds" in counters:
+                counters["awaiting_seconds"] = max(0.0, counters["wall_seconds"] - counters.get("sync_sdk_seconds", 0.0))
+            for key, value in counters.items():
+                counters[key] = round(value, 4)
+        return snapshot
+
+
+stage_counters = StageCounters()
+
+
+@contextmanager
+def pipeline_stage(name: str):
+    """
+    Attribute everything run inside the block (including worker threads and embedding
+    batches started from it) to a pipeline stage and count its wall time
+    """
+    token = current_stage.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_counters.add(name, "wall_seconds", time.perf_counter() - start)
+        stage_counters.add(name, "calls", 1)
+        current_stage.reset(token)
+
+
+async def run_sync_sdk(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking SDK call in a worker thread, counting the time it blocks that
+    thread against the current pipeline stage
+    """
+    stage = current_stage.get()
+
+    def timed_call():
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stage_counters.add(stage, "sync_sdk_seconds", time.perf_counter() - start)
+            stage_counters.add(stage, "sync_sdk_calls", 1)
+
+    return await asyncio.to_thread(timed_call)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads at a fixed interval from a background thread
+    and aggregates them as collapsed stacks ("frame;frame;frame count" lines), the
+    input format of flamegraph.pl and speedscope
+    """
+
+    def __init__(self, interval_ms: float = PROFILER_INTERVAL_MS):
+        self.interval_seconds = max(0.001, interval_ms / 1000.0)
+        self.samples = Counter()
+        self.requests_remaining = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, requests: Optional[int] = None):
+        """
+        Start sampling (until stop() or, when requests is given, until that many requests finished)
+
+        Raises:
+            RuntimeError: If a profile is already running
+        """
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already running")
+            self.samples = Counter()
+            self.requests_remaining = requests
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info("Sampling profiler started (interval %.1f ms, requests %s)", self.interval_seconds * 1000.0, requests)
+
+    def request_finished(self):
+        """
+        Count a finished request when profiling a fixed number of requests
+        """
+        with self._lock:
+            if self.requests_remaining is None or not self.running:
+                return
+            self.requests_remaining -= 1
+            if self.requests_remaining <= 0:
+                self._stop.set()
+
+    async def wait(self, timeout: float):
+        """
+        Wait until the profile stops on its own or the timeout passes
+        """
+        await asyncio.to_thread(self._stop.wait, timeout)
+
+    def stop(self) -> str:
+        """
+        Stop sampling and return the collapsed stacks
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info("Sampling profiler stopped with %s samples", sum(self.samples.values()))
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def _run(self):
+        own_thread = threading.get_ident()
+        thread_names = {}
+        while not self._stop.wait(self.interval_seconds):
+            if len(thread_names) != threading.active_count():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+profiler = SamplingProfiler()
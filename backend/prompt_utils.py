@@ -0,0 +1,260 @@
+"""
+Prompt template utilities for the Fake News Detector
+Contains the static system instructions of the Gemini prompts and builders for
+their small per-claim payloads, the per-template models that carry those
+instructions (as a system instruction or provider-side cached content) and prompt
+token accounting
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict
+
+from evidence_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Prompt configuration
+PROMPT_TEMPLATES = os.getenv("PROMPT_TEMPLATES", "true").lower() in ("1", "true", "yes")  # false: resend the instructions inline with every request
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+GEMINI_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "32768"))  # Smallest content Gemini agrees to cache
+CONTEXT_CACHE_REFRESH_SHARE = 0.9  # Recreate cached content after this share of its TTL
+VERSIONED_MODEL_PATTERN = re.compile(r"-\d{3}$")  # Context caching needs a fixed model version, e.g. gemini-1.5-flash-002
+
+
+class PromptTemplate:
+    """
+    A prompt split into static system instructions (sent once per model) and a payload built per claim
+    """
+
+    def __init__(self, name: str, system_instruction: str, build_payload: Callable[..., str]):
+        """
+        Args:
+            name (str): Template name, also the pipeline stage the prompt belongs to
+            system_instruction (str): Instructions and output format shared by every request
+            build_payload (Callable): Builds the per-claim part of the prompt
+        """
+        self.name = name
+        self.system_instruction = system_instruction
+        self.build_payload = build_payload
+
+    def contents(self, *args, inline: bool = not PROMPT_TEMPLATES) -> str:
+        """
+        What is sent with each request: the payload, or instructions and payload together when inline
+        """
+        payload = self.build_payload(*args)
+        return f"{self.system_instruction}\n\n{payload}" if inline else payload
+
+
+def format_search_results(search_results: list) -> str:
+    """
+    Format the selected search results for the verdict payload
+    """
+    if not search_results:
+        return "No web search results were available for analysis.\n\n"
+    search_summary = "Based on the following web search results from multiple sources:\n\n"
+    for i, result in enumerate(search_results, 1):
+        search_summary += f"{i}. Title: {result.get('title', 'No title')}\n"
+        search_summary += f"   Content: {result.get('snippet', 'No content')}\n"
+        search_summary += f"   Source: {result.get('source', 'Unknown')}\n\n"
+    return search_summary
+
+
+REFINEMENT_PROMPT = PromptTemplate("refinement", """You are an expert fact-checker. Your task is to refine the news claim given as ORIGINAL CLAIM to make it more suitable for web search while preserving its core meaning.
+
+INSTRUCTIONS:
+
+1. Break down the claim into specific, verifiable elements:
+   - Exact numbers and quantities
+   - Specific time periods
+   - Precise locations
+   - Specific entities or names
+
+2. Rewrite the claim to be more searchable by:
+   - Adding specific dates if time period is mentioned
+   - Including full names of locations
+   - Specifying exact numbers
+   - Adding relevant context
+
+3. Format the claim as a question that can be fact-checked:
+   - Start with "Is it true that..."
+   - Include specific details that can be verified
+   - Make the claim more precise and unambiguous
+
+4. Important rules:
+   - Do not add information that wasn't in the original claim
+   - Keep the refined claim concise but specific
+   - If the claim is already well-formed, still format it as a question
+   - Ensure the refined claim maintains the original claim's meaning
+
+Return your response as JSON with the refined claim.""", lambda claim_text: f"ORIGINAL CLAIM:\n{claim_text}")
+
+DECOMPOSITION_PROMPT = PromptTemplate("decomposition", """You are an expert fact-checker. Split the news claim given as CLAIM TO SPLIT into its atomic factual sub-claims so each one can be verified on its own.
+
+INSTRUCTIONS:
+1. Each sub-claim must state exactly one verifiable fact (an event, a number, a date, a cause, a cost)
+2. Each sub-claim must be self-contained: repeat names, places and dates instead of using pronouns
+3. Do not add information that wasn't in the original claim
+4. If the claim states only one fact, return it unchanged as the only sub-claim
+
+Return your response as JSON with a "sub_claims" field containing a list of strings.""", lambda claim_text: f'CLAIM TO SPLIT:\n"{claim_text}"')
+
+VERDICT_PROMPT = PromptTemplate("verdict", """You are an expert fact-checker analyzing news claims for truthfulness. Analyze the claim given as CLAIM TO ANALYZE based ONLY on the search results given as GROUND TRUTH.
+
+INSTRUCTIONS:
+1. Assess the likely truthfulness of the claim based ONLY on the provided information
+2. Provide one of these verdicts: "Likely True", "Likely False", "Uncertain/Needs More Info"
+3. Provide a brief explanation for your verdict
+4. If search results are insufficient, indicate this in your verdict
+5. Give higher priority to government sources, then news sources, then other sources
+
+Return your response as JSON with the "verdict" field first, followed by the "explanation" field.""",
+    lambda claim_text, search_results: f'CLAIM TO ANALYZE:\n"{claim_text}"\n\nGROUND TRUTH (SEARCH RESULTS):\n{format_search_results(search_results)}')
+
+TIME_DEPENDENCY_PROMPT = PromptTemplate("time_dependency", """You are an expert fact-checker analyzing news claims for time dependency. Analyze the claim given as CLAIM TO ANALYZE to determine if its truthfulness depends on current or recent events that change over time.
+
+INSTRUCTIONS:
+
+1. Determine if this claim is time-dependent by checking if it relates to:
+   - Current events (politics, breaking news, ongoing situations)
+   - Stock prices, market conditions, or financial data
+   - Weather or environmental conditions
+   - Sports scores, rankings, or current competitions
+   - Real-time statistics or data
+   - Ongoing conflicts, elections, or political situations
+   - Current policies, laws, or regulations that change frequently
+   - Social media trends or viral content
+   - Technology updates, software versions, or product releases
+
+2. If the claim is time-dependent, estimate how many days the information remains relevant:
+   - Breaking news, stock prices, weather: 1-3 days
+   - Political developments, ongoing events: 7-14 days
+   - Sports seasons, quarterly reports: 30-90 days
+   - Annual statistics, yearly reports: 180-365 days
+
+3. If the claim is NOT time-dependent, it includes:
+   - Historical facts and events
+   - Scientific principles and laws
+   - Biographical information
+   - Geographic facts
+   - Mathematical or logical statements
+   - Established scientific discoveries
+
+Return your response as JSON with "is_time_dependent" (boolean) and "dependency_duration_days" (integer) fields only.""", lambda claim_text: f'CLAIM TO ANALYZE:\n"{claim_text}"')
+
+
+class TemplateModels:
+    """
+    One Gemini model per prompt template, created on first use with the template's
+    static instructions attached, plus per-template prompt token and latency accounting
+    """
+
+    def __init__(self, model_name: str, use_templates: bool = PROMPT_TEMPLATES, context_cache: bool = GEMINI_CONTEXT_CACHE,
+                 cache_ttl_seconds: float = GEMINI_CONTEXT_CACHE_TTL_SECONDS, cache_min_tokens: int = GEMINI_CONTEXT_CACHE_MIN_TOKENS):
+        """
+        Args:
+            model_name (str): Gemini model name
+            use_templates (bool): Attach the instructions to the model; if False every request carries them inline
+            context_cache (bool): Use provider-side cached content for templates large enough to be cached
+            cache_ttl_seconds (float): Lifetime of the cached content
+            cache_min_tokens (int): Smallest instructions (estimated tokens) the provider caches
+        """
+        self.model_name = model_name
+        self.use_templates = use_templates
+        self.context_cache = context_cache and use_templates
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.cache_min_tokens = cache_min_tokens
+        if self.context_cache and not VERSIONED_MODEL_PATTERN.search(model_name):
+            logger.warning("Context cache disabled: Gemini only caches content for versioned models (e.g. %s-002), not %s", model_name, model_name)
+            self.context_cache = False
+        self._models: Dict[str, tuple] = {}  # template name -> (model, mode, expires_at)
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[str, float]] = {}
+
+    def contents(self, template: PromptTemplate, *args) -> str:
+        """
+        Per-request contents for a template under the configured mode
+        """
+        return template.contents(*args, inline=not self.use_templates)
+
+    def get(self, genai, template: PromptTemplate):
+        """
+        Model carrying the template's instructions (blocking: creating cached content is an API call)
+
+        Args:
+            genai: The google.generativeai module (or a stand-in)
+            template (PromptTemplate): Prompt template
+        """
+        with self._lock:
+            cached = self._models.get(template.name)
+            if cached and (cached[2] is None or time.time() < cached[2]):
+                return cached[0]
+
+            expires_at = None
+            if not self.use_templates:
+                model, mode = genai.GenerativeModel(self.model_name), "inline"
+            else:
+                model, mode = None, "system_instruction"
+                instruction_tokens = estimate_tokens(template.system_instruction)
+                if self.context_cache and instruction_tokens < self.cache_min_tokens:
+                    # Logged once: the system instruction model is kept for the life of the process
+                    logger.info("Context cache disabled for the %s prompt: ~%s instruction tokens, below the %s-token caching minimum",
+                                template.name, instruction_tokens, self.cache_min_tokens)
+                elif self.context_cache:
+                    try:
+                        cached_content = genai.caching.CachedContent.create(
+                            model=f"models/{self.model_name}",
+                            display_name=f"fake-news-detector-{template.name}",
+                            system_instruction=template.system_instruction,
+                            ttl=timedelta(seconds=self.cache_ttl_seconds)
+                        )
+                        model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+                        mode = "context_cache"
+                        expires_at = time.time() + self.cache_ttl_seconds * CONTEXT_CACHE_REFRESH_SHARE
+                    except Exception as e:
+                        # The system instruction still avoids resending the instructions
+                        logger.warning("Context cache unavailable for the %s prompt, using a system instruction: %s", template.name, e)
+                if model is None:
+                    model = genai.GenerativeModel(self.model_name, system_instruction=template.system_instruction)
+            logger.info("Created Gemini model for the %s prompt (%s)", template.name, mode)
+            self._models[template.name] = (model, mode, expires_at)
+            return model
+
+    def record_usage(self, stage: str, usage_metadata: Any, contents: str, seconds: float):
+        """
+        Count the prompt tokens Gemini reported for a call (prompt_token_count includes
+        system instructions; cached_content_token_count is the part served from the cache)
+        """
+        usage = self._usage.setdefault(stage, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "payload_tokens": 0, "seconds": 0.0})
+        usage["calls"] += 1
+        usage["payload_tokens"] += estimate_tokens(contents)
+        usage["seconds"] += seconds
+        if usage_metadata is not None:
+            usage["prompt_tokens"] += getattr(usage_metadata, "prompt_token_count", 0) or 0
+            usage["cached_tokens"] += getattr(usage_metadata, "cached_content_token_count", 0) or 0
+            usage["output_tokens"] += getattr(usage_metadata, "candidates_token_count", 0) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Per-template prompt statistics for the metrics endpoint (means per call)
+        """
+        stats = {}
+        for stage, usage in self._usage.items():
+            calls = usage["calls"]
+            model = self._models.get(stage)
+            stats[stage] = {
+                "mode": model[1] if model else ("inline" if not self.use_templates else None),
+                "calls": calls,
+                "mean_prompt_tokens": round(usage["prompt_tokens"] / calls, 1),
+                "mean_cached_tokens": round(usage["cached_tokens"] / calls, 1),
+                "mean_uncached_prompt_tokens": round((usage["prompt_tokens"] - usage["cached_tokens"]) / calls, 1),
+                "mean_output_tokens": round(usage["output_tokens"] / calls, 1),
+                "mean_payload_tokens_estimate": round(usage["payload_tokens"] / calls, 1),
+                "mean_latency_ms": round(usage["seconds"] * 1000.0 / calls, 1)
+            }
+        return stats
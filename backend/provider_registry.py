@@ -0,0 +1,86 @@
+"""
+Provider registry for the Fake News Detector
+Contains lazily-initialized SDK clients, so a provider's SDK is only imported
+when the provider is enabled and first used
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyProvider:
+    """
+    SDK client created by a factory on first use. The factory performs the SDK
+    import, so disabled or unused providers never pay for it.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], enabled: bool = True, disabled_reason: str = ""):
+        """
+        Args:
+            name (str): Provider name for logging and metrics
+            factory (Callable): Imports the SDK and returns a ready client
+            enabled (bool): Whether the provider is configured and allowed
+            disabled_reason (str): Why the provider is disabled, for logging
+        """
+        self.name = name
+        self.factory = factory
+        self.enabled = enabled
+        self.disabled_reason = disabled_reason
+        self.load_seconds = None
+        self._client = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Any]:
+        """
+        Return the client, importing and creating it on the first call
+
+        Returns:
+            Optional[Any]: The client, or None if the provider is disabled or failed to load
+        """
+        if not self.enabled or self._failed:
+            return None
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None and not self._failed:
+                start = time.perf_counter()
+                try:
+                    self._client = self.factory()
+                    self.load_seconds = time.perf_counter() - start
+                    logger.info("Loaded %s provider in %.3fs", self.name, self.load_seconds)
+                except Exception as e:
+                    # Typically ImportError when the provider's SDK is not installed
+                    self._failed = True
+                    logger.error("Failed to load %s provider, disabling it: %s", self.name, e)
+        return self._client
+
+    async def get_async(self) -> Optional[Any]:
+        """
+        Async variant of get() that runs the first (importing) call in a worker thread
+        so a slow SDK import never blocks the event loop
+        """
+        if self._client is not None:
+            return self._client
+        return await asyncio.to_thread(self.get)
+
+    @property
+    def available(self) -> bool:
+        """
+        Whether the provider is enabled and has not failed to load (without loading it)
+        """
+        return self.enabled and not self._failed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "loaded": self._client is not None,
+            "failed": self._failed,
+            "load_seconds": round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            "disabled_reason": self.disabled_reason or None
+        }
@@ -0,0 +1,323 @@
+"""
+Quota utilities for the Fake News Detector
+Contains API-key client identification, per-client token buckets that charge
+every request (cheap claim-history hits) separately from full analyses
+(LLM and search calls), and the scheduler that shares full-analysis slots
+round-robin between clients
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Quota configuration
+QUOTAS_ENABLED = os.getenv("QUOTAS_ENABLED", "true").lower() in ("1", "true", "yes")
+REQUIRE_API_KEY = os.getenv("REQUIRE_API_KEY", "false").lower() in ("1", "true", "yes")
+QUOTA_REQUESTS_PER_MINUTE = float(os.getenv("QUOTA_REQUESTS_PER_MINUTE", "120"))
+QUOTA_REQUEST_BURST = float(os.getenv("QUOTA_REQUEST_BURST", "60"))
+QUOTA_ANALYSES_PER_MINUTE = float(os.getenv("QUOTA_ANALYSES_PER_MINUTE", "10"))
+QUOTA_ANALYSIS_BURST = float(os.getenv("QUOTA_ANALYSIS_BURST", "5"))
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", "4"))
+ANONYMOUS_CLIENTS_MAX = int(os.getenv("ANONYMOUS_CLIENTS_MAX", "10000"))  # Per-address anonymous clients tracked before the least recent is dropped
+ANALYSIS_QUEUE_RETRY_AFTER_SECONDS = 5  # Retry-After sent when no analysis slot frees up in time
+
+API_KEY_HEADER = "X-API-Key"
+ANONYMOUS_CLIENT = "anonymous"
+CLIENT_LATENCY_WINDOW = 500  # Latest latencies kept per client for percentiles
+
+
+def is_anonymous(client: str) -> bool:
+    return client == ANONYMOUS_CLIENT or client.startswith(f"{ANONYMOUS_CLIENT}:")
+
+
+def parse_api_keys(value: str) -> Dict[str, str]:
+    """
+    Parse API_KEYS ("key1:partner-a,key2:partner-b") into a key -> client name map
+    """
+    api_keys = {}
+    for entry in value.split(","):
+        key, _, client = entry.strip().partition(":")
+        if key:
+            api_keys[key] = client.strip() or f"client-{len(api_keys) + 1}"
+    return api_keys
+
+
+API_KEYS = parse_api_keys(os.getenv("API_KEYS", ""))
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a client has used up one of its token buckets
+    """
+
+    def __init__(self, client: str, kind: str, retry_after: float):
+        super().__init__(f"{kind.capitalize()} quota exceeded for client '{client}'")
+        self.client = client
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate up to its burst capacity
+    """
+
+    def __init__(self, per_minute: float, burst: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, cost: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def refund(self, cost: float = 1.0):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+    def retry_after(self, cost: float = 1.0) -> float:
+        """
+        Seconds until the bucket holds enough tokens for the cost
+        """
+        self._refill()
+        if self.rate <= 0:
+            return float("inf")
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+
+def _percentiles_ms(values) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "p50": round(ordered[len(ordered) // 2] * 1000.0, 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000.0, 1)
+    }
+
+
+class ClientUsage:
+    """
+    Token buckets and usage counters of one client
+    """
+
+    def __init__(self, requests_per_minute: float, request_burst: float, analyses_per_minute: float, analysis_burst: float):
+        self.buckets = {
+            "request": TokenBucket(requests_per_minute, request_burst),
+            "analysis": TokenBucket(analyses_per_minute, analysis_burst)
+        }
+        self.counts = {"request": 0, "analysis": 0, "rejected_request": 0, "rejected_analysis": 0}
+        self.latencies = {"hit": deque(maxlen=CLIENT_LATENCY_WINDOW), "analysis": deque(maxlen=CLIENT_LATENCY_WINDOW)}
+        self.queue_waits = deque(maxlen=CLIENT_LATENCY_WINDOW)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.counts["request"],
+            "analyses": self.counts["analysis"],
+            "rejected_requests": self.counts["rejected_request"],
+            "rejected_analyses": self.counts["rejected_analysis"],
+            "tokens": {kind: round(bucket.tokens, 2) for kind, bucket in self.buckets.items()},
+            "latency_ms": {outcome: _percentiles_ms(values) for outcome, values in self.latencies.items() if values},
+            "queue_wait_ms": _percentiles_ms(self.queue_waits)
+        }
+
+
+class ClientQuotas:
+    """
+    Identifies clients by API key (or, without one, by address) and enforces
+    their request and analysis quotas
+    """
+
+    def __init__(self,
+                 api_keys: Dict[str, str] = API_KEYS,
+                 require_api_key: bool = REQUIRE_API_KEY,
+                 enabled: bool = QUOTAS_ENABLED,
+                 requests_per_minute: float = QUOTA_REQUESTS_PER_MINUTE,
+                 request_burst: float = QUOTA_REQUEST_BURST,
+                 analyses_per_minute: float = QUOTA_ANALYSES_PER_MINUTE,
+                 analysis_burst: float = QUOTA_ANALYSIS_BURST,
+                 anonymous_clients_max: int = ANONYMOUS_CLIENTS_MAX):
+        """
+        Args:
+            api_keys (Dict[str, str]): API key -> client name
+            require_api_key (bool): Reject requests without a known API key instead of treating them as anonymous
+            enabled (bool): If False, usage is still counted but never rejected
+            requests_per_minute (float): Refill rate of the per-request bucket (every request pays one token)
+            request_burst (float): Capacity of the per-request bucket
+            analyses_per_minute (float): Refill rate of the full-analysis bucket (claim-history misses)
+            analysis_burst (float): Capacity of the full-analysis bucket
+            anonymous_clients_max (int): Per-address anonymous clients kept; the least recently seen is dropped beyond this
+        """
+        self.api_keys = api_keys
+        self.require_api_key = require_api_key
+        self.enabled = enabled
+        self._limits = (requests_per_minute, request_burst, analyses_per_minute, analysis_burst)
+        self.anonymous_clients_max = max(1, anonymous_clients_max)
+        self.clients: Dict[str, ClientUsage] = {}
+        self.anonymous_clients: "OrderedDict[str, ClientUsage]" = OrderedDict()
+
+    def identify(self, api_key: Optional[str], address: Optional[str] = None) -> str:
+        """
+        Map an X-API-Key header to a client name. Callers without a key get their
+        own anonymous client per address, so one visitor cannot use up everyone's quota
+
+        Args:
+            api_key (Optional[str]): X-API-Key header value
+            address (Optional[str]): Caller's address, used to tell anonymous callers apart
+
+        Raises:
+            PermissionError: If the key is unknown, or missing while REQUIRE_API_KEY is set
+        """
+        if api_key:
+            if api_key not in self.api_keys:
+                raise PermissionError("Invalid API key")
+            return self.api_keys[api_key]
+        if self.require_api_key:
+            raise PermissionError(f"Missing {API_KEY_HEADER} header")
+        return f"{ANONYMOUS_CLIENT}:{address}" if address else ANONYMOUS_CLIENT
+
+    def usage(self, client: str) -> ClientUsage:
+        if not is_anonymous(client):
+            if client not in self.clients:
+                self.clients[client] = ClientUsage(*self._limits)
+            return self.clients[client]
+        # Anonymous addresses are unbounded, so only the most recently seen ones are kept
+        usage = self.anonymous_clients.get(client)
+        if usage is None:
+            usage = self.anonymous_clients[client] = ClientUsage(*self._limits)
+            if len(self.anonymous_clients) > self.anonymous_clients_max:
+                self.anonymous_clients.popitem(last=False)
+        else:
+            self.anonymous_clients.move_to_end(client)
+        return usage
+
+    def charge(self, client: str, kind: str):
+        """
+        Take one token from the client's "request" or "analysis" bucket
+
+        Raises:
+            QuotaExceeded: If the bucket is empty (and quotas are enabled)
+        """
+        usage = self.usage(client)
+        bucket = usage.buckets[kind]
+        if not bucket.try_take() and self.enabled:
+            usage.counts[f"rejected_{kind}"] += 1
+            logger.warning("Client %s exceeded its %s quota", client, kind)
+            raise QuotaExceeded(client, kind, bucket.retry_after())
+        usage.counts[kind] += 1
+
+    def refund(self, client: str, kind: str):
+        """
+        Give back a token charged for work that never ran (no analysis slot before the deadline)
+        """
+        usage = self.usage(client)
+        usage.buckets[kind].refund()
+        usage.counts[kind] = max(0, usage.counts[kind] - 1)
+
+    def record_latency(self, client: str, outcome: str, seconds: float):
+        """
+        Record the latency of a finished request ("hit" or "analysis")
+        """
+        self.usage(client).latencies[outcome].append(seconds)
+
+    def record_queue_wait(self, client: str, seconds: float):
+        self.usage(client).queue_waits.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Per-client usage for the metrics endpoint; anonymous addresses are summed
+        under "anonymous" instead of being listed one by one
+        """
+        stats = {client: usage.stats() for client, usage in self.clients.items()}
+        if self.anonymous_clients:
+            usages = list(self.anonymous_clients.values())
+            stats[ANONYMOUS_CLIENT] = {
+                "addresses": len(usages),
+                "requests": sum(usage.counts["request"] for usage in usages),
+                "analyses": sum(usage.counts["analysis"] for usage in usages),
+                "rejected_requests": sum(usage.counts["rejected_request"] for usage in usages),
+                "rejected_analyses": sum(usage.counts["rejected_analysis"] for usage in usages)
+            }
+        return stats
+
+
+class FairScheduler:
+    """
+    Limits concurrent full analyses and hands free slots to waiting clients in
+    round-robin order, so one client's backlog cannot starve the others
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_ANALYSES):
+        self.max_concurrent = max(1, max_concurrent)
+        self.active = 0
+        self.waiting: "OrderedDict[str, deque]" = OrderedDict()
+
+    async def acquire(self, client: str):
+        if self.active < self.max_concurrent and not self.waiting:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(client, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation; pass it on
+                self.release()
+            else:
+                queue = self.waiting.get(client)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self.waiting[client]
+            raise
+
+    def release(self):
+        # Hand the slot to the head of the next client's queue, then move that client to the back
+        while self.waiting:
+            client, queue = next(iter(self.waiting.items()))
+            future = queue.popleft()
+            if queue:
+                self.waiting.move_to_end(client)
+            else:
+                del self.waiting[client]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, client: str):
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Scheduler statistics for the metrics endpoint
+        """
+        queued: Dict[str, int] = {}
+        for client, queue in self.waiting.items():
+            name = ANONYMOUS_CLIENT if is_anonymous(client) else client
+            queued[name] = queued.get(name, 0) + len(queue)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "queued": queued
+        }
@@ -0,0 +1,128 @@
+"""
+Refinement cache for the Fake News Detector
+Contains an in-memory semantic cache of refined search queries indexed by
+claim embedding, so paraphrases of a claim reuse one refine_claim_text call
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Refinement cache configuration
+REFINEMENT_CACHE_SIMILARITY = float(os.getenv("REFINEMENT_CACHE_SIMILARITY", "0.9"))
+REFINEMENT_CACHE_MAX_ENTRIES = int(os.getenv("REFINEMENT_CACHE_MAX_ENTRIES", "1000"))
+REFINEMENT_CACHE_TTL_SECONDS = float(os.getenv("REFINEMENT_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+
+
+class RefinementCache:
+    """
+    LRU cache with a time-to-live that maps claim embeddings to refined queries.
+    A lookup returns the refined query of the most similar cached claim if its
+    cosine similarity reaches the configured threshold.
+    """
+
+    def __init__(self,
+                 similarity_threshold: float = REFINEMENT_CACHE_SIMILARITY,
+                 max_entries: int = REFINEMENT_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = REFINEMENT_CACHE_TTL_SECONDS):
+        """
+        Args:
+            similarity_threshold (float): Minimum cosine similarity for a hit
+            max_entries (int): Entries kept before the least recently used is evicted
+            ttl_seconds (float): Age after which an entry expires
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, embedding) -> Optional[str]:
+        """
+        Find the refined query of a semantically equivalent claim
+
+        Args:
+            embedding: Claim embedding (the one computed for the history lookup)
+
+        Returns:
+            Optional[str]: Cached refined query, or None on a miss
+        """
+        self._expire()
+        if embedding is None or not self.entries:
+            self.misses += 1
+            return None
+
+        if self._matrix is None:
+            self._matrix_keys = list(self.entries)
+            self._matrix = np.stack([self.entries[key]["vector"] for key in self._matrix_keys])
+
+        similarities = self._matrix @ _normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            self.misses += 1
+            return None
+
+        key = self._matrix_keys[best]
+        self.entries.move_to_end(key)
+        self.hits += 1
+        logger.info("Refinement cache hit (similarity %.3f)", similarities[best])
+        return self.entries[key]["refined_claim"]
+
+    def store(self, key: str, embedding, refined_claim: str):
+        """
+        Cache the refined query of a claim
+
+        Args:
+            key (str): Claim ID from generate_claim_id
+            embedding: Claim embedding
+            refined_claim (str): Refined query returned by refine_claim_text
+        """
+        if embedding is None:
+            return
+        self.entries[key] = {"vector": _normalize(embedding), "refined_claim": refined_claim, "created_at": time.monotonic()}
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self._matrix = None
+
+    def _expire(self):
+        # Entries are ordered by last use, so expired ones may sit anywhere
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self.entries.items() if entry["created_at"] < cutoff]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.expirations += len(expired)
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Refinement cache statistics for the metrics endpoint
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "similarity_threshold": self.similarity_threshold
+        }
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Traffic replay harness for the Fake News Detector
+Drives the FastAPI app in-process with a capture recorded through
+TRAFFIC_CAPTURE_PATH, keeping the recorded arrival times (optionally sped up)
+and serving Gemini and search responses from the same capture, so cache,
+coalescing and throughput can be compared across releases without calling
+the live APIs.
+
+Usage:
+    TRAFFIC_CAPTURE_PATH=./traffic.jsonl.gz uvicorn main:app   # capture
+    python replay_traffic.py traffic.jsonl.gz --speed 1
+    python replay_traffic.py traffic.jsonl.gz --speed 10 --output replay.json
+
+The replay starts from an empty claim store unless --chroma-path points at a
+snapshot restored with claims_cli.py.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def load_requests(path: str, limit: int = None) -> list:
+    """
+    Recorded requests in arrival order, with arrival offsets in seconds from the first one
+    """
+    from traffic_utils import read_traffic
+    requests = sorted((event for event in read_traffic(path) if event.get("kind") == "request"), key=lambda event: event["ts"])
+    if limit:
+        requests = requests[:limit]
+    first = requests[0]["ts"] if requests else 0.0
+    for event in requests:
+        event["offset"] = event["ts"] - first
+    return requests
+
+
+async def replay(requests: list, speed: float) -> dict:
+    """
+    Send the recorded requests to the app at their (scaled) arrival times and summarise the outcome
+    """
+    import httpx
+    import main
+
+    results = []
+
+    async def send(client, event):
+        await asyncio.sleep(max(0.0, started + event["offset"] / speed - time.perf_counter()))
+        headers = {"X-Request-Deadline-Ms": str(event["deadline_ms"])} if event.get("deadline_ms") else {}
+        sent = time.perf_counter()
+        try:
+            response = await client.post(event["path"], json=event["body"], params=event.get("params"), headers=headers)
+            source = None
+            if event["path"] == "/analyze_claim" and response.status_code == 200:
+                source = response.json().get("source", "unknown")
+            results.append({"path": event["path"], "status": response.status_code, "latency": time.perf_counter() - sent, "source": source})
+        except Exception as e:
+            results.append({"path": event["path"], "status": type(e).__name__, "latency": time.perf_counter() - sent, "source": None})
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(send(client, event) for event in requests))
+            duration = time.perf_counter() - started
+            metrics = (await client.get("/metrics")).json()
+
+    report = {"speed": speed, "requests": len(results), "duration_seconds": round(duration, 2),
+              "throughput_rps": round(len(results) / duration, 2) if duration else 0.0, "endpoints": {}}
+    for path in sorted({result["path"] for result in results}):
+        endpoint_results = [result for result in results if result["path"] == path]
+        latencies = [result["latency"] * 1000.0 for result in endpoint_results]
+        summary = {
+            "requests": len(endpoint_results),
+            "status": dict(Counter(str(result["status"]) for result in endpoint_results)),
+            "latency_ms": {
+                "mean": round(statistics.mean(latencies), 1),
+                "p50": round(percentile(latencies, 0.5), 1),
+                "p95": round(percentile(latencies, 0.95), 1),
+                "p99": round(percentile(latencies, 0.99), 1)
+            }
+        }
+        sources = Counter(result["source"] for result in endpoint_results if result["source"])
+        if sources:
+            summary["sources"] = dict(sources)
+            summary["history_hit_rate"] = round(sources.get("claim_history", 0) / sum(sources.values()), 4)
+        report["endpoints"][path] = summary
+    report["metrics"] = metrics
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic against the app with recorded provider responses")
+    parser.add_argument("path", help="Capture file written through TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed (10 = ten times faster than recorded)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--chroma-path", help="Claim store to replay against (default: a fresh temporary store)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--quotas", action="store_true", help="Enforce client quotas (captures are anonymous, so every request counts against one client)")
+    args = parser.parse_args()
+
+    # Configure the app before importing any of its modules: provider calls come from
+    # the capture, nothing is captured again and the replay never touches the production store
+    scratch_dir = tempfile.mkdtemp(prefix="replay_")
+    os.environ["TRAFFIC_REPLAY_PATH"] = args.path
+    os.environ["TRAFFIC_REPLAY_SPEED"] = str(args.speed)
+    os.environ.pop("TRAFFIC_CAPTURE_PATH", None)
+    os.environ.pop("CLAIM_STORE_URL", None)
+    os.environ.pop("CLAIM_STORE_UDS", None)
+    os.environ["CHROMA_DB_PATH"] = args.chroma_path or os.path.join(scratch_dir, "chroma_db_data")
+    os.environ["FEEDBACK_LOG_PATH"] = os.path.join(scratch_dir, "feedback_log.jsonl")
+    if not args.quotas:
+        os.environ["QUOTAS_ENABLED"] = "false"
+
+    requests = load_requests(args.path, args.limit)
+    if not requests:
+        sys.exit(f"❌ No recorded requests in {args.path}")
+
+    print(f"Replaying {len(requests)} requests at {args.speed}x (store: {os.environ['CHROMA_DB_PATH']})")
+    report = asyncio.run(replay(requests, args.speed))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Response utilities for the Fake News Detector
+Contains the typed /analyze_claim response models and helpers that trim
+payloads (fields=/verbose=), serialize them with orjson and answer repeated
+fetches of a cached verdict with 304 Not Modified
+"""
+
+import hashlib
+import logging
+import os
+from typing import List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+
+logger = logging.getLogger(__name__)
+
+# Response configuration
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+COMPACT_SNIPPET_WORDS = int(os.getenv("COMPACT_SNIPPET_WORDS", "50"))  # What frontend/script.js renders
+
+# Fields dropped from compact (verbose=false) responses
+VERBOSE_ONLY_FIELDS = ("received_claim", "refined_claim", "similarity_score", "timestamp")
+
+
+class SearchResultModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    title: str = ""
+    snippet: Optional[str] = None
+    url: str = ""
+    source: str = ""
+
+
+class SubClaimModel(BaseModel):
+    claim: str
+    verdict: str
+    explanation: str
+    source: str
+
+
+class AnalyzeClaimResponse(BaseModel):
+    received_claim: Optional[str] = None
+    verdict: str
+    explanation: str
+    source: str
+    refined_claim: Optional[str] = None
+    search_results: Optional[List[SearchResultModel]] = None
+    timestamp: Optional[str] = None
+    source_links: Optional[List[SearchResultModel]] = None
+    similarity_score: Optional[float] = None
+    sub_claims: Optional[List[SubClaimModel]] = None
+    degraded: Optional[List[str]] = None
+
+
+def truncate_words(text: str, word_limit: int) -> str:
+    words = (text or "").split()
+    if len(words) <= word_limit:
+        return text
+    return " ".join(words[:word_limit]) + "..."
+
+
+def trim_response(content: dict, fields: Optional[str] = None, verbose: bool = True) -> dict:
+    """
+    Trim an /analyze_claim response to what the client renders
+
+    Args:
+        content (dict): Full response
+        fields (str): Comma-separated top-level fields to keep (optional)
+        verbose (bool): If False, drop VERBOSE_ONLY_FIELDS and shorten snippets to COMPACT_SNIPPET_WORDS
+
+    Returns:
+        dict: Trimmed response
+    """
+    if fields:
+        wanted = {field.strip() for field in fields.split(",") if field.strip()}
+        content = {key: value for key, value in content.items() if key in wanted}
+    if not verbose:
+        content = {key: value for key, value in content.items() if key not in VERBOSE_ONLY_FIELDS}
+        for key in ("search_results", "source_links"):
+            if content.get(key):
+                content[key] = [
+                    dict(result, snippet=truncate_words(result["snippet"], COMPACT_SNIPPET_WORDS)) if result.get("snippet") else result
+                    for result in content[key]
+                ]
+    return content
+
+
+def build_response(request: Request, content: dict, fields: Optional[str] = None, verbose: bool = True, cacheable: bool = False) -> Response:
+    """
+    Validate a response against AnalyzeClaimResponse (dropping unset fields), then trim it
+    and serialize it with orjson. Cacheable responses (verdicts served from the claim
+    history) get an ETag, and a matching If-None-Match is answered with 304.
+
+    Args:
+        request (Request): Incoming request (for If-None-Match)
+        content (dict): Full response
+        fields (str): Comma-separated top-level fields to keep (optional)
+        verbose (bool): Whether to return the full payload
+        cacheable (bool): Whether the response is a cached verdict that may be revalidated
+
+    Returns:
+        Response: ORJSONResponse, or an empty 304 response
+    """
+    content = AnalyzeClaimResponse.model_validate(content).model_dump(exclude_none=True)
+    response = ORJSONResponse(trim_response(content, fields, verbose))
+    if not cacheable:
+        return response
+
+    etag = '"' + hashlib.blake2b(response.body, digest_size=16).hexdigest() + '"'
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+        logger.info("Cached verdict not modified, returning 304")
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -6,41 +6,84 @@ Contains functions for searching using SerpAPI, DuckDuckGo, and Tavily
 import logging
 import os
 import asyncio
-from duckduckgo_search import DDGS
-from serpapi import GoogleSearch
-from tavily import TavilyClient
+import math
 from dotenv import load_dotenv
 
+from dedup_utils import fuse_results
+from deadline_utils import Deadline, with_deadline, DEADLINE_MIN_SECONDS_FOR_ALL_ENGINES
+from provider_registry import LazyProvider
+from logging_utils import SAMPLED
+from profiling_utils import run_sync_sdk
+from traffic_utils import recorded_provider
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Configure SerpAPI
-serpapi_key = os.getenv("SERPAPI_KEY")
-if serpapi_key:
-    logger.info("SerpAPI key configured successfully")
-else:
-    logger.warning("SERPAPI_KEY not found in environment variables - SerpAPI search will be disabled")
+# Search providers to use (SDKs are only imported when a provider is enabled and first used)
+SEARCH_PROVIDERS_ENABLED = [
+    name.strip().lower() for name in os.getenv("SEARCH_PROVIDERS", "tavily,serpapi,duckduckgo").split(",") if name.strip()
+]
 
-# Configure Tavily API
+serpapi_key = os.getenv("SERPAPI_KEY")
 tavily_key = os.getenv("TAVILY_API_KEY")
-if tavily_key:
-    logger.info("Tavily API key found in environment variables")
-    if tavily_key == "your_tavily_api_key_here":
-        logger.error("Tavily API key is still set to the default value. Please update it in .env file")
-        tavily_client = None
-    else:
-        tavily_client = TavilyClient(api_key=tavily_key)
-        logger.info("Tavily API configured successfully")
-else:
-    tavily_client = None
-    logger.error("TAVILY_API_KEY not found in environment variables - Tavily search will be disabled")
+if tavily_key == "your_tavily_api_key_here":
+    tavily_key = None
+
+def _create_serpapi_client():
+    from serpapi import GoogleSearch
+    return GoogleSearch
+
+def _create_duckduckgo_client():
+    from duckduckgo_search import DDGS
+    return DDGS
+
+def _create_tavily_client():
+    from tavily import TavilyClient
+    return TavilyClient(api_key=tavily_key)
+
+def _provider(name: str, factory, api_key_required: bool = False, api_key: str = None) -> LazyProvider:
+    if name not in SEARCH_PROVIDERS_ENABLED:
+        return LazyProvider(name, factory, enabled=False, disabled_reason="not listed in SEARCH_PROVIDERS")
+    if api_key_required and not api_key:
+        return LazyProvider(name, factory, enabled=False, disabled_reason="API key not configured")
+    return LazyProvider(name, factory)
+
+search_providers = {
+    "tavily": _provider("tavily", _create_tavily_client, api_key_required=True, api_key=tavily_key),
+    "serpapi": _provider("serpapi", _create_serpapi_client, api_key_required=True, api_key=serpapi_key),
+    "duckduckgo": _provider("duckduckgo", _create_duckduckgo_client)
+}
+logger.info("Search providers enabled: %s", [name for name, provider in search_providers.items() if provider.enabled])
+
+# Adaptive fan-out: when engines keep returning the same articles, ask each for fewer results
+SEARCH_MIN_RESULTS_PER_ENGINE = int(os.getenv("SEARCH_MIN_RESULTS_PER_ENGINE", "2"))
+SEARCH_OVERLAP_SMOOTHING = float(os.getenv("SEARCH_OVERLAP_SMOOTHING", "0.2"))
+search_overlap_ratio = 0.0  # Exponential moving average of the duplicate fraction across engines
+
+def get_results_per_engine(max_results: int) -> int:
+    """
+    Number of results to request from each engine, shrunk when recent searches overlapped heavily
+    
+    Args:
+        max_results (int): Maximum number of combined results
+    
+    Returns:
+        int: Results to request per engine
+    """
+    base = max(SEARCH_MIN_RESULTS_PER_ENGINE, max_results // 3)
+    return max(SEARCH_MIN_RESULTS_PER_ENGINE, math.ceil(base * (1.0 - search_overlap_ratio)))
+
+def record_search_overlap(duplicates: int, total_results: int):
+    """
+    Update the moving average of the fraction of results that were duplicates across engines
+    """
+    global search_overlap_ratio
+    if total_results <= 0:
+        return
+    overlap = duplicates / total_results
+    search_overlap_ratio += SEARCH_OVERLAP_SMOOTHING * (overlap - search_overlap_ratio)
 
 async def search_serpapi(query: str, max_results: int = 3) -> list:
     """
@@ -54,11 +97,12 @@ async def search_serpapi(query: str, max_results: int = 3) -> list:
         list: List of dictionaries containing 'title' and 'snippet' for each result
     """
     try:
-        if not serpapi_key:
-            logger.warning("SerpAPI key not configured, skipping SerpAPI search")
+        GoogleSearch = await search_providers["serpapi"].get_async()
+        if not GoogleSearch:
+            logger.debug("SerpAPI provider not available, skipping SerpAPI search")
             return []
         
-        logger.info(f"Starting SerpAPI search for query: {query[:100]}...")
+        logger.info("Starting SerpAPI search for query: %s...", query[:100])
         
         # Configure SerpAPI search parameters
         search_params = {
@@ -71,7 +115,7 @@ async def search_serpapi(query: str, max_results: int = 3) -> list:
         
         # Perform search
         search = GoogleSearch(search_params)
-        results = search.get_dict()
+        results = await run_sync_sdk(search.get_dict)
         
         search_results = []
         
@@ -86,11 +130,11 @@ async def search_serpapi(query: str, max_results: int = 3) -> list:
                 }
                 search_results.append(search_result)
         
-        logger.info(f"SerpAPI search completed successfully. Found {len(search_results)} results")
+        logger.info("SerpAPI search completed successfully. Found %s results", len(search_results))
         return search_results
         
     except Exception as e:
-        logger.error(f"Error during SerpAPI search for query '{query}': {str(e)}")
+        logger.error("Error during SerpAPI search for query '%s': %s", query, e)
         return []
 
 async def search_duckduckgo(query: str, max_results: int = 3) -> list:
@@ -105,14 +149,19 @@ async def search_duckduckgo(query: str, max_results: int = 3) -> list:
         list: List of dictionaries containing 'title' and 'snippet' for each result
     """
     try:
-        logger.info(f"Starting DuckDuckGo search for query: {query[:100]}...")
+        DDGS = await search_providers["duckduckgo"].get_async()
+        if not DDGS:
+            logger.debug("DuckDuckGo provider not available, skipping DuckDuckGo search")
+            return []
+        
+        logger.info("Starting DuckDuckGo search for query: %s...", query[:100])
         
         # Initialize DuckDuckGo search
         ddgs = DDGS()
         
         # Perform text search and get results
         search_results = []
-        results = ddgs.text(query, max_results=max_results)
+        results = await run_sync_sdk(ddgs.text, query, max_results=max_results)
         
         for result in results:
             search_result = {
@@ -123,11 +172,11 @@ async def search_duckduckgo(query: str, max_results: int = 3) -> list:
             }
             search_results.append(search_result)
         
-        logger.info(f"DuckDuckGo search completed successfully. Found {len(search_results)} results")
+        logger.info("DuckDuckGo search completed successfully. Found %s results", len(search_results))
         return search_results
         
     except Exception as e:
-        logger.error(f"Error during DuckDuckGo search for query '{query}': {str(e)}")
+        logger.error("Error during DuckDuckGo search for query '%s': %s", query, e)
         return []
 
 async def search_tavily(query: str, max_results: int = 3) -> list:
@@ -142,14 +191,16 @@ async def search_tavily(query: str, max_results: int = 3) -> list:
         list: List of dictionaries containing 'title' and 'snippet' for each result
     """
     try:
+        tavily_client = await search_providers["tavily"].get_async()
         if not tavily_client:
-            logger.warning("Tavily API key not configured, skipping Tavily search")
+            logger.debug("Tavily provider not available, skipping Tavily search")
             return []
         
-        logger.info(f"Starting Tavily search for query: {query[:100]}...")
+        logger.info("Starting Tavily search for query: %s...", query[:100])
         
         # Perform search using Tavily
-        search_response = tavily_client.search(
+        search_response = await run_sync_sdk(
+            tavily_client.search,
             query=query,
             search_depth="basic",
             max_results=max_results,
@@ -157,9 +208,6 @@ async def search_tavily(query: str, max_results: int = 3) -> list:
             include_raw_content=False
         )
         
-        logger.info(f"Raw Tavily response type: {type(search_response)}")
-        logger.info(f"Raw Tavily response: {search_response}")
-        
         search_results = []
         
         # Extract results from Tavily response
@@ -168,13 +216,11 @@ async def search_tavily(query: str, max_results: int = 3) -> list:
         elif isinstance(search_response, list):
             results = search_response
         else:
-            logger.warning(f"Unexpected Tavily response structure: {search_response}")
+            logger.warning("Unexpected Tavily response structure: %s", type(search_response).__name__)
             return []
         
         # Process each result
         for result in results[:max_results]:
-            logger.info(f"Processing Tavily result: {result}")
-            
             title = result.get("title") or result.get("Title") or "No title available"
             content = result.get("content") or result.get("Content") or result.get("snippet") or result.get("Snippet") or "No content available"
             url = result.get("url") or result.get("URL") or result.get("link") or "No URL available"
@@ -186,37 +232,50 @@ async def search_tavily(query: str, max_results: int = 3) -> list:
                 "source": "Tavily"
             }
             search_results.append(search_result)
-            logger.info(f"Added Tavily result: {search_result}")
+            logger.debug("Added Tavily result: %s", url, extra=SAMPLED)
         
-        logger.info(f"Tavily search completed successfully. Found {len(search_results)} results")
+        logger.info("Tavily search completed successfully. Found %s results", len(search_results))
         return search_results
         
     except Exception as e:
-        logger.error(f"Error during Tavily search for query '{query}': {str(e)}")
+        logger.error("Error during Tavily search for query '%s': %s", query, e)
         logger.exception("Full traceback:")
         return []
 
-async def search_web(query: str, max_results: int = 9) -> list:
+@recorded_provider("search_web")
+async def search_web(query: str, max_results: int = 9, deadline: Deadline = None) -> list:
     """
     Asynchronous function to search the web using SerpAPI, DuckDuckGo, and Tavily
     
     Args:
         query (str): Search query string
         max_results (int): Maximum number of results to return (default: 9)
+        deadline (Deadline): Stage deadline; engines still running when it passes are dropped,
+            and only the preferred engine is queried when little time is left (optional)
     
     Returns:
         list: List of dictionaries containing 'title', 'snippet', 'url', and 'source' for each result
     """
     try:
-        logger.info(f"Starting combined web search for query: {query[:100]}...")
+        logger.info("Starting combined web search for query: %s...", query[:100])
+        
+        # Calculate results per search engine (divide by 3, minimum 2 each, fewer when engines overlap)
+        results_per_engine = get_results_per_engine(max_results)
+        logger.info("Requesting %s results per engine (overlap ratio: %.2f)", results_per_engine, search_overlap_ratio)
         
-        # Calculate results per search engine (divide by 3, minimum 2 each)
-        results_per_engine = max(2, max_results // 3)
+        # Near the deadline, query only the preferred engine (Tavily if available, else DuckDuckGo)
+        use_all_engines = deadline is None or deadline.has_time_for(DEADLINE_MIN_SECONDS_FOR_ALL_ENGINES)
+        if not use_all_engines:
+            logger.warning("Only %.2fs left, querying a single search engine", deadline.remaining())
+        tavily_available = search_providers["tavily"].available
         
-        # Run all three searches concurrently
-        serpapi_task = search_serpapi(query, results_per_engine)
-        duckduckgo_task = search_duckduckgo(query, results_per_engine)
-        tavily_task = search_tavily(query, results_per_engine)
+        async def skipped():
+            return []
+        
+        # Run the searches concurrently, each bounded by the remaining deadline (disabled providers are skipped)
+        serpapi_task = with_deadline(search_serpapi(query, results_per_engine) if use_all_engines and search_providers["serpapi"].available else skipped(), deadline, "search_serpapi")
+        duckduckgo_task = with_deadline(search_duckduckgo(query, results_per_engine) if use_all_engines or not tavily_available else skipped(), deadline, "search_duckduckgo")
+        tavily_task = with_deadline(search_tavily(query, results_per_engine) if tavily_available else skipped(), deadline, "search_tavily")
         
         # Wait for all searches to complete
         serpapi_results, duckduckgo_results, tavily_results = await asyncio.gather(
@@ -225,56 +284,41 @@ async def search_web(query: str, max_results: int = 9) -> list:
         
         # Handle exceptions from async tasks
         if isinstance(tavily_results, Exception):
-            logger.error(f"Tavily search failed: {tavily_results}")
+            logger.error("Tavily search failed: %r", tavily_results)
             tavily_results = []
         if isinstance(serpapi_results, Exception):
-            logger.error(f"SerpAPI search failed: {serpapi_results}")
+            logger.error("SerpAPI search failed: %r", serpapi_results)
             serpapi_results = []
         if isinstance(duckduckgo_results, Exception):
-            logger.error(f"DuckDuckGo search failed: {duckduckgo_results}")
+            logger.error("DuckDuckGo search failed: %r", duckduckgo_results)
             duckduckgo_results = []
         
         # Log results from each engine
-        logger.info(f"SerpAPI found {len(serpapi_results)} results")
-        logger.info(f"DuckDuckGo found {len(duckduckgo_results)} results")
-        logger.info(f"Tavily found {len(tavily_results)} results")
-        
-        # Combine results from all search engines
-        combined_results = []
-        seen_titles = set()  # Keep track of unique titles
-        
-        # Helper function to add unique results
-        def add_unique_results(results):
-            for result in results:
-                title = result.get("title", "").lower().strip()
-                if title and title not in seen_titles:
-                    seen_titles.add(title)
-                    combined_results.append(result)
-        
-        # Add results in order of preference (Tavily first, then SerpAPI, then DuckDuckGo)
-        if tavily_results:
-            add_unique_results(tavily_results)
-            logger.info(f"Added {len(tavily_results)} Tavily results")
-        
-        if serpapi_results:
-            add_unique_results(serpapi_results)
-            logger.info(f"Added {len(serpapi_results)} SerpAPI results")
-        
-        if duckduckgo_results:
-            add_unique_results(duckduckgo_results)
-            logger.info(f"Added {len(duckduckgo_results)} DuckDuckGo results")
+        logger.info("SerpAPI found %s results", len(serpapi_results))
+        logger.info("DuckDuckGo found %s results", len(duckduckgo_results))
+        logger.info("Tavily found %s results", len(tavily_results))
+        
+        # Fuse results from all search engines with reciprocal-rank fusion, merging
+        # canonical-URL, title and near-duplicate snippet matches (ties favour Tavily, then SerpAPI, then DuckDuckGo)
+        engine_results = {
+            "Tavily": tavily_results,
+            "SerpAPI": serpapi_results,
+            "DuckDuckGo": duckduckgo_results
+        }
+        final_results, duplicates = fuse_results(engine_results, max_results)
+        total_results = sum(len(results) for results in engine_results.values())
+        record_search_overlap(duplicates, total_results)
+        logger.info("Merged %s duplicate results out of %s", duplicates, total_results)
         
-        # Limit to max_results
-        final_results = combined_results[:max_results]
-        logger.info(f"Combined web search completed. Returning {len(final_results)} unique results")
+        logger.info("Combined web search completed. Returning %s unique results", len(final_results))
         return final_results
         
     except Exception as e:
-        logger.error(f"Error during combined web search for query '{query}': {str(e)}")
+        logger.error("Error during combined web search for query '%s': %s", query, e)
         logger.exception("Full traceback:")
         # Fallback to DuckDuckGo only on error
         try:
             return await search_duckduckgo(query, max_results)
         except Exception as fallback_error:
-            logger.error(f"Fallback search also failed: {fallback_error}")
+            logger.error("Fallback search also failed: %s", fallback_error)
             return [] 
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Claim store client for the Fake News Detector
+Lets API workers reach the shared claim store service (store_server.py) over a
+local HTTP or Unix domain socket using a pooled connection
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+from chromadb.errors import NotFoundError
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration
+STORE_MAX_CONNECTIONS = int(os.getenv("CLAIM_STORE_MAX_CONNECTIONS", "20"))
+STORE_MAX_KEEPALIVE = int(os.getenv("CLAIM_STORE_MAX_KEEPALIVE", "10"))
+STORE_TIMEOUT_SECONDS = float(os.getenv("CLAIM_STORE_TIMEOUT_SECONDS", "10"))
+
+
+class StoreClient:
+    """
+    Pooled client for the claim store service, exposing the subset of the
+    ChromaDB client API used by the backend; calls are blocking, so async
+    callers run them in a worker thread (see db_utils)
+    """
+
+    def __init__(self, base_url: Optional[str] = None, uds_path: Optional[str] = None, http_client: Optional[httpx.Client] = None):
+        """
+        Args:
+            base_url (str): Base URL of the store service (e.g. http://127.0.0.1:8100)
+            uds_path (str): Unix domain socket path of the store service (optional)
+            http_client (httpx.Client): Preconfigured HTTP client to use instead of a pooled one (optional)
+        """
+        self.base_url = base_url or "http://claim-store"
+        if http_client is not None:
+            self._http = http_client
+        else:
+            limits = httpx.Limits(
+                max_connections=STORE_MAX_CONNECTIONS,
+                max_keepalive_connections=STORE_MAX_KEEPALIVE
+            )
+            transport = httpx.HTTPTransport(uds=uds_path, limits=limits) if uds_path else httpx.HTTPTransport(limits=limits)
+            self._http = httpx.Client(
+                base_url=self.base_url,
+                transport=transport,
+                timeout=STORE_TIMEOUT_SECONDS
+            )
+        logger.info("Claim store client configured - URL: %s, socket: %s", self.base_url, uds_path or 'tcp')
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        response = self._http.request(method, path, json=payload)
+        if response.status_code == 404:
+            # Same error as an embedded ChromaDB client, e.g. for a time bucket another worker dropped
+            raise NotFoundError(response.json().get("detail", f"Not found: {path}"))
+        response.raise_for_status()
+        return response.json()
+
+    def heartbeat(self) -> bool:
+        """
+        Check that the store service is reachable
+        """
+        return self._request("GET", "/health").get("status") == "ok"
+
+    def get_or_create_collection(self, name: str, **kwargs) -> "RemoteCollection":
+        """
+        Return a handle to a collection owned by the store service
+
+        Args:
+            name (str): Collection name
+
+        Returns:
+            RemoteCollection: Collection proxy with the ChromaDB collection interface
+        """
+        self._request("POST", f"/collections/{name}")
+        return RemoteCollection(self, name)
+
+    def get_collection(self, name: str, **kwargs) -> "RemoteCollection":
+        """
+        Return a handle to an existing collection
+
+        Raises:
+            NotFoundError: If the collection does not exist
+        """
+        self._request("GET", f"/collections/{name}")
+        return RemoteCollection(self, name)
+
+    def list_collections(self) -> List[str]:
+        """
+        Names of the collections in the store
+        """
+        return self._request("GET", "/collections")["names"]
+
+    def delete_collection(self, name: str) -> None:
+        """
+        Drop a collection and everything in it
+        """
+        self._request("DELETE", f"/collections/{name}")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with the model loaded in the store service
+        """
+        return self._request("POST", "/embed", {"texts": list(texts)})["embeddings"]
+
+    def close(self):
+        self._http.close()
+
+
+class RemoteCollection:
+    """
+    Proxy for a ChromaDB collection hosted by the claim store service
+    """
+
+    def __init__(self, client: StoreClient, name: str):
+        self._client = client
+        self.name = name
+
+    def _call(self, operation: str, **payload) -> Any:
+        payload = {key: value for key, value in payload.items() if value is not None}
+        for key in ("embeddings", "query_embeddings"):
+            if key in payload:
+                # Embeddings may arrive as numpy arrays from a local embedding function
+                payload[key] = [[float(x) for x in embedding] for embedding in payload[key]]
+        return self._client._request("POST", f"/collections/{self.name}/{operation}", payload)
+
+    def count(self) -> int:
+        return self._client._request("GET", f"/collections/{self.name}/count")["count"]
+
+    def query(self, query_texts=None, query_embeddings=None, n_results: int = 10, where=None, include=None) -> Dict[str, Any]:
+        return self._call(
+            "query",
+            query_texts=query_texts,
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=include
+        )
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> Dict[str, Any]:
+        return self._call("get", ids=ids, where=where, limit=limit, offset=offset, include=include)
+
+    def upsert(self, ids, documents=None, embeddings=None, metadatas=None) -> None:
+        self._call("upsert", ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def update(self, ids, documents=None, embeddings=None, metadatas=None) -> None:
+        self._call("update", ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, ids) -> None:
+        self._call("delete", ids=ids)
+
+
+class RemoteEmbeddingFunction:
+    """
+    Embedding function that delegates to the model loaded in the store service
+    """
+
+    def __init__(self, client: StoreClient):
+        self._client = client
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self._client.embed(input)
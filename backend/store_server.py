@@ -0,0 +1,249 @@
+"""
+Claim store service for the Fake News Detector
+Single process that owns the persistent ChromaDB store and the embedding model.
+API workers connect to it through store_client.py, so a multi-worker deployment
+keeps one model copy in memory and one writer on the SQLite-backed store.
+
+Run with:
+    python store_server.py                         # TCP on CLAIM_STORE_HOST:CLAIM_STORE_PORT
+    CLAIM_STORE_UDS=/tmp/claim_store.sock python store_server.py
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from chromadb.errors import NotFoundError
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from logging_utils import configure_logging
+configure_logging()
+
+from db_utils import CHROMA_DB_PATH, initialize_chromadb
+from embedding_backends import create_embedding_function
+from embedding_utils import EmbeddingBatcher
+
+# Store service configuration
+CLAIM_STORE_HOST = os.getenv("CLAIM_STORE_HOST", "127.0.0.1")
+CLAIM_STORE_PORT = int(os.getenv("CLAIM_STORE_PORT", "8100"))
+CLAIM_STORE_UDS = os.getenv("CLAIM_STORE_UDS")
+
+logger = logging.getLogger(__name__)
+
+# Embedding model and store, loaded once for the whole deployment at startup
+embedding_function = None
+chroma_client = None
+collections = {}
+embedding_batcher = None
+
+# Serialize writes so only one thread touches the SQLite store at a time
+write_lock = threading.Lock()
+
+
+def open_store(chroma_db_path: str = CHROMA_DB_PATH, store_embedding_function=None):
+    """
+    Load the embedding model and open the persistent store
+
+    Args:
+        chroma_db_path (str): Local path for ChromaDB data storage
+        store_embedding_function: Embedding function to use (created for the configured backend if not provided)
+    """
+    global embedding_function, chroma_client, embedding_batcher
+    embedding_function = store_embedding_function or create_embedding_function()
+    chroma_client, claims_collection = initialize_chromadb(chroma_db_path, embedding_function)
+    collections.clear()
+    collections[claims_collection.name] = claims_collection
+    # Requests from all workers share one micro-batcher in front of the model
+    embedding_batcher = EmbeddingBatcher(embedding_function)
+
+
+# Pydantic models
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+class QueryRequest(BaseModel):
+    query_texts: Optional[List[str]] = None
+    query_embeddings: Optional[List[List[float]]] = None
+    n_results: int = 10
+    where: Optional[Dict[str, Any]] = None
+    include: Optional[List[str]] = None
+
+class GetRequest(BaseModel):
+    ids: Optional[List[str]] = None
+    where: Optional[Dict[str, Any]] = None
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+    include: Optional[List[str]] = None
+
+class WriteRequest(BaseModel):
+    ids: List[str]
+    documents: Optional[List[str]] = None
+    embeddings: Optional[List[List[float]]] = None
+    metadatas: Optional[List[Dict[str, Any]]] = None
+
+class DeleteRequest(BaseModel):
+    ids: List[str]
+
+
+app = FastAPI(
+    title="Fake News Detector Claim Store",
+    description="Shared claim store and embedding service for multi-worker deployments",
+    version="1.0.0"
+)
+
+
+@app.on_event("startup")
+def startup_event():
+    if chroma_client is None:
+        open_store()
+
+
+@app.exception_handler(NotFoundError)
+async def not_found_handler(request: Request, exc: NotFoundError):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+
+def get_collection(name: str, create: bool = False):
+    """
+    Get a collection by name
+
+    Args:
+        name (str): Collection name
+        create (bool): Create the collection with the shared embedding function if it does not exist;
+            read paths leave this off so they never recreate a time bucket another worker just dropped
+
+    Raises:
+        NotFoundError: If the collection does not exist and create is False
+    """
+    if name not in collections:
+        with write_lock:
+            if name not in collections:
+                if create:
+                    collections[name] = chroma_client.get_or_create_collection(name=name, embedding_function=embedding_function)
+                else:
+                    collections[name] = chroma_client.get_collection(name=name, embedding_function=embedding_function)
+                logger.info("Opened collection '%s'", name)
+    return collections[name]
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convert ChromaDB results (which may contain numpy arrays) to JSON-serializable values
+    """
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def compact(request: BaseModel) -> Dict[str, Any]:
+    return {key: value for key, value in request.model_dump().items() if value is not None}
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {"embedding_batcher": embedding_batcher.stats()}
+
+
+@app.post("/embed")
+async def embed(request: EmbedRequest):
+    # Await the batcher instead of holding a threadpool thread while the batch runs
+    embeddings = await embedding_batcher.embed(request.texts)
+    return {"embeddings": to_jsonable(embeddings)}
+
+
+@app.get("/collections")
+def list_collections():
+    return {"names": [getattr(collection, "name", collection) for collection in chroma_client.list_collections()]}
+
+
+@app.delete("/collections/{name}")
+def delete_collection(name: str):
+    with write_lock:
+        collections.pop(name, None)
+        try:
+            chroma_client.delete_collection(name)
+        except NotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    logger.info("Deleted collection '%s'", name)
+    return {"status": "ok"}
+
+
+@app.post("/collections/{name}")
+def open_collection(name: str):
+    get_collection(name, create=True)
+    return {"name": name}
+
+
+@app.get("/collections/{name}")
+def collection_exists(name: str):
+    get_collection(name)
+    return {"name": name}
+
+
+@app.get("/collections/{name}/count")
+def count(name: str):
+    return {"count": get_collection(name).count()}
+
+
+@app.post("/collections/{name}/query")
+def query(name: str, request: QueryRequest):
+    if request.query_texts and not request.query_embeddings:
+        request.query_embeddings = to_jsonable(embedding_batcher(request.query_texts))
+        request.query_texts = None
+    try:
+        return to_jsonable(dict(get_collection(name).query(**compact(request))))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/collections/{name}/get")
+def get(name: str, request: GetRequest):
+    try:
+        return to_jsonable(dict(get_collection(name).get(**compact(request))))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/collections/{name}/upsert")
+def upsert(name: str, request: WriteRequest):
+    collection = get_collection(name, create=True)
+    with write_lock:
+        collection.upsert(**compact(request))
+    return {"status": "ok"}
+
+
+@app.post("/collections/{name}/update")
+def update(name: str, request: WriteRequest):
+    collection = get_collection(name)
+    with write_lock:
+        collection.update(**compact(request))
+    return {"status": "ok"}
+
+
+@app.post("/collections/{name}/delete")
+def delete(name: str, request: DeleteRequest):
+    collection = get_collection(name)
+    with write_lock:
+        collection.delete(ids=request.ids)
+    return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    # The store must stay a single process: it is the only writer and the only model copy
+    if CLAIM_STORE_UDS:
+        uvicorn.run(app, uds=CLAIM_STORE_UDS, workers=1)
+    else:
+        uvicorn.run(app, host=CLAIM_STORE_HOST, port=CLAIM_STORE_PORT, workers=1)
@@ -0,0 +1,129 @@
+"""
+Streaming utilities for the Fake News Detector
+Contains the incremental parser that pulls the verdict label and explanation
+out of a partially received Gemini JSON response, and the NDJSON encoding of
+the events sent by the streaming analysis endpoint
+"""
+
+import json
+import re
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+VERDICT_PATTERN = re.compile(r'"verdict"\s*:\s*"((?:[^"\\]|\\.)*)"')
+EXPLANATION_START_PATTERN = re.compile(r'"explanation"\s*:\s*"')
+JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class VerdictStreamParser:
+    """
+    Parses a streamed {"verdict": ..., "explanation": ...} JSON object chunk by chunk,
+    emitting the verdict once it is complete and the explanation as it grows
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.verdict: Optional[str] = None
+        self.explanation_parts: List[str] = []
+        self._explanation_pos: Optional[int] = None
+        self._explanation_done = False
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """
+        Add a chunk of the response
+
+        Returns:
+            List[Dict[str, str]]: New events: {"type": "verdict", "verdict"} and/or {"type": "explanation", "delta"}
+        """
+        self.buffer += text
+        events = []
+        if self.verdict is None:
+            match = VERDICT_PATTERN.search(self.buffer)
+            if match:
+                self.verdict = json.loads(f'"{match.group(1)}"')
+                events.append({"type": "verdict", "verdict": self.verdict})
+        if self._explanation_pos is None:
+            match = EXPLANATION_START_PATTERN.search(self.buffer)
+            if match:
+                self._explanation_pos = match.end()
+        if self._explanation_pos is not None and not self._explanation_done:
+            delta = self._decode_explanation()
+            if delta:
+                self.explanation_parts.append(delta)
+                events.append({"type": "explanation", "delta": delta})
+        return events
+
+    def _decode_explanation(self) -> str:
+        # Decode the JSON string up to the end of the buffer, holding back an incomplete escape
+        buffer, pos = self.buffer, self._explanation_pos
+        decoded = []
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char == '"':
+                self._explanation_done = True
+                pos += 1
+                break
+            if char != "\\":
+                decoded.append(char)
+                pos += 1
+                continue
+            if pos + 1 >= len(buffer):
+                break
+            escape = buffer[pos + 1]
+            if escape != "u":
+                decoded.append(JSON_ESCAPES.get(escape, escape))
+                pos += 2
+                continue
+            if pos + 6 > len(buffer):
+                break
+            code = int(buffer[pos + 2:pos + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate: wait for its low surrogate and combine them
+                if pos + 12 > len(buffer):
+                    break
+                low = int(buffer[pos + 8:pos + 12], 16)
+                decoded.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                pos += 12
+            else:
+                decoded.append(chr(code))
+                pos += 6
+        self._explanation_pos = pos
+        return "".join(decoded)
+
+    def result(self) -> Dict[str, str]:
+        """
+        The complete response, parsed from the whole buffer when it is valid JSON
+        and assembled from the streamed parts otherwise
+
+        Raises:
+            ValueError: If no verdict was received
+        """
+        try:
+            data = json.loads(self.buffer)
+            if isinstance(data, dict) and "verdict" in data and "explanation" in data:
+                return {"verdict": data["verdict"], "explanation": data["explanation"]}
+        except ValueError:
+            pass
+        if self.verdict is None:
+            raise ValueError("No verdict in the streamed response")
+        return {"verdict": self.verdict, "explanation": "".join(self.explanation_parts)}
+
+
+def events_from_result(result: dict) -> Iterator[dict]:
+    """
+    Stream events for a verdict that was generated in one piece
+    """
+    yield {"type": "verdict", "verdict": result["verdict"]}
+    if result.get("explanation"):
+        yield {"type": "explanation", "delta": result["explanation"]}
+    yield dict(result, type="done")
+
+
+def encode_event(event: dict) -> bytes:
+    """
+    Encode one stream event as an NDJSON line
+    """
+    return orjson.dumps(event) + b"\n"
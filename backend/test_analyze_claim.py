@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the /analyze_claim endpoints: revalidation, streaming and disconnects
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from embedding_utils import EmbeddingBatcher
+from quota_utils import ClientQuotas, FairScheduler
+
+HISTORICAL_ENTRY = {
+    "verdict": "Likely False",
+    "explanation": "Debunked by the agency.",
+    "timestamp": "2026-01-01T00:00:00",
+    "source_links": [{"title": "Agency notice", "url": "https://agency.gov/notice", "source": "agency.gov", "snippet": None}],
+    "similarity_score": 0.97
+}
+
+
+@pytest.fixture
+def claim_history(monkeypatch):
+    async def check_time_dependency(claim_text, deadline=None):
+        return {"is_time_dependent": False, "dependency_duration_days": 0}
+
+    async def check_claim_history(*args, **kwargs):
+        return dict(HISTORICAL_ENTRY)
+
+    monkeypatch.setattr(main, "check_time_dependency", check_time_dependency)
+    monkeypatch.setattr(main, "embedding_batcher", None)
+    monkeypatch.setattr(main, "check_claim_history", check_claim_history)
+    return TestClient(main.app)
+
+
+def test_history_hits_are_validated_and_revalidated_with_etags(claim_history):
+    first = claim_history.post("/analyze_claim", json={"claim_text": "The agency banned cash"})
+    assert first.status_code == 200
+    # Validated against AnalyzeClaimResponse: unset fields are dropped, not sent as null
+    assert "snippet" not in first.json()["source_links"][0]
+
+    revalidated = claim_history.post("/analyze_claim", json={"claim_text": "The agency banned cash"}, headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_streamed_history_hits_ignore_if_none_match(claim_history):
+    etag = claim_history.post("/analyze_claim", json={"claim_text": "The agency banned cash"}).headers["etag"]
+
+    response = claim_history.post("/analyze_claim/stream", json={"claim_text": "The agency banned cash"}, headers={"If-None-Match": etag})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["result"]
+    assert events[0]["result"]["verdict"] == "Likely False"
+
+
+def test_analysis_quota_is_refunded_when_no_slot_frees_up(claim_history, monkeypatch):
+    async def no_history(*args, **kwargs):
+        return None
+
+    busy = FairScheduler(max_concurrent=1)
+    busy.active = 1
+    quotas = ClientQuotas(analyses_per_minute=0, analysis_burst=1)
+    monkeypatch.setattr(main, "check_claim_history", no_history)
+    monkeypatch.setattr(main, "analysis_scheduler", busy)
+    monkeypatch.setattr(main, "client_quotas", quotas)
+
+    for _ in range(2):
+        response = claim_history.post("/analyze_claim", json={"claim_text": "A new claim"}, headers={"X-Request-Deadline-Ms": "50"})
+        # 503 every time, never 429: the analysis token comes back when no analysis ran
+        assert response.status_code == 503
+    usage = quotas.usage(quotas.identify(None, "testclient"))
+    assert usage.buckets["analysis"].tokens == 1.0 and quotas.stats()["anonymous"]["analyses"] == 0
+
+
+class BlockingEmbeddingFunction:
+    """Fake embedding function whose first call blocks until released"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        return [[1.0, 0.0] for _ in input]
+
+
+class DisconnectingRequest:
+    """Request whose client goes away once the claim embedding has started"""
+
+    def __init__(self, embedding_function):
+        self.embedding_function = embedding_function
+
+    async def is_disconnected(self):
+        return self.embedding_function.started.is_set()
+
+
+def test_disconnect_during_claim_embedding_keeps_serving(claim_history, monkeypatch):
+    embedding_function = BlockingEmbeddingFunction()
+    monkeypatch.setattr(main, "embedding_batcher", EmbeddingBatcher(embedding_function, max_wait_ms=1))
+    monkeypatch.setattr(main, "DISCONNECT_POLL_SECONDS", 0.01)
+
+    request = DisconnectingRequest(embedding_function)
+    pipeline = main.run_claim_analysis(main.ClaimRequest(claim_text="The agency banned cash"), request, None, True, None, "anonymous")
+    response = asyncio.run(main.cancel_on_disconnect(request, pipeline))
+    assert response.status_code == main.CLIENT_CLOSED_REQUEST
+
+    # The abandoned embedding finishes after its caller is gone; the batcher must survive it
+    embedding_function.release.set()
+    next_response = claim_history.post("/analyze_claim", json={"claim_text": "The agency banned cash"})
+    assert next_response.status_code == 200 and next_response.json()["verdict"] == "Likely False"
+    assert embedding_function.calls == 2
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for full-article evidence fetching against a local HTTP server
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import article_utils
+from article_utils import ArticleCache, ArticleFetcher, attach_article_texts, extract_article_text
+from deadline_utils import Deadline
+
+PARAGRAPH = "The city council approved the new transit budget on Tuesday after a lengthy public debate."
+ARTICLE_HTML = f"""<html><head><title>Budget</title><script>var tracking = "ignore me please";</script></head>
+<body><nav><a href="/">Home</a> <a href="/news">News and more news from the whole wide world</a></nav>
+<div class="cookie-banner"><p>We use cookies to improve your experience on this website, accept them all.</p></div>
+<article><h1>Council approves budget</h1><p>{PARAGRAPH}</p>
+<p>Officials said the plan adds <a href="/buses">twelve electric buses</a> to the fleet by the end of next year.</p>
+<ul><li><a href="/a">Related story number one about something else</a></li><li><a href="/b">Related story number two about other things</a></li></ul>
+</article><footer><p>Copyright 2026 Example News. All rights reserved by the publisher and partners.</p></footer></body></html>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        StandInHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/slow":
+            time.sleep(1)
+        if self.path.startswith("/article") and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ("<p>" + PARAGRAPH + "</p>") * 2000 if self.path == "/large" else ARTICLE_HTML
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        try:
+            self.wfile.write(body.encode("utf-8"))
+        except BrokenPipeError:
+            pass  # The fetcher stops reading at its byte cap
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    StandInHandler.requests = []
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_extract_article_text_strips_boilerplate():
+    text = extract_article_text(ARTICLE_HTML)
+    assert text.split("\n") == [PARAGRAPH, "Officials said the plan adds twelve electric buses to the fleet by the end of next year."]
+
+
+def test_fetcher_caches_revalidates_and_caps_pages(server, tmp_path, monkeypatch):
+    async def scenario():
+        fetcher = ArticleFetcher(cache=ArticleCache(str(tmp_path)), max_bytes=20000, timeout_seconds=0.5, ttl_seconds=0, allow_private_hosts=True)
+        monkeypatch.setattr(article_utils, "article_fetcher", fetcher)
+        try:
+            first = await fetcher.fetch(f"{server}/article")
+            # Stale entry: revalidated with its ETag; the tracked variant of the URL shares the entry
+            second = await fetcher.fetch(f"{server}/article?utm_source=feed")
+            large = await fetcher.fetch(f"{server}/large")
+            slow = await fetcher.fetch(f"{server}/slow")
+            results = await attach_article_texts([{"title": "Budget", "snippet": "...", "url": f"{server}/article"},
+                                                  {"title": "No link", "snippet": "..."}])
+        finally:
+            await fetcher.aclose()
+        return first, second, large, slow, results, fetcher.stats()
+
+    first, second, large, slow, results, stats = asyncio.run(scenario())
+    assert first == second and first.startswith(PARAGRAPH)
+    assert StandInHandler.requests[:2] == [("/article", None), ("/article?utm_source=feed", '"v1"')]
+    assert large.startswith(PARAGRAPH) and stats["truncated"] == 1
+    assert slow is None and stats["failures"] == 1
+    assert results[0]["content"] == first and "content" not in results[1]
+    assert stats["revalidated"] == 2 and stats["fetched"] == 2
+
+
+def test_waiting_for_a_host_slot_counts_against_the_page_timeout(server):
+    async def scenario():
+        fetcher = ArticleFetcher(max_per_host=1, timeout_seconds=2, allow_private_hosts=True)
+        try:
+            slow = asyncio.create_task(fetcher.fetch(f"{server}/slow"))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            # The slow page holds the host's only slot for a second, far beyond this deadline
+            queued = await fetcher.fetch(f"{server}/article", Deadline(0.3))
+            waited = time.perf_counter() - started
+            await slow
+        finally:
+            await fetcher.aclose()
+        return queued, waited, dict(fetcher._host_semaphores)
+
+    queued, waited, host_semaphores = asyncio.run(scenario())
+    assert queued is None and waited < 0.6
+    # Idle hosts do not keep a semaphore around
+    assert host_semaphores == {}
+
+
+def test_private_hosts_are_refused_before_and_after_redirects(server):
+    requested = []
+
+    def public_site(request):
+        requested.append(str(request.url))
+        return httpx.Response(302, headers={"Location": "http://169.254.169.254/latest/meta-data/"})
+
+    async def scenario():
+        fetcher = ArticleFetcher()
+        try:
+            direct = await fetcher.fetch(f"{server}/article")
+            fetcher._get_client()._transport = httpx.MockTransport(public_site)
+            redirected = await fetcher.fetch("http://93.184.215.14/story")
+        finally:
+            await fetcher.aclose()
+        return direct, redirected, fetcher.stats()
+
+    direct, redirected, stats = asyncio.run(scenario())
+    assert direct is None and StandInHandler.requests == []
+    assert redirected is None and requested == ["http://93.184.215.14/story"]
+    assert stats["failures"] == 2
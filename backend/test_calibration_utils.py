@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for similarity threshold calibration
+"""
+
+import json
+import math
+from datetime import datetime
+
+import chromadb
+
+from calibration_utils import calibrate, load_similarity_thresholds, similarity_threshold_for
+from partition_utils import PartitionedClaims
+
+GROUPS = 20
+DIMENSIONS = 2 * GROUPS
+
+
+def unit_vector(group: int, cosine: float) -> list:
+    # Each pair of claims lives in its own plane, so pairs never match each other
+    vector = [0.0] * DIMENSIONS
+    vector[group] = cosine
+    vector[GROUPS + group] = math.sqrt(1.0 - cosine ** 2)
+    return vector
+
+
+def test_calibration_separates_paraphrases_from_different_claims(tmp_path):
+    store = PartitionedClaims(chromadb.PersistentClient(path=str(tmp_path)))
+    now = datetime.utcnow().isoformat()
+    ids, embeddings, metadatas = [], [], []
+    for group in range(GROUPS):
+        # Even groups: paraphrases (similarity 0.98) with the same verdict;
+        # odd groups: different claims (similarity 0.56) with opposite verdicts
+        paraphrase = group % 2 == 0
+        for member, verdict in enumerate(["Likely True", "Likely True" if paraphrase else "Likely False"]):
+            ids.append(f"{group}-{member}")
+            embeddings.append(unit_vector(group, 1.0 if member == 0 else (0.99 if paraphrase else 0.78)))
+            metadatas.append({"verdict": verdict, "timestamp": now, "is_time_dependent": False, "dependency_duration_days": 0})
+    store.upsert(ids=ids, documents=ids, embeddings=embeddings, metadatas=metadatas)
+
+    report = calibrate(store, min_hits=5, default_threshold=0.8)
+    timeless = report["categories"]["timeless"]
+    assert timeless["queries"] == 2 * GROUPS and timeless["calibrated"]
+    assert report["thresholds"]["timeless"] == 0.57
+    assert timeless["hit_rate"] == 0.5 and timeless["inaccuracy"] == 0.0
+    assert next(point for point in timeless["curve"] if point["threshold"] == 0.5)["inaccuracy"] == 0.5
+    # No time-dependent claims: that category keeps the default
+    assert report["thresholds"]["time_dependent"] == 0.8 and not report["categories"]["time_dependent"]["calibrated"]
+
+    path = tmp_path / "similarity_thresholds.json"
+    path.write_text(json.dumps(report))
+    thresholds = load_similarity_thresholds(str(path))
+    assert thresholds == {"timeless": 0.57, "time_dependent": 0.8}
+    assert similarity_threshold_for({"is_time_dependent": False}, 0.7, thresholds) == 0.57
+    assert similarity_threshold_for(None, 0.7, {}) == 0.7
+    assert load_similarity_thresholds(str(tmp_path / "missing.json")) == {}
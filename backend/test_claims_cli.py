@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk claim import, checkpoint resume, and snapshot export/restore
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+import chromadb
+import pytest
+
+import claims_cli
+from partition_utils import PartitionedClaims
+
+RECORDS = [
+    {"claim_text": "The Earth orbits the Sun", "verdict": "Likely True", "explanation": "Astronomy"},
+    {"claim": "Bitcoin is up today", "verdict": "Likely True", "is_time_dependent": True, "dependency_duration_days": 3,
+     "timestamp": datetime.utcnow().isoformat()},
+    {"claim_text": "   ", "verdict": "Likely False"},
+    {"claim_text": "Water boils at 50 degrees at sea level", "verdict": "Likely False",
+     "search_results": [{"title": "Boiling point", "url": "https://example.gov/water", "source": "example.gov", "snippet": "100 degrees"}]},
+    {"claim_text": "The Moon is made of cheese", "verdict": "Likely False"},
+    {"claim_text": "Paris is the capital of France", "verdict": "Likely True"}
+]
+
+
+class CountingEmbeddingFunction:
+    """Fake embedding function recording batch sizes; fails on the call given by fail_on_call"""
+
+    def __init__(self, fail_on_call: int = None):
+        self.calls = []
+        self.fail_on_call = fail_on_call
+
+    def __call__(self, input):
+        self.calls.append(len(input))
+        if len(self.calls) == self.fail_on_call:
+            raise RuntimeError("worker killed")
+        return [[float(len(text)), float(text.count(" ")), 1.0] for text in input]
+
+
+def use_store(monkeypatch, path, embedding_function):
+    store = PartitionedClaims(chromadb.PersistentClient(path=str(path)), bucket_days=1, max_age_days=30)
+    monkeypatch.setattr(claims_cli, "open_collection", lambda args: (store, embedding_function))
+    return store
+
+
+def snapshot_of(store) -> dict:
+    page = store.get(include=["documents", "metadatas"])
+    return {claim_id: (document, metadata) for claim_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"])}
+
+
+def test_import_resumes_after_a_crash_and_snapshots_round_trip(monkeypatch, tmp_path):
+    dataset = tmp_path / "dataset.jsonl"
+    dataset.write_text("\n".join(json.dumps(record) for record in RECORDS) + "\n", encoding="utf-8")
+    import_args = argparse.Namespace(path=str(dataset), batch_size=2, checkpoint=None, restart=False)
+
+    # The second flush crashes: only the first chunk is stored and checkpointed
+    store = use_store(monkeypatch, tmp_path / "store", CountingEmbeddingFunction(fail_on_call=2))
+    with pytest.raises(RuntimeError):
+        claims_cli.command_import(import_args)
+    assert store.count() == 2
+    assert json.loads((tmp_path / "dataset.jsonl.checkpoint.json").read_text())["records_done"] == 2
+
+    # Resuming embeds only the remaining records, in batches
+    embedding_function = CountingEmbeddingFunction()
+    store = use_store(monkeypatch, tmp_path / "store", embedding_function)
+    claims_cli.command_import(import_args)
+    assert embedding_function.calls == [2, 1]
+    assert store.count() == 5 and store.count(time_dependency_info={"is_time_dependent": True, "dependency_duration_days": 3}) == 1
+    original = snapshot_of(store)
+
+    snapshot_path = str(tmp_path / "snapshot.npz")
+    claims_cli.command_export(argparse.Namespace(path=snapshot_path, batch_size=2))
+
+    restore_embedding_function = CountingEmbeddingFunction()
+    restored_store = use_store(monkeypatch, tmp_path / "restored", restore_embedding_function)
+    claims_cli.command_restore(argparse.Namespace(path=snapshot_path, batch_size=2))
+
+    assert snapshot_of(restored_store) == original
+    assert restore_embedding_function.calls == []
+    assert restored_store.get(ids=list(original), include=["embeddings"])["embeddings"] is not None
+
+
+def test_parquet_records(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    pa = pytest.importorskip("pyarrow")
+    path = str(tmp_path / "dataset.parquet")
+    pq.write_table(pa.Table.from_pylist([{"claim": "The Earth orbits the Sun", "verdict": "Likely True"}]), path)
+
+    entries = [claims_cli.record_to_entry(record) for record in claims_cli.read_records(path)]
+    assert [(document, metadata["verdict"]) for _, document, metadata in entries] == [("The Earth orbits the Sun", "Likely True")]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for request deadlines and deadline-driven degradation
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import deadline_utils
+import llm_utils
+from db_utils import check_claim_history
+from deadline_utils import DEADLINE_NEAR_MATCH_THRESHOLD, MAX_REQUEST_DEADLINE_SECONDS, REQUEST_DEADLINE_SECONDS, Deadline, with_deadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Only deadlines see the fake clock; the event loop keeps the real one
+    monkeypatch.setattr(deadline_utils, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_deadline_budget_and_stage_shares(clock):
+    deadline = Deadline.from_header("10000")
+    assert deadline.remaining() == 10.0
+    assert Deadline.from_header(None).remaining() == REQUEST_DEADLINE_SECONDS
+    assert Deadline.from_header("not-a-number").remaining() == REQUEST_DEADLINE_SECONDS
+    assert Deadline.from_header(str(10 * MAX_REQUEST_DEADLINE_SECONDS * 1000)).remaining() == MAX_REQUEST_DEADLINE_SECONDS
+
+    clock.now += 4.0
+    stage = deadline.stage(0.5)
+    assert stage.remaining() == 3.0 and deadline.has_time_for(6.0)
+    clock.now += 3.0
+    assert stage.expired() and not deadline.expired()
+    clock.now += 10.0
+    assert deadline.remaining() == 0.0 and deadline.stage(0.5).expired()
+
+
+def test_with_deadline(clock):
+    async def answer():
+        return 42
+
+    assert asyncio.run(with_deadline(answer(), None, "test")) == 42
+    assert asyncio.run(with_deadline(answer(), Deadline(1.0), "test")) == 42
+
+    # An expired deadline never starts the call
+    expired = Deadline(0.0)
+    coroutine = answer()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(with_deadline(coroutine, expired, "test"))
+    assert coroutine.cr_frame is None
+
+
+def test_slow_stage_times_out_and_marks_time_dependency_unknown(monkeypatch):
+    class SlowModel:
+        def generate_content(self, prompt, generation_config=None, request_options=None):
+            time.sleep(0.5)
+
+    async def get_model(template):
+        return SlowModel()
+
+    monkeypatch.setattr(llm_utils, "api_key", "test-key")
+    monkeypatch.setattr(llm_utils, "get_gemini_model", get_model)
+
+    result = asyncio.run(llm_utils.check_time_dependency("Bitcoin is up today", Deadline(0.05)))
+    assert result == {"is_time_dependent": False, "dependency_duration_days": 0, "timed_out": True}
+
+
+class FakeCollection:
+    """Claim store returning one stored claim at a fixed similarity"""
+
+    def __init__(self, similarity: float):
+        self.similarity = similarity
+
+    def count(self, time_dependency_info=None):
+        return 1
+
+    def get(self, ids=None, include=None, time_dependency_info=None):
+        return {"ids": []}
+
+    def query(self, query_embeddings=None, query_texts=None, n_results=5, include=None, time_dependency_info=None):
+        metadata = {"verdict": "Likely False", "explanation": "Debunked", "timestamp": "2026-01-01T00:00:00"}
+        return {"ids": [["stored"]], "distances": [[1.0 - self.similarity]], "documents": [["Stored claim"]], "metadatas": [[metadata]]}
+
+
+def test_near_matches_are_accepted_only_close_to_the_deadline(clock):
+    similarity = (DEADLINE_NEAR_MATCH_THRESHOLD + 0.8) / 2
+    collection = FakeCollection(similarity)
+
+    async def lookup(deadline):
+        return await check_claim_history("A paraphrased claim", collection, 0.8, None, [1.0, 0.0], deadline)
+
+    assert asyncio.run(lookup(Deadline(20.0))) is None
+
+    match = asyncio.run(lookup(Deadline(1.0)))
+    assert match["verdict"] == "Likely False"
+    assert match["near_match"] and match["similarity_score"] == pytest.approx(similarity)
+
+    # Below the near-match threshold nothing is served, even at the deadline
+    collection.similarity = DEADLINE_NEAR_MATCH_THRESHOLD - 0.1
+    assert asyncio.run(lookup(Deadline(1.0))) is None
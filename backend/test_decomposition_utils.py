@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Test script for sub-claim cleanup and verdict aggregation
+"""
+
+from decomposition_utils import aggregate_sub_verdicts, clean_sub_claims
+
+
+def test_clean_sub_claims_keeps_atomic_claims_whole():
+    claim = "The bridge opened in 2020"
+    assert clean_sub_claims(claim, [claim]) == [claim]
+    assert clean_sub_claims(claim, ["", "  "]) == [claim]
+    assert clean_sub_claims(claim, ["A happened.", "a happened", " B  cost $5 "]) == ["A happened.", "B cost $5"]
+    assert len(clean_sub_claims(claim, [f"Fact {i}" for i in range(10)], max_sub_claims=4)) == 4
+
+
+def test_aggregate_sub_verdicts():
+    def parts(*verdicts):
+        return [{"claim": f"part {i}", "verdict": verdict, "explanation": "..."} for i, verdict in enumerate(verdicts)]
+
+    assert aggregate_sub_verdicts(parts("Likely True", "Likely True"))["verdict"] == "Likely True"
+    assert aggregate_sub_verdicts(parts("Likely True", "Likely False", "Error"))["verdict"] == "Likely False"
+    assert aggregate_sub_verdicts(parts("Likely True", "Error"))["verdict"] == "Uncertain/Needs More Info"
+    assert "part 1" in aggregate_sub_verdicts(parts("Likely True", "Uncertain/Needs More Info"))["explanation"]
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for search result canonicalization and fusion
+"""
+
+from dedup_utils import canonicalize_url, estimate_jaccard, fuse_results, minhash_signature, text_shingles
+
+
+def test_canonicalize_url_folds_tracking_amp_and_mobile_variants():
+    canonical = canonicalize_url("https://www.example.com/news/story?id=7")
+    assert canonicalize_url("http://m.example.com/news/story/?utm_source=x&id=7&fbclid=abc") == canonical
+    assert canonicalize_url("https://amp.example.com/news/story/amp?id=7#comments") == canonical
+    assert canonicalize_url("https://example.com/news/other?id=7") != canonical
+
+
+def test_minhash_estimates_similar_snippets():
+    base = "The central bank raised interest rates by half a percentage point on Wednesday to fight inflation"
+    syndicated = base + " according to officials"
+    unrelated = "A new species of frog was discovered in the rainforests of Ecuador by a team of biologists"
+
+    assert estimate_jaccard(minhash_signature(text_shingles(base)), minhash_signature(text_shingles(syndicated))) >= 0.6
+    assert estimate_jaccard(minhash_signature(text_shingles(base)), minhash_signature(text_shingles(unrelated))) < 0.2
+
+
+def test_fuse_results_merges_duplicates_and_ranks_by_agreement():
+    snippet = "Officials confirmed the bridge will close for repairs starting next Monday for three weeks"
+    engine_results = {
+        "Tavily": [
+            {"title": "Unique Tavily result", "snippet": "Something only one engine found about the topic today", "url": "https://a.com/1"},
+            {"title": "Bridge to close", "snippet": snippet, "url": "https://news.com/bridge?utm_campaign=x"},
+        ],
+        "SerpAPI": [
+            {"title": "Bridge to close for repairs", "snippet": snippet, "url": "https://m.news.com/bridge"},
+        ],
+        "DuckDuckGo": [
+            {"title": "City bridge closing - Syndicated", "snippet": snippet + " officials said", "url": "https://mirror.org/bridge"},
+            {"title": "No title available", "snippet": "No snippet available", "url": "https://b.com/2"},
+            {"title": "No title available", "snippet": "No snippet available", "url": "https://c.com/3"},
+        ],
+    }
+
+    fused, duplicates = fuse_results(engine_results, 9)
+
+    assert duplicates == 2
+    assert fused[0]["url"] == "https://news.com/bridge?utm_campaign=x"
+    assert [result["url"] for result in fused].count("https://b.com/2") == 1
+    assert len(fused) == 4
+
+
+if __name__ == "__main__":
+    test_canonicalize_url_folds_tracking_amp_and_mobile_variants()
+    test_minhash_estimates_similar_snippets()
+    test_fuse_results_merges_duplicates_and_ranks_by_agreement()
+    print("✅ Result fusion tests passed")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the embedding backends and their similarity parity check
+"""
+
+import chromadb
+import numpy as np
+import pytest
+
+from embedding_backends import OnnxEmbeddingFunction, check_similarity_parity
+
+DOCUMENTS = ["The Earth orbits the Sun", "The Sun is orbited by the Earth", "Bitcoin hit a record high", "It rained in Paris"]
+
+
+class StubModel:
+    """Small deterministic "model": a fixed random projection of character counts"""
+
+    def __init__(self, seed: int = 0, noise: float = 0.0):
+        self.projection = np.random.default_rng(seed).normal(size=(128, 16))
+        self.noise = noise
+        self.rng = np.random.default_rng(seed + 1)
+
+    def __call__(self, input):
+        counts = np.zeros((len(input), 128))
+        for i, text in enumerate(input):
+            for char in text.lower():
+                counts[i, ord(char) % 128] += 1
+        embeddings = counts @ self.projection
+        return list(embeddings + self.noise * self.rng.normal(size=embeddings.shape))
+
+
+def test_parity_of_a_matching_backend():
+    reference = StubModel()(DOCUMENTS)
+    report = check_similarity_parity(StubModel(noise=0.01), DOCUMENTS, reference, similarity_threshold=0.8)
+
+    assert report["documents"] == 4
+    assert report["min_self_similarity"] > 0.999
+    assert report["max_pair_similarity_difference"] < 0.01
+    assert report["threshold_decision_agreement"] == 1.0
+
+
+def test_parity_flags_a_different_model():
+    reference = StubModel()(DOCUMENTS)
+    report = check_similarity_parity(StubModel(seed=42), DOCUMENTS, reference, similarity_threshold=0.8)
+
+    assert report["min_self_similarity"] < 0.9
+    assert report["max_pair_similarity_difference"] > 0.05
+
+
+def test_onnx_function_opens_sentence_transformer_collections(tmp_path):
+    embedding_function = OnnxEmbeddingFunction()
+    assert embedding_function.name() == "sentence_transformer"
+
+    chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection("claims_history", embedding_function=embedding_function)
+    reopened = chromadb.PersistentClient(path=str(tmp_path)).get_collection("claims_history", embedding_function=OnnxEmbeddingFunction())
+    assert reopened.configuration_json["embedding_function"]["name"] == "sentence_transformer"
+
+
+def test_int8_backend_refuses_unchecked_chromadb(monkeypatch):
+    monkeypatch.setattr(chromadb, "__version__", "99.0.0")
+    with pytest.raises(RuntimeError, match="onnx-int8"):
+        OnnxEmbeddingFunction(quantize=True)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for the embedding micro-batcher
+"""
+
+import asyncio
+import threading
+
+from embedding_utils import EmbeddingBatcher
+
+
+class RecordingEmbeddingFunction:
+    """Fake embedding function that records the size of every batch it receives"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, input):
+        self.release.wait(timeout=5)
+        self.calls.append(len(input))
+        return [[float(len(text)), 1.0] for text in input]
+
+
+def test_concurrent_requests_share_a_batch():
+    embedding_function = RecordingEmbeddingFunction()
+    batcher = EmbeddingBatcher(embedding_function, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        tasks = [asyncio.create_task(batcher.embed_one("x" * i)) for i in range(1, 6)]
+        await asyncio.sleep(0.01)
+        embedding_function.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(run())
+
+    # Every caller gets its own embedding back, in order
+    assert [result[0] for result in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert sum(embedding_function.calls) == 5
+    assert len(embedding_function.calls) < 5
+    assert batcher.stats()["total_texts"] == 5
+
+
+def test_batch_size_is_capped():
+    embedding_function = RecordingEmbeddingFunction()
+    embedding_function.release.set()
+    batcher = EmbeddingBatcher(embedding_function, max_batch_size=2, max_wait_ms=20)
+
+    futures = [batcher.submit([f"claim {i}"]) for i in range(5)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert max(embedding_function.calls) <= 2
+    assert sum(int(size) * count for size, count in batcher.stats()["batch_size_histogram"].items()) == 5
+
+
+def test_large_submit_is_split_into_capped_batches():
+    embedding_function = RecordingEmbeddingFunction()
+    embedding_function.release.set()
+    batcher = EmbeddingBatcher(embedding_function, max_batch_size=4, max_wait_ms=1)
+
+    embeddings = batcher([f"sentence {i}" for i in range(10)])
+
+    assert len(embeddings) == 10
+    assert embedding_function.calls == [4, 4, 2]
+
+
+def test_cancelled_callers_do_not_stop_the_batcher():
+    embedding_function = RecordingEmbeddingFunction()
+    batcher = EmbeddingBatcher(embedding_function, max_batch_size=8, max_wait_ms=1)
+
+    async def run():
+        # One caller is cancelled while its batch runs, another while it is still queued
+        running = asyncio.create_task(batcher.embed_one("running"))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(batcher.embed_one("queued"))
+        await asyncio.sleep(0.01)
+        running.cancel()
+        queued.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        embedding_function.release.set()
+        return await asyncio.wait_for(batcher.embed_one("next"), timeout=5)
+
+    assert asyncio.run(run())[0] == 4.0
+    assert embedding_function.calls == [1, 1]
+    assert batcher(["after"])[0][0] == 5.0
+
+
+def test_errors_reach_every_caller():
+    def failing_embedding_function(input):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(failing_embedding_function, max_batch_size=4, max_wait_ms=1)
+    try:
+        batcher(["claim"])
+    except RuntimeError as e:
+        assert "model unavailable" in str(e)
+    else:
+        raise AssertionError("Expected the embedding error to propagate")
+
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_a_batch()
+    test_batch_size_is_capped()
+    test_large_submit_is_split_into_capped_batches()
+    test_cancelled_callers_do_not_stop_the_batcher()
+    test_errors_reach_every_caller()
+    print("✅ Embedding batcher tests passed")
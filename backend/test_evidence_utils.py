@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for evidence selection within the verdict prompt token budget
+"""
+
+import asyncio
+
+from evidence_utils import EVIDENCE_MAX_CANDIDATE_SENTENCES, count_evidence_tokens, select_evidence
+
+KEYWORDS = ("bridge", "collapse", "river", "weather", "football", "mirror")
+CLAIM = "The bridge over the river collapsed"
+
+
+class KeywordBatcher:
+    """Fake embedding batcher: one dimension per keyword, recording request sizes"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def embed(self, texts):
+        self.requests.append(len(texts))
+        return [[float(keyword in text.lower()) for keyword in KEYWORDS] + [0.1] for text in texts]
+
+
+def result(title: str, snippet: str, url: str = "https://example.com/a") -> dict:
+    return {"title": title, "snippet": snippet, "url": url, "source": url}
+
+
+def test_ranking_prefers_relevant_and_official_sources_and_drops_duplicates():
+    results = [
+        result("Weather today", "Sunny weather expected."),
+        result("Bridge collapse", "The bridge over the river collapsed on Monday.", "https://blog.example.com/post"),
+        result("Bridge collapse", "The bridge over the river collapsed on Monday.", "https://www.reuters.com/world/bridge"),
+        result("Bridge collapse", "Officials confirm the river bridge collapse.", "https://transport.gov/notice")
+    ]
+
+    selected = asyncio.run(select_evidence(CLAIM, results, KeywordBatcher(), token_budget=1000))
+
+    urls = [item["url"] for item in selected]
+    # Identical embeddings: the government copy wins, the news and blog mirrors are dropped as duplicates
+    assert urls[0] == "https://transport.gov/notice"
+    assert "https://blog.example.com/post" not in urls and "https://www.reuters.com/world/bridge" not in urls
+    assert urls[-1] == "https://example.com/a"
+
+
+def test_token_budget_and_sentence_trimming():
+    article = " ".join(["Football scores were announced."] * 40 + ["The bridge over the river collapsed at noon."])
+    results = [dict(result("Bridge collapse", "Short snippet."), content=article), result("Weather", "Sunny weather expected. " * 30)]
+    batcher = KeywordBatcher()
+
+    selected = asyncio.run(select_evidence(CLAIM, results, batcher, token_budget=60))
+
+    assert count_evidence_tokens(selected) <= 60
+    assert [item["title"] for item in selected] == ["Bridge collapse"]
+    assert "bridge over the river collapsed" in selected[0]["snippet"] and "content" not in selected[0]
+    # Long articles are pre-filtered before embedding
+    assert batcher.requests == [1 + len(results) + 2 * EVIDENCE_MAX_CANDIDATE_SENTENCES]
+
+
+def test_fallback_without_batcher_keeps_search_order_within_budget():
+    results = [dict(result("First", "A" * 200), content="full text"), result("Second", "B" * 2000), result("Third", "C" * 40)]
+
+    selected = asyncio.run(select_evidence(CLAIM, results, None, token_budget=100))
+
+    assert [item["title"] for item in selected] == ["First", "Third"]
+    assert all("content" not in item for item in selected)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for batched feedback aggregation and the vote-threshold rule
+"""
+
+from feedback_utils import FeedbackAggregator, get_feedback_status
+
+
+class FakeCollection:
+    def __init__(self, metadatas):
+        self.metadatas = metadatas
+        self.update_calls = 0
+
+    def get(self, ids, include=None):
+        found = [claim_id for claim_id in ids if claim_id in self.metadatas]
+        return {"ids": found, "metadatas": [dict(self.metadatas[claim_id]) for claim_id in found]}
+
+    def update(self, ids, metadatas):
+        self.update_calls += 1
+        for claim_id, metadata in zip(ids, metadatas):
+            self.metadatas[claim_id] = metadata
+
+
+def test_feedback_status_needs_enough_inaccurate_votes():
+    assert get_feedback_status({}) is None
+    assert get_feedback_status({"user_feedback": "inaccurate"}) is None
+    assert get_feedback_status({"feedback_accurate": 1, "feedback_inaccurate": 2}) == "accurate"
+    assert get_feedback_status({"feedback_accurate": 1, "feedback_inaccurate": 3}) == "inaccurate"
+    assert get_feedback_status({"feedback_accurate": 5, "feedback_inaccurate": 3}) == "accurate"
+
+
+def test_aggregator_flushes_batches_and_replays_unflushed_votes(tmp_path):
+    log_path = str(tmp_path / "feedback_log.jsonl")
+    collection = FakeCollection({"a": {"verdict": "Likely True", "user_feedback": "inaccurate"}, "b": {"verdict": "Likely False"}})
+
+    aggregator = FeedbackAggregator(log_path)
+    for _ in range(2):
+        aggregator.record("a", "inaccurate")
+    aggregator.record("b", "accurate")
+    aggregator.record("missing", "accurate")
+    assert aggregator.flush(collection) == 2
+    assert collection.update_calls == 1
+    assert collection.metadatas["a"]["feedback_inaccurate"] == 3  # Legacy single click counts as one vote
+    assert get_feedback_status(collection.metadatas["a"]) == "inaccurate"
+
+    aggregator.record("b", "inaccurate")
+    aggregator.close()
+
+    # Only the vote logged after the last flush is replayed
+    replayed = FeedbackAggregator(log_path)
+    assert replayed.stats()["pending_claims"] == 1
+    replayed.flush(collection)
+    assert collection.metadatas["b"]["feedback_accurate"] == 1
+    assert collection.metadatas["b"]["feedback_inaccurate"] == 1
+    replayed.close()
+
+
+def test_one_vote_per_client_and_claim(tmp_path):
+    log_path = str(tmp_path / "feedback_log.jsonl")
+    collection = FakeCollection({"a": {"verdict": "Likely True"}})
+
+    aggregator = FeedbackAggregator(log_path)
+    assert aggregator.record("a", "inaccurate", "anonymous:203.0.113.1")
+    for _ in range(2):
+        assert not aggregator.record("a", "inaccurate", "anonymous:203.0.113.1")
+    aggregator.flush(collection)
+    assert collection.metadatas["a"]["feedback_inaccurate"] == 1
+    assert get_feedback_status(collection.metadatas["a"]) is None
+    assert "203.0.113.1" not in open(log_path, encoding="utf-8").read()
+    aggregator.close()
+
+    # Votes survive a restart, and changing one moves it instead of adding a second
+    replayed = FeedbackAggregator(log_path)
+    assert not replayed.record("a", "inaccurate", "anonymous:203.0.113.1")
+    assert replayed.record("a", "accurate", "anonymous:203.0.113.1")
+    replayed.flush(collection)
+    assert collection.metadatas["a"]["feedback_inaccurate"] == 0 and collection.metadatas["a"]["feedback_accurate"] == 1
+    replayed.close()
+
+
+class FailingCollection(FakeCollection):
+    """Fake collection whose update fails from the given call on"""
+
+    def __init__(self, metadatas, fail_from_call):
+        super().__init__(metadatas)
+        self.fail_from_call = fail_from_call
+
+    def update(self, ids, metadatas):
+        if self.update_calls + 1 >= self.fail_from_call:
+            raise RuntimeError("store unavailable")
+        super().update(ids, metadatas)
+
+
+def test_partial_flush_is_not_replayed_twice(tmp_path, monkeypatch):
+    monkeypatch.setattr("feedback_utils.FEEDBACK_FLUSH_BATCH_SIZE", 1)
+    log_path = str(tmp_path / "feedback_log.jsonl")
+    collection = FailingCollection({"a": {}, "b": {}}, fail_from_call=2)
+
+    aggregator = FeedbackAggregator(log_path)
+    aggregator.record("a", "inaccurate", "partner-a")
+    aggregator.record("b", "inaccurate", "partner-a")
+    assert aggregator.flush(collection) == 1
+    aggregator.close()
+
+    # Only the batch that failed is replayed after a restart
+    collection.fail_from_call = float("inf")
+    replayed = FeedbackAggregator(log_path)
+    assert replayed.stats()["pending_claims"] == 1
+    replayed.flush(collection)
+    assert collection.metadatas["a"]["feedback_inaccurate"] == 1 and collection.metadatas["b"]["feedback_inaccurate"] == 1
+    replayed.close()
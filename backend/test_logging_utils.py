@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for structured logging, correlation ids and sampling
+"""
+
+import json
+import logging
+import queue
+
+from logging_utils import SAMPLED, JsonFormatter, SampledQueueHandler, new_request_id
+
+
+def make_record(message, *args, **extra):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_queue_handler_tags_request_id_and_samples_per_result_messages():
+    log_queue = queue.SimpleQueue()
+    handler = SampledQueueHandler(log_queue, sample_rate=0.0)
+    new_request_id("req-1")
+
+    handler.handle(make_record("Added result: %s", "https://a.com", **SAMPLED))
+    handler.handle(make_record("Search completed with %s results", 3))
+
+    record = log_queue.get_nowait()
+    assert log_queue.empty()
+    assert record.request_id == "req-1"
+    assert record.msg == "Search completed with 3 results" and record.args is None
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Search completed with 3 results"
+    assert entry["request_id"] == "req-1"
+
+
+def test_mutable_arguments_are_logged_as_they_were_at_the_call():
+    log_queue = queue.SimpleQueue()
+    handler = SampledQueueHandler(log_queue)
+    sources = ["a.com"]
+
+    handler.handle(make_record("Sources: %s", sources))
+    sources.append("b.com")
+
+    assert JsonFormatter().format(log_queue.get_nowait()).count("b.com") == 0
+
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record("stage done", stage="search", duration_ms=12.5)))
+    assert entry["stage"] == "search"
+    assert entry["duration_ms"] == 12.5
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for canonical claim normalization and re-keying claims_history
+"""
+
+import argparse
+
+import claims_cli
+from db_utils import generate_claim_id
+from normalization_utils import normalize_claim_text
+
+
+class FakeCollection:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, ids=None, limit=None, offset=0, include=None):
+        claim_ids = [claim_id for claim_id in ids if claim_id in self.entries] if ids else list(self.entries)[offset:offset + limit]
+        return {
+            "ids": claim_ids,
+            "documents": [self.entries[claim_id]["document"] for claim_id in claim_ids],
+            "metadatas": [dict(self.entries[claim_id]["metadata"]) for claim_id in claim_ids],
+            "embeddings": [self.entries[claim_id]["embedding"] for claim_id in claim_ids]
+        }
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        for claim_id, document, metadata, embedding in zip(ids, documents, metadatas, embeddings):
+            self.entries[claim_id] = {"document": document, "metadata": metadata, "embedding": embedding}
+
+    def delete(self, ids):
+        for claim_id in ids:
+            self.entries.pop(claim_id, None)
+
+
+def test_equivalent_spellings_share_one_claim_id():
+    variants = ["Bitcoin hit $50,000!", "bitcoin hit 50000 dollars", "  Bitcoin hit 50k USD 🚀", "“Bitcoin” hit 50,000.00 US$"]
+    assert {normalize_claim_text(variant) for variant in variants} == {"bitcoin hit 50000 usd"}
+    assert len({generate_claim_id(variant) for variant in variants}) == 1
+    assert generate_claim_id("Bitcoin hit $50,000") != generate_claim_id("Bitcoin hit $60,000")
+
+
+def test_signs_and_comparators_keep_claims_apart():
+    opposites = [
+        ("GDP growth was -2% in 2020", "GDP growth was 2% in 2020"),
+        ("Temperatures fell to -5 degrees", "Temperatures fell to 5 degrees"),
+        ("Temperatures fell to −5 degrees", "Temperatures fell to +5 degrees"),
+        ("Inflation is > 5%", "Inflation is < 5%"),
+        ("Inflation is >= 5%", "Inflation is > 5%"),
+        ("Unemployment ≤ 4%", "Unemployment ≥ 4%")
+    ]
+    for claim, opposite in opposites:
+        assert generate_claim_id(claim) != generate_claim_id(opposite), (claim, opposite)
+
+    assert normalize_claim_text("GDP growth was -2% in 2020") == "gdp growth was minus 2 percent in 2020"
+    assert normalize_claim_text("Inflation is ≥5%") == normalize_claim_text("inflation is >= 5 percent")
+    # Hyphens inside words and ranges are still plain punctuation
+    assert normalize_claim_text("COVID-19 cases rose in 2020-2021") == "covid 19 cases rose in 2020 2021"
+
+
+def test_normalization_keeps_decimals_and_non_latin_text():
+    assert normalize_claim_text("GDP grew 3.50% in Q2.") == "gdp grew 3.5 percent in q2"
+    assert normalize_claim_text("Tesla is worth $1.5 trillion") == "tesla is worth 1500000000000 usd"
+    assert normalize_claim_text("Ｆｕｌｌ width １２３") == "full width 123"
+    assert normalize_claim_text("नमस्ते   दुनिया 👍🏽") == "नमस्ते दुनिया"
+    assert normalize_claim_text("") == ""
+
+
+def test_rekey_merges_duplicates_and_reports_hit_rate(monkeypatch, tmp_path, capsys):
+    collection = FakeCollection({
+        claims_cli.legacy_claim_id("Bitcoin hit $50,000!"): {
+            "document": "Bitcoin hit $50,000!",
+            "metadata": {"verdict": "Likely True", "timestamp": "2024-01-01T00:00:00", "feedback_accurate": 2},
+            "embedding": [1.0, 0.0]
+        },
+        claims_cli.legacy_claim_id("bitcoin hit 50000 dollars"): {
+            "document": "bitcoin hit 50000 dollars",
+            "metadata": {"verdict": "Likely False", "timestamp": "2024-02-01T00:00:00", "feedback_inaccurate": 1},
+            "embedding": [0.0, 1.0]
+        },
+        generate_claim_id("The Earth is flat"): {
+            "document": "The Earth is flat",
+            "metadata": {"verdict": "Likely False", "timestamp": "2024-01-01T00:00:00"},
+            "embedding": [0.5, 0.5]
+        }
+    })
+    monkeypatch.setattr(claims_cli, "open_collection", lambda args: (collection, None))
+    replay_path = tmp_path / "traffic.jsonl"
+    replay_path.write_text('{"claim_text": "Bitcoin hit 50k USD"}\n{"claim_text": "The Earth is flat."}\n', encoding="utf-8")
+
+    claims_cli.command_rekey(argparse.Namespace(replay=str(replay_path), dry_run=False, batch_size=2))
+
+    new_id = generate_claim_id("Bitcoin hit $50,000!")
+    assert set(collection.entries) == {new_id, generate_claim_id("The Earth is flat")}
+    merged = collection.entries[new_id]
+    assert merged["document"] == "bitcoin hit 50000 dollars"
+    assert merged["metadata"]["verdict"] == "Likely False"
+    assert (merged["metadata"]["feedback_accurate"], merged["metadata"]["feedback_inaccurate"]) == (2, 1)
+    assert "exact-hit rate 0.0% -> 100.0%" in capsys.readouterr().out
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for time-partitioned claim storage
+"""
+
+from datetime import date, datetime, timedelta
+
+import chromadb
+from chromadb.api.models.Collection import Collection
+
+from partition_utils import PartitionedClaims, bucket_name, bucket_start
+
+TIMELESS = {"is_time_dependent": False, "dependency_duration_days": 0}
+
+
+def metadata(days_ago: int, duration_days: int = 0) -> dict:
+    return {
+        "verdict": "Likely True",
+        "timestamp": (datetime.utcnow() - timedelta(days=days_ago)).isoformat(),
+        "is_time_dependent": duration_days > 0,
+        "dependency_duration_days": duration_days
+    }
+
+
+def test_weekly_buckets_start_on_monday():
+    assert bucket_start(date(2026, 10, 22)) == date(2026, 10, 19)
+    assert bucket_start(date(2026, 10, 19)) == date(2026, 10, 19)
+    assert bucket_start(date(2026, 10, 22), bucket_days=1) == date(2026, 10, 22)
+    assert bucket_name(date(2026, 10, 25)) == "claims_history_20261019"
+
+
+def test_claims_are_routed_and_queries_only_search_valid_partitions(tmp_path):
+    store = PartitionedClaims(chromadb.PersistentClient(path=str(tmp_path)), bucket_days=1, max_age_days=30)
+    store.upsert(
+        ids=["timeless", "fresh", "stale"],
+        documents=["The Earth orbits the Sun", "Bitcoin is up today", "Bitcoin was up last month"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [0.1, 1.0]],
+        metadatas=[metadata(100), metadata(0, 3), metadata(20, 3)]
+    )
+
+    assert store.permanent.get()["ids"] == ["timeless"]
+    assert store.count() == 3
+    assert store.count(time_dependency_info=TIMELESS) == 1
+    recent = {"is_time_dependent": True, "dependency_duration_days": 3}
+    result = store.query(query_embeddings=[[0.0, 1.0]], n_results=5, time_dependency_info=recent)
+    assert result["ids"] == [["fresh"]]
+    result = store.query(query_embeddings=[[0.0, 1.0]], n_results=5)
+    assert result["ids"][0] == ["fresh", "stale", "timeless"]
+    assert result["distances"][0] == sorted(result["distances"][0])
+
+    # Feedback updates find the claim in its partition; paging covers every partition
+    store.update(ids=["stale"], metadatas=[dict(metadata(20, 3), feedback_accurate=1)])
+    assert store.get(ids=["stale"])["metadatas"][0]["feedback_accurate"] == 1
+    assert sorted(store.get(limit=2, offset=0)["ids"] + store.get(limit=2, offset=2)["ids"]) == ["fresh", "stale", "timeless"]
+
+    # A re-analyzed claim that became timeless moves to the permanent collection
+    store.upsert(ids=["fresh"], documents=["Bitcoin is up today"], embeddings=[[0.0, 1.0]], metadatas=[metadata(0)])
+    assert sorted(store.permanent.get()["ids"]) == ["fresh", "timeless"]
+    assert store.count() == 3
+
+
+def test_lookups_make_one_store_call_per_partition_in_the_window(tmp_path, monkeypatch):
+    store = PartitionedClaims(chromadb.PersistentClient(path=str(tmp_path)), bucket_days=1, max_age_days=30)
+    store.upsert(ids=[f"claim-{days}" for days in range(6)], documents=[f"claim {days}" for days in range(6)],
+                 embeddings=[[1.0, float(days)] for days in range(6)], metadatas=[metadata(days * 5, 3) for days in range(6)])
+
+    calls = []
+    for method in ("count", "query"):
+        original = getattr(Collection, method)
+        monkeypatch.setattr(Collection, method, lambda collection, *args, _original=original, _method=method, **kwargs:
+                            calls.append((_method, collection.name)) or _original(collection, *args, **kwargs))
+
+    recent = {"is_time_dependent": True, "dependency_duration_days": 3}
+    result = store.query(query_embeddings=[[1.0, 0.0]], n_results=5, time_dependency_info=recent)
+    # Only today's bucket is inside the window; it holds fewer claims than n_results
+    assert result["ids"] == [["claim-0"]]
+    assert calls == [("query", bucket_name(datetime.utcnow().date(), bucket_days=1))]
+
+
+def test_upsert_deletes_only_from_the_previous_partition(tmp_path, monkeypatch):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    store = PartitionedClaims(client, bucket_days=1, max_age_days=30)
+    store.upsert(ids=["a", "b", "c"], documents=["a", "b", "c"], embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+                 metadatas=[metadata(1, 7), metadata(2, 7), metadata(3, 7)])
+
+    calls = []
+    for method in ("get", "delete"):
+        original = getattr(Collection, method)
+        monkeypatch.setattr(Collection, method, lambda collection, *args, _original=original, _method=method, **kwargs:
+                            calls.append((_method, collection.name)) or _original(collection, *args, **kwargs))
+
+    # A new claim and a re-analysis in the same partition touch no other partition
+    store.upsert(ids=["d", "a"], documents=["d", "a"], embeddings=[[0.5, 0.5], [1.0, 0.0]], metadatas=[metadata(0), metadata(1, 7)])
+    assert calls == []
+
+    # A claim that became timeless is deleted from its old bucket only, without searching the buckets
+    store.upsert(ids=["b"], documents=["b"], embeddings=[[0.0, 1.0]], metadatas=[metadata(0)])
+    assert calls == [("delete", bucket_name(datetime.utcnow().date() - timedelta(days=2), bucket_days=1))]
+    assert sorted(store.permanent.get()["ids"]) == ["b", "d"] and store.count() == 4
+
+    # Another process (empty index) finds a timeless claim that became time-dependent in the permanent collection
+    calls.clear()
+    other = PartitionedClaims(client, bucket_days=1, max_age_days=30)
+    other.upsert(ids=["d"], documents=["d"], embeddings=[[0.5, 0.5]], metadatas=[metadata(0, 3)])
+    assert calls == [("get", "claims_history"), ("delete", "claims_history")]
+    assert sorted(other.permanent.get()["ids"]) == ["b"] and other.count() == 4
+
+
+def test_expired_buckets_are_dropped_wholesale(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    store = PartitionedClaims(client, bucket_days=7, max_age_days=30)
+    store.upsert(ids=["old", "new"], documents=["old", "new"], embeddings=[[1.0, 0.0], [0.0, 1.0]],
+                 metadatas=[metadata(60, 7), metadata(1, 7)])
+
+    dropped = store.drop_expired()
+    assert dropped == [bucket_name(datetime.utcnow().date() - timedelta(days=60))]
+    assert store.get()["ids"] == ["new"]
+    assert dropped[0] not in {collection.name for collection in client.list_collections()}
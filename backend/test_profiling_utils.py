@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test script for stage counters and the sampling profiler
+"""
+
+import asyncio
+import time
+
+from profiling_utils import SamplingProfiler, pipeline_stage, run_sync_sdk, stage_counters
+
+
+def test_sync_sdk_time_is_counted_against_the_current_stage():
+    async def pipeline():
+        with pipeline_stage("test_search"):
+            return await run_sync_sdk(time.sleep, 0.02)
+
+    asyncio.run(pipeline())
+    counters = stage_counters.stats()["test_search"]
+    assert counters["calls"] == 1
+    assert counters["sync_sdk_calls"] == 1
+    assert counters["sync_sdk_seconds"] >= 0.015
+    assert counters["wall_seconds"] >= counters["sync_sdk_seconds"]
+
+
+def test_profiler_stops_after_requests_and_returns_collapsed_stacks():
+    profiler = SamplingProfiler(interval_ms=1)
+    profiler.start(requests=2)
+    time.sleep(0.05)
+    profiler.request_finished()
+    assert profiler.running
+    profiler.request_finished()
+    asyncio.run(profiler.wait(1.0))
+
+    lines = profiler.stop().strip().splitlines()
+    assert not profiler.running
+    assert lines
+    assert all(int(line.rsplit(" ", 1)[1]) >= 1 for line in lines)
+    assert any(line.startswith("MainThread;") and "test_profiler_stops_after_requests" in line for line in lines)
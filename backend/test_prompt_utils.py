@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test script for prompt templates and per-template Gemini models
+"""
+
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+import llm_utils
+from evidence_utils import estimate_tokens
+from prompt_utils import REFINEMENT_PROMPT, VERDICT_PROMPT, TemplateModels
+from provider_registry import LazyProvider
+
+SEARCH_RESULTS = [{"title": "Minister denies report", "snippet": "The ministry said no such law was passed.", "source": "example.gov"}]
+
+
+class StandInGenAI:
+    """
+    Local stand-in for the google.generativeai module: models answer through a
+    responder function and report usage metadata the way Gemini does, counting
+    cached content separately, so prompt templates can be tested without the API
+    """
+
+    def __init__(self, responder: Callable[[Optional[str], str], dict], cache_min_tokens: int = 0):
+        """
+        Args:
+            responder (Callable): (system_instruction, contents) -> response object to return as JSON
+            cache_min_tokens (int): Smallest system instruction (in tokens) the stand-in agrees to cache
+        """
+        self.responder = responder
+        self.cache_min_tokens = cache_min_tokens
+        self.created_models = []
+        self.cached_contents = []
+        stand_in = self
+
+        class GenerativeModel:
+            def __init__(self, model_name: str, system_instruction: Optional[str] = None, cached_content=None):
+                self.model_name = model_name
+                self.system_instruction = system_instruction if cached_content is None else cached_content.system_instruction
+                self.cached_content = cached_content
+                stand_in.created_models.append(self)
+
+            @classmethod
+            def from_cached_content(cls, cached_content):
+                return cls(cached_content.model, cached_content=cached_content)
+
+            def generate_content(self, contents, generation_config=None, request_options=None, stream=False):
+                text = json.dumps(stand_in.responder(self.system_instruction, contents))
+                instruction_tokens = estimate_tokens(self.system_instruction or "")
+                usage_metadata = SimpleNamespace(
+                    prompt_token_count=instruction_tokens + estimate_tokens(contents),
+                    cached_content_token_count=instruction_tokens if self.cached_content is not None else 0,
+                    candidates_token_count=estimate_tokens(text)
+                )
+                if not stream:
+                    return SimpleNamespace(text=text, usage_metadata=usage_metadata)
+                chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+                return iter(SimpleNamespace(text=chunk, usage_metadata=usage_metadata if i == len(chunks) - 1 else None)
+                            for i, chunk in enumerate(chunks))
+
+        class CachedContent:
+            @staticmethod
+            def create(model: str, system_instruction: str, display_name: str = None, ttl=None):
+                if estimate_tokens(system_instruction) < stand_in.cache_min_tokens:
+                    raise ValueError(f"Cached content is too small, minimum is {stand_in.cache_min_tokens} tokens")
+                cached_content = SimpleNamespace(model=model, system_instruction=system_instruction, display_name=display_name, ttl=ttl)
+                stand_in.cached_contents.append(cached_content)
+                return cached_content
+
+        self.GenerativeModel = GenerativeModel
+        self.caching = SimpleNamespace(CachedContent=CachedContent)
+
+    def configure(self, api_key: str = None):
+        pass
+
+
+def respond(system_instruction, contents):
+    assert "INSTRUCTIONS" not in contents or system_instruction is None
+    if "ORIGINAL CLAIM" in contents:
+        return {"refined_claim": "Is it true that a law was passed?"}
+    return {"verdict": "Likely False", "explanation": "The ministry denied it."}
+
+
+def run_claims(monkeypatch, stand_in, models):
+    monkeypatch.setattr(llm_utils, "api_key", "test-key")
+    monkeypatch.setattr(llm_utils, "gemini_provider", LazyProvider("gemini", lambda: stand_in))
+    monkeypatch.setattr(llm_utils, "template_models", models)
+
+    async def analyze():
+        for claim in ("A law was passed", "A second law was passed"):
+            assert await llm_utils.refine_claim_text(claim) == "Is it true that a law was passed?"
+            verdict = await llm_utils.get_llm_verdict(claim, SEARCH_RESULTS)
+            assert verdict["verdict"] == "Likely False"
+
+    asyncio.run(analyze())
+    return models.stats()
+
+
+def test_templates_send_instructions_once_per_model(monkeypatch):
+    stand_in = StandInGenAI(respond)
+    stats = run_claims(monkeypatch, stand_in, TemplateModels("gemini-1.5-flash"))
+    assert [model.system_instruction for model in stand_in.created_models] == [REFINEMENT_PROMPT.system_instruction, VERDICT_PROMPT.system_instruction]
+    assert stats["verdict"]["mode"] == "system_instruction" and stats["verdict"]["calls"] == 2
+
+    inline_stand_in = StandInGenAI(respond)
+    inline_stats = run_claims(monkeypatch, inline_stand_in, TemplateModels("gemini-1.5-flash", use_templates=False))
+    assert inline_stats["refinement"]["mode"] == "inline"
+    # Billed prompt tokens are the same without a cache, but the per-request payload shrinks several times
+    for stage in ("refinement", "verdict"):
+        assert abs(stats[stage]["mean_prompt_tokens"] - inline_stats[stage]["mean_prompt_tokens"]) <= 2
+        assert stats[stage]["mean_payload_tokens_estimate"] * 3 < inline_stats[stage]["mean_payload_tokens_estimate"]
+
+
+def test_context_cache_and_fallback(monkeypatch):
+    stand_in = StandInGenAI(respond)
+    stats = run_claims(monkeypatch, stand_in, TemplateModels("gemini-1.5-flash-002", context_cache=True, cache_min_tokens=0))
+    assert len(stand_in.cached_contents) == 2
+    assert stand_in.cached_contents[0].model == "models/gemini-1.5-flash-002"
+    assert stats["verdict"]["mode"] == "context_cache"
+    assert stats["verdict"]["mean_cached_tokens"] > stats["verdict"]["mean_uncached_prompt_tokens"]
+
+    # A provider refusing to cache falls back to a system instruction
+    refusing_stand_in = StandInGenAI(respond, cache_min_tokens=32768)
+    stats = run_claims(monkeypatch, refusing_stand_in, TemplateModels("gemini-1.5-flash-002", context_cache=True, cache_min_tokens=0))
+    assert refusing_stand_in.cached_contents == []
+    assert stats["verdict"]["mode"] == "system_instruction" and stats["verdict"]["mean_cached_tokens"] == 0
+
+
+def test_context_cache_is_not_attempted_when_it_cannot_succeed(monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger="prompt_utils")
+
+    # Unversioned models cannot use cached content
+    stand_in = StandInGenAI(respond)
+    stats = run_claims(monkeypatch, stand_in, TemplateModels("gemini-1.5-flash", context_cache=True, cache_min_tokens=0))
+    assert stand_in.cached_contents == [] and stats["verdict"]["mode"] == "system_instruction"
+    assert "versioned models" in caplog.text
+
+    # The templates are far below the default minimum cache size: no cache call is made, and the reason is logged once per template
+    caplog.clear()
+    stand_in = StandInGenAI(respond)
+    stats = run_claims(monkeypatch, stand_in, TemplateModels("gemini-1.5-flash-002", context_cache=True))
+    assert stand_in.cached_contents == [] and stats["verdict"]["mode"] == "system_instruction"
+    assert caplog.text.count("below the 32768-token caching minimum") == 2
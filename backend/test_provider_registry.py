@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test script for lazily-loaded providers
+"""
+
+import asyncio
+
+from provider_registry import LazyProvider
+
+
+def test_factory_runs_once_and_only_when_enabled():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    disabled = LazyProvider("disabled", factory, enabled=False, disabled_reason="no key")
+    assert disabled.get() is None and not disabled.available
+    assert calls == []
+
+    provider = LazyProvider("enabled", factory)
+    assert not provider.stats()["loaded"]
+    client = asyncio.run(provider.get_async())
+    assert provider.get() is client
+    assert calls == [1]
+    assert provider.stats()["loaded"]
+
+
+def test_failed_import_disables_provider():
+    def factory():
+        import module_that_does_not_exist  # noqa: F401
+
+    provider = LazyProvider("missing", factory)
+    assert provider.available
+    assert provider.get() is None
+    assert not provider.available
+    assert provider.stats()["failed"]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for per-client quotas and fair scheduling of full analyses
+"""
+
+import asyncio
+
+import pytest
+
+from quota_utils import ANONYMOUS_CLIENT, ClientQuotas, FairScheduler, QuotaExceeded, parse_api_keys
+
+
+def test_clients_are_identified_and_charged_per_bucket():
+    quotas = ClientQuotas(api_keys=parse_api_keys("k1:partner-a, k2:partner-b"), requests_per_minute=0, request_burst=3,
+                          analyses_per_minute=0, analysis_burst=1)
+    assert quotas.identify("k1") == "partner-a"
+    assert quotas.identify(None) == ANONYMOUS_CLIENT
+    with pytest.raises(PermissionError):
+        quotas.identify("unknown")
+
+    quotas.charge("partner-a", "request")
+    quotas.charge("partner-a", "analysis")
+    with pytest.raises(QuotaExceeded) as exceeded:
+        quotas.charge("partner-a", "analysis")
+    assert exceeded.value.kind == "analysis"
+    # Cache hits still go through, and other clients are unaffected
+    quotas.charge("partner-a", "request")
+    quotas.charge("partner-b", "analysis")
+
+    stats = quotas.stats()
+    assert stats["partner-a"]["requests"] == 2 and stats["partner-a"]["rejected_analyses"] == 1
+    assert stats["partner-b"]["analyses"] == 1
+
+    # A refunded analysis (no slot before the deadline) can be retried
+    quotas.refund("partner-b", "analysis")
+    quotas.charge("partner-b", "analysis")
+    assert quotas.stats()["partner-b"]["analyses"] == 1
+
+
+def test_anonymous_callers_get_their_own_quota_per_address():
+    quotas = ClientQuotas(analyses_per_minute=0, analysis_burst=1, anonymous_clients_max=2)
+    first, second = quotas.identify(None, "203.0.113.1"), quotas.identify(None, "203.0.113.2")
+    assert first != second
+
+    quotas.charge(first, "analysis")
+    with pytest.raises(QuotaExceeded):
+        quotas.charge(first, "analysis")
+    # Another visitor is not locked out by the first one
+    quotas.charge(second, "analysis")
+
+    # Addresses are kept in a bounded table and reported only as a total
+    quotas.charge(quotas.identify(None, "203.0.113.3"), "request")
+    assert len(quotas.anonymous_clients) == 2 and first not in quotas.anonymous_clients
+    assert quotas.stats()[ANONYMOUS_CLIENT] == {"addresses": 2, "requests": 1, "analyses": 1,
+                                                "rejected_requests": 0, "rejected_analyses": 0}
+
+
+def test_fair_scheduler_serves_waiting_clients_round_robin():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1)
+        served = []
+
+        async def analysis(client):
+            async with scheduler.slot(client):
+                served.append(client)
+                await asyncio.sleep(0)
+
+        await scheduler.acquire("holder")
+        tasks = [asyncio.create_task(analysis(client)) for client in ["flood"] * 3 + ["partner"]]
+        cancelled = asyncio.create_task(analysis("gone"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return served, scheduler.stats()
+
+    served, stats = asyncio.run(scenario())
+    assert served == ["flood", "partner", "flood", "flood"]
+    assert stats == {"max_concurrent": 1, "active": 0, "queued": {}}
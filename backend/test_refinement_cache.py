@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test script for the semantic refinement cache
+"""
+
+from refinement_cache import RefinementCache
+
+
+def test_lookup_reuses_refinement_of_similar_claims():
+    cache = RefinementCache(similarity_threshold=0.9, max_entries=10, ttl_seconds=60)
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+
+    cache.store("a", [1.0, 0.0, 0.0], "Is it true that A?")
+    assert cache.lookup([0.98, 0.1, 0.0]) == "Is it true that A?"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup(None) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.25
+
+
+def test_lru_eviction_and_ttl_expiry():
+    cache = RefinementCache(similarity_threshold=0.9, max_entries=2, ttl_seconds=60)
+    cache.store("a", [1.0, 0.0, 0.0], "A?")
+    cache.store("b", [0.0, 1.0, 0.0], "B?")
+    assert cache.lookup([1.0, 0.0, 0.0]) == "A?"  # "a" becomes most recently used
+    cache.store("c", [0.0, 0.0, 1.0], "C?")
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.ttl_seconds = -1
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+    assert cache.stats()["expirations"] == 2
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Test script for trimmed /analyze_claim responses and ETag revalidation
+"""
+
+import orjson
+from starlette.requests import Request
+
+from response_utils import build_response, trim_response
+
+CACHED_RESPONSE = {
+    "received_claim": "The bridge closed on Monday",
+    "verdict": "Likely True",
+    "explanation": "Officials confirmed the closure.",
+    "source": "claim_history",
+    "timestamp": "2025-06-03T06:16:36.663705",
+    "source_links": [{"title": "Bridge closes", "url": "https://news.com/bridge", "source": "Tavily", "snippet": "word " * 80}],
+    "similarity_score": 0.93
+}
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "POST", "path": "/analyze_claim", "headers": headers})
+
+
+def test_trim_response_fields_and_compact_snippets():
+    trimmed = trim_response(CACHED_RESPONSE, fields="verdict,source_links,similarity_score", verbose=False)
+    assert set(trimmed) == {"verdict", "source_links"}
+    assert len(trimmed["source_links"][0]["snippet"].split()) == 50
+    assert trim_response(CACHED_RESPONSE) == CACHED_RESPONSE
+
+
+def test_cached_verdict_etag_and_304():
+    first = build_response(make_request(), CACHED_RESPONSE, cacheable=True)
+    assert first.status_code == 200
+    assert orjson.loads(first.body)["verdict"] == "Likely True"
+    etag = first.headers["etag"]
+
+    assert build_response(make_request(etag), CACHED_RESPONSE, cacheable=True).status_code == 304
+    assert build_response(make_request(f'W/{etag}, "other"'), CACHED_RESPONSE, cacheable=True).status_code == 304
+    assert build_response(make_request(etag), CACHED_RESPONSE, verbose=False, cacheable=True).status_code == 200
+    assert "etag" not in build_response(make_request(), CACHED_RESPONSE).headers
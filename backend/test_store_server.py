@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for the claim store service and its client
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from chromadb import EmbeddingFunction
+from chromadb.errors import NotFoundError
+from fastapi.testclient import TestClient
+
+import store_server
+from partition_utils import PartitionedClaims, bucket_name
+from store_client import RemoteEmbeddingFunction, StoreClient
+
+
+class KeywordEmbeddingFunction(EmbeddingFunction):
+    """Fake embedding function: one dimension per keyword"""
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [[float("bitcoin" in text.lower()), float("earth" in text.lower()), 1.0] for text in input]
+
+
+def metadata(days_ago: int, duration_days: int = 0) -> dict:
+    return {
+        "verdict": "Likely True",
+        "timestamp": (datetime.utcnow() - timedelta(days=days_ago)).isoformat(),
+        "is_time_dependent": duration_days > 0,
+        "dependency_duration_days": duration_days
+    }
+
+
+@pytest.fixture
+def store_client(tmp_path):
+    store_server.open_store(str(tmp_path), KeywordEmbeddingFunction())
+    client = StoreClient(http_client=TestClient(store_server.app, base_url="http://claim-store"))
+    yield client
+    client.close()
+
+
+def test_partitioned_claims_through_the_store_service(store_client):
+    store = PartitionedClaims(store_client, RemoteEmbeddingFunction(store_client), bucket_days=1, max_age_days=30)
+    store.upsert(
+        ids=["earth", "bitcoin"],
+        documents=["The Earth orbits the Sun", "Bitcoin is up today"],
+        metadatas=[metadata(0), metadata(0, 3)]
+    )
+
+    assert store_client.heartbeat()
+    assert store.count() == 2
+    recent = {"is_time_dependent": True, "dependency_duration_days": 3}
+    result = store.query(query_texts=["Is Bitcoin up?"], n_results=2, time_dependency_info=recent)
+    assert result["ids"] == [["bitcoin"]]
+    assert store.get(ids=["earth"])["documents"] == ["The Earth orbits the Sun"]
+
+
+def test_reads_do_not_recreate_dropped_buckets(store_client):
+    store = PartitionedClaims(store_client, RemoteEmbeddingFunction(store_client), bucket_days=1, max_age_days=30)
+    store.upsert(ids=["bitcoin"], documents=["Bitcoin is up today"], metadatas=[metadata(0, 3)])
+    bucket = bucket_name(datetime.utcnow().date(), bucket_days=1)
+
+    # Another worker drops the bucket while this worker still lists it
+    store_client.delete_collection(bucket)
+    with pytest.raises(NotFoundError):
+        store_client.get_collection(bucket)
+
+    assert store.count() == 0
+    assert store.get(ids=["bitcoin"])["ids"] == []
+    assert bucket not in store_client.list_collections()
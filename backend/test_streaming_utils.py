@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed verdict parsing
+"""
+
+import asyncio
+import json
+
+import llm_utils
+from streaming_utils import VerdictStreamParser, encode_event
+
+RESPONSE = json.dumps({"verdict": "Likely False", "explanation": "Officials said \"no\" — see the report \U0001F4F0.\nNo evidence."})
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        self.calls.append(stream)
+        return iter(FakeChunk(chunk) for chunk in self.chunks)
+
+
+def split_every(text: str, size: int) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_parser_emits_verdict_early_and_explanation_incrementally():
+    # Chunks of 3 characters split escapes and the surrogate pair of the emoji
+    parser = VerdictStreamParser()
+    events = [event for chunk in split_every(RESPONSE, 3) for event in parser.feed(chunk)]
+
+    assert events[0] == {"type": "verdict", "verdict": "Likely False"}
+    deltas = [event["delta"] for event in events[1:]]
+    assert all(event["type"] == "explanation" for event in events[1:]) and len(deltas) > 10
+    assert "".join(deltas) == json.loads(RESPONSE)["explanation"]
+    assert parser.result() == json.loads(RESPONSE)
+    assert encode_event(events[0]) == b'{"type":"verdict","verdict":"Likely False"}\n'
+
+
+def test_stream_llm_verdict_streams_sdk_chunks(monkeypatch):
+    model = FakeStreamingModel(split_every(RESPONSE, 16))
+
+    async def get_model(template):
+        return model
+
+    monkeypatch.setattr(llm_utils, "api_key", "test-key")
+    monkeypatch.setattr(llm_utils, "get_gemini_model", get_model)
+
+    async def collect():
+        return [event async for event in llm_utils.stream_llm_verdict("claim", [{"title": "t", "snippet": "s"}])]
+
+    events = asyncio.run(collect())
+    assert model.calls == [True]
+    assert events[0]["type"] == "verdict"
+    assert events[-1] == dict(json.loads(RESPONSE), type="done")
+    assert "".join(event["delta"] for event in events if event["type"] == "explanation") == json.loads(RESPONSE)["explanation"]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for traffic capture and provider response replay
+"""
+
+import asyncio
+
+import traffic_utils
+from deadline_utils import Deadline
+from traffic_utils import ProviderTape, TrafficRecorder, anonymize_text, provider_call_key, read_traffic, recorded_provider
+
+
+def test_anonymize_text_and_keys_ignore_deadlines():
+    assert anonymize_text("Ask jane.doe@example.com or @janedoe on +1 (555) 123-4567") == "Ask <email> or <handle> on <phone>"
+    assert anonymize_text("Bitcoin hit $50,000 in 2024") == "Bitcoin hit $50,000 in 2024"
+    assert provider_call_key("search_web", ("query",), {"deadline": Deadline(5)}) == provider_call_key("search_web", ("query",), {})
+    assert provider_call_key("search_web", ("query",), {}) != provider_call_key("search_web", ("other query",), {})
+
+
+def test_recorder_keeps_only_anonymized_request_fields(tmp_path):
+    path = str(tmp_path / "traffic.jsonl.gz")
+    recorder = TrafficRecorder(path)
+    recorder.record_request(
+        "/analyze_claim",
+        b'{"claim_text": "Mail me at a@b.com", "api_key": "secret"}',
+        {"verbose": "false", "token": "secret"},
+        {"x-request-deadline-ms": "5000", "x-api-key": "secret"},
+        200, 1000.0, 0.25
+    )
+    recorder.close()
+
+    events = list(read_traffic(path))
+    assert events == [{
+        "kind": "request", "ts": 1000.0, "path": "/analyze_claim", "body": {"claim_text": "Mail me at <email>"},
+        "status": 200, "latency_ms": 250.0, "params": {"verbose": "false"}, "deadline_ms": "5000"
+    }]
+    assert "secret" not in str(events)
+
+
+def test_recorded_provider_captures_then_replays(monkeypatch, tmp_path):
+    calls = []
+
+    @recorded_provider("search_web")
+    async def search(query, max_results=3, deadline=None):
+        calls.append(query)
+        return [{"title": query, "url": "https://example.com"}]
+
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path)
+    monkeypatch.setattr(traffic_utils, "traffic_recorder", recorder)
+    asyncio.run(search("first query", deadline=Deadline(5)))
+    asyncio.run(search("second query"))
+    recorder.close()
+
+    tape = ProviderTape(speed=1000)
+    for event in read_traffic(path):
+        tape.add(event)
+    monkeypatch.setattr(traffic_utils, "traffic_recorder", None)
+    monkeypatch.setattr(traffic_utils, "provider_tape", tape)
+    assert asyncio.run(search("second query")) == [{"title": "second query", "url": "https://example.com"}]
+    assert asyncio.run(search("never recorded"))[0]["title"] in ("first query", "second query")
+    assert calls == ["first query", "second query"]
+    assert tape.stats()["hits"] == 1 and tape.stats()["fallbacks"] == 1
+
+
+def test_recorded_results_are_anonymized(monkeypatch, tmp_path):
+    @recorded_provider("gemini.refine_claim")
+    async def refine(claim_text, deadline=None):
+        return f"Is it true that {claim_text}?"
+
+    @recorded_provider("gemini.decompose_claim")
+    async def decompose(claim_text, deadline=None):
+        return [claim_text, {"claim": claim_text, "sources": [claim_text]}]
+
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path)
+    monkeypatch.setattr(traffic_utils, "traffic_recorder", recorder)
+    claim = "john.doe@example.com said +1 555 123 4567 is the number of @newsdesk"
+    refined = asyncio.run(refine(claim))
+    asyncio.run(decompose(claim))
+    recorder.close()
+
+    # The caller still gets the real result; only the capture is anonymized
+    assert refined == f"Is it true that {claim}?"
+    with open(path, encoding="utf-8") as f:
+        capture = f.read()
+    for pii in ("john.doe@example.com", "555 123 4567", "@newsdesk"):
+        assert pii not in capture
+    events = list(read_traffic(path))
+    assert events[0]["result"] == "Is it true that <email> said <phone> is the number of <handle>?"
+    assert events[1]["result"][1]["sources"] == ["<email> said <phone> is the number of <handle>"]
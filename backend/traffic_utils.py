@@ -0,0 +1,265 @@
+"""
+Traffic capture utilities for the Fake News Detector
+Contains the opt-in recorder for anonymized /analyze_claim and /submit_feedback
+traffic and provider responses, and the provider tape that serves recorded
+responses instead of Gemini and the search APIs when replaying a capture
+(see replay_traffic.py)
+"""
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, Optional
+
+from deadline_utils import Deadline
+
+logger = logging.getLogger(__name__)
+
+# Traffic capture configuration
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH")  # e.g. ./traffic.jsonl.gz; capture is off when unset
+TRAFFIC_REPLAY_PATH = os.getenv("TRAFFIC_REPLAY_PATH")  # Serve provider calls from this capture instead of the live APIs
+TRAFFIC_REPLAY_SPEED = float(os.getenv("TRAFFIC_REPLAY_SPEED", "1"))  # Recorded provider latencies are divided by this
+
+CAPTURED_PATHS = ("/analyze_claim", "/analyze_claim/stream", "/submit_feedback")
+CAPTURED_BODY_FIELDS = ("claim_text", "feedback_type", "decompose")
+CAPTURED_QUERY_PARAMS = ("fields", "verbose")
+DEADLINE_HEADER = "x-request-deadline-ms"
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+HANDLE_PATTERN = re.compile(r"(?<![\w@])@\w{2,}")
+PHONE_PATTERN = re.compile(r"\+\d[\d\s().-]{7,}\d")
+
+
+def anonymize_text(text: str) -> str:
+    """
+    Replace e-mail addresses, @handles and international phone numbers in user text
+    """
+    text = EMAIL_PATTERN.sub("<email>", text)
+    text = HANDLE_PATTERN.sub("<handle>", text)
+    return PHONE_PATTERN.sub("<phone>", text)
+
+
+def anonymize_value(value: Any) -> Any:
+    """
+    Anonymize every string inside a provider result (nested dicts and lists included)
+    """
+    if isinstance(value, str):
+        return anonymize_text(value)
+    if isinstance(value, dict):
+        return {key: anonymize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [anonymize_value(item) for item in value]
+    return value
+
+
+def provider_call_key(provider: str, args: tuple, kwargs: dict) -> str:
+    """
+    Key a provider call by its (anonymized) arguments, ignoring deadlines
+    """
+    args = [arg for arg in args if not isinstance(arg, Deadline)]
+    kwargs = {key: value for key, value in kwargs.items() if not isinstance(value, Deadline)}
+    payload = anonymize_text(json.dumps([provider, args, kwargs], sort_keys=True, default=str))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def read_traffic(path: str) -> Iterator[dict]:
+    """
+    Stream events from a capture file (gzip-compressed when the name ends in .gz)
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class TrafficRecorder:
+    """
+    Appends capture events as JSON lines from a background thread, so request
+    handling never waits on disk. Each batch is flushed to a gzip sync point, so
+    the file stays readable after a crash.
+    """
+
+    def __init__(self, path: str, max_pending: int = 10000):
+        self.path = path
+        self.events_written = 0
+        self.events_dropped = 0
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+        self._thread.start()
+        logger.info("Capturing traffic to %s", path)
+
+    def record(self, event: dict):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.events_dropped += 1
+
+    def record_request(self, path: str, body: bytes, query_params, headers, status_code: int, started_at: float, latency_seconds: float):
+        """
+        Record one captured API request without client identity (no IP, cookies or other headers)
+        """
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
+        payload = {key: payload[key] for key in CAPTURED_BODY_FIELDS if key in payload}
+        if isinstance(payload.get("claim_text"), str):
+            payload["claim_text"] = anonymize_text(payload["claim_text"])
+
+        event = {
+            "kind": "request",
+            "ts": round(started_at, 3),
+            "path": path,
+            "body": payload,
+            "status": status_code,
+            "latency_ms": round(latency_seconds * 1000.0, 1)
+        }
+        params = {key: query_params[key] for key in CAPTURED_QUERY_PARAMS if key in query_params}
+        if params:
+            event["params"] = params
+        if headers.get(DEADLINE_HEADER):
+            event["deadline_ms"] = headers.get(DEADLINE_HEADER)
+        self.record(event)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "events_written": self.events_written, "events_dropped": self.events_dropped}
+
+    def _run(self):
+        with gzip.open(self.path, "at", encoding="utf-8") if self.path.endswith(".gz") else open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                event = self._queue.get()
+                if event is None:
+                    return
+                batch = [event]
+                while not self._queue.empty():
+                    event = self._queue.get_nowait()
+                    if event is None:
+                        self._write(f, batch)
+                        return
+                    batch.append(event)
+                self._write(f, batch)
+
+    def _write(self, f, batch):
+        try:
+            f.write("".join(json.dumps(event, separators=(",", ":"), default=str) + "\n" for event in batch))
+            f.flush()
+            self.events_written += len(batch)
+        except Exception as e:
+            self.events_dropped += len(batch)
+            logger.error("Error writing traffic capture: %s", e)
+
+
+class ProviderTape:
+    """
+    Recorded provider responses keyed by call arguments. A call recorded several
+    times replays its recordings in order; a call that was never recorded gets a
+    deterministic pick among the provider's recordings (counted as a fallback).
+    """
+
+    def __init__(self, speed: float = TRAFFIC_REPLAY_SPEED):
+        self.speed = max(speed, 1e-6)
+        self.recordings = defaultdict(list)
+        self.by_provider = defaultdict(list)
+        self._positions = defaultdict(int)
+        self.hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str, speed: float = TRAFFIC_REPLAY_SPEED) -> "ProviderTape":
+        tape = cls(speed)
+        for event in read_traffic(path):
+            if event.get("kind") == "provider":
+                tape.add(event)
+        logger.info("Loaded %s recorded provider responses from %s", sum(len(events) for events in tape.by_provider.values()), path)
+        return tape
+
+    def add(self, event: dict):
+        self.recordings[(event["provider"], event["key"])].append(event)
+        self.by_provider[event["provider"]].append(event)
+
+    def lookup(self, provider: str, key: str) -> Optional[dict]:
+        recordings = self.recordings.get((provider, key))
+        if recordings:
+            position = self._positions[(provider, key)]
+            self._positions[(provider, key)] += 1
+            self.hits += 1
+            return recordings[position % len(recordings)]
+        candidates = self.by_provider.get(provider)
+        if candidates:
+            self.fallbacks += 1
+            return candidates[int(key, 16) % len(candidates)]
+        self.misses += 1
+        return None
+
+    async def replay(self, provider: str, key: str) -> Any:
+        """
+        Return the recorded response after the recorded latency (scaled by the replay speed)
+
+        Raises:
+            LookupError: If nothing was recorded for the provider
+        """
+        event = self.lookup(provider, key)
+        if event is None:
+            raise LookupError(f"No recorded responses for provider '{provider}'")
+        await asyncio.sleep(event.get("latency_ms", 0.0) / 1000.0 / self.speed)
+        return event["result"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"speed": self.speed, "hits": self.hits, "fallbacks": self.fallbacks, "misses": self.misses}
+
+
+def _capture_path(path: Optional[str]) -> Optional[str]:
+    # One capture file per worker process so workers never interleave writes
+    if path and int(os.getenv("API_WORKERS", "1")) > 1:
+        return f"{path}.{os.getpid()}"
+    return path
+
+
+traffic_recorder = TrafficRecorder(_capture_path(TRAFFIC_CAPTURE_PATH)) if TRAFFIC_CAPTURE_PATH and not TRAFFIC_REPLAY_PATH else None
+provider_tape = ProviderTape.load(TRAFFIC_REPLAY_PATH) if TRAFFIC_REPLAY_PATH else None
+
+
+def recorded_provider(provider: str):
+    """
+    Decorate an async provider call (an LLM or web search step) so its responses are
+    recorded while capturing traffic and served from the tape while replaying
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if provider_tape is None and traffic_recorder is None:
+                return await func(*args, **kwargs)
+            key = provider_call_key(provider, args, kwargs)
+            if provider_tape is not None:
+                return await provider_tape.replay(provider, key)
+
+            start = time.perf_counter()
+            result = await func(*args, **kwargs)
+            traffic_recorder.record({
+                "kind": "provider",
+                "provider": provider,
+                "key": key,
+                "latency_ms": round((time.perf_counter() - start) * 1000.0, 1),
+                # Results such as refined claims repeat the user's text
+                "result": anonymize_value(result)
+            })
+            return result
+        return wrapper
+    return decorator
@@ -33,6 +33,20 @@ const feedbackMessage = document.getElementById("feedbackMessage");
 // API configuration
 const API_BASE_URL = "http://127.0.0.1:8000";
 
+// Only request the fields displayResults renders, with snippets already shortened
+const ANALYZE_RESPONSE_PARAMS = new URLSearchParams({
+  fields: "verdict,explanation,source,source_links,search_results",
+  verbose: "false",
+});
+
+// Client-side result cache, debouncing and cancellation
+const RESULT_CACHE_MAX_ENTRIES = 50;
+const RESULT_CACHE_TTL_MS = 10 * 60 * 1000;
+const SUBMIT_DEBOUNCE_MS = 300;
+const resultCache = new Map(); // normalized claim -> { data, storedAt }, oldest first
+let submitDebounceTimer = null;
+let currentAnalysisController = null;
+
 // Global variable to store current claim for feedback
 let currentClaimForFeedback = "";
 
@@ -41,7 +55,7 @@ let currentClaimForFeedback = "";
  */
 document.addEventListener("DOMContentLoaded", function () {
   // Add event listeners
-  analyzeBtn.addEventListener("click", handleAnalyzeClaim);
+  analyzeBtn.addEventListener("click", scheduleAnalyzeClaim);
 
   // Add feedback event listeners
   accurateBtn.addEventListener("click", () => handleFeedback("accurate"));
@@ -50,13 +64,136 @@ document.addEventListener("DOMContentLoaded", function () {
   // Allow Enter key to trigger analysis
   claimInput.addEventListener("keypress", function (e) {
     if (e.key === "Enter" && e.ctrlKey) {
-      handleAnalyzeClaim();
+      scheduleAnalyzeClaim();
     }
   });
 
   console.log("Fake News Detector frontend initialized");
 });
 
+// Claim normalization, mirroring backend/normalization_utils.py
+const CLAIM_NUMBER = "[0-9]+(?:\\.[0-9]+)?";
+const CLAIM_STRIPPED_PATTERN = /[\p{So}\p{Cf}\p{Cs}\p{Co}\uFE00-\uFE0F]/gu;
+const CLAIM_QUOTE_PATTERN = /["'`\u2018\u2019\u201A\u201B\u201C\u201D\u201E\u201F\u00AB\u00BB\u2039\u203A]/g;
+const MAGNITUDE_PATTERN = new RegExp(
+  `(${CLAIM_NUMBER})\\s*(k|thousand|million|mn|bn|billion|trillion)(?![a-z0-9])`,
+  "g"
+);
+const MAGNITUDE_ZEROS = { k: 3, thousand: 3, million: 6, mn: 6, bn: 9, billion: 9, trillion: 12 };
+const CURRENCY_SYMBOL = "(us\\$|\\$|€|£|¥|₹)";
+const CURRENCY_BEFORE_NUMBER_PATTERN = new RegExp(`${CURRENCY_SYMBOL}\\s*(${CLAIM_NUMBER})`, "g");
+const CURRENCY_AFTER_NUMBER_PATTERN = new RegExp(`(${CLAIM_NUMBER})\\s*${CURRENCY_SYMBOL}`, "g");
+const CURRENCY_SYMBOLS = { "us$": "usd", $: "usd", "€": "eur", "£": "gbp", "¥": "jpy", "₹": "inr" };
+const CURRENCY_WORD_PATTERN =
+  /(?<![a-z0-9])(us dollars|us dollar|dollars|dollar|euros|euro|rupees|rupee|yen)(?![a-z0-9])/g;
+// Signs and comparators change a claim's meaning ("-2%" vs "2%", "> 5%" vs "< 5%")
+const COMPARATOR_PATTERN = /(>=|<=|!=|≥|≤|≠|>|<)/g;
+const COMPARATOR_WORDS = {
+  ">=": "greater than or equal to",
+  "≥": "greater than or equal to",
+  "<=": "less than or equal to",
+  "≤": "less than or equal to",
+  "!=": "not equal to",
+  "≠": "not equal to",
+  ">": "greater than",
+  "<": "less than",
+};
+const SIGN_PATTERN = /(?<![\p{L}\p{N}_.])([-−+])(?=[0-9])/gu;
+const SIGN_WORDS = { "-": "minus", "−": "minus", "+": "plus" };
+const CURRENCY_WORDS = {
+  "us dollars": "usd",
+  "us dollar": "usd",
+  dollars: "usd",
+  dollar: "usd",
+  euros: "eur",
+  euro: "eur",
+  rupees: "inr",
+  rupee: "inr",
+  yen: "jpy",
+};
+
+/**
+ * Multiply a decimal number string by 10 ** zeros without floating point rounding
+ */
+function shiftDecimal(number, zeros) {
+  const [integerPart, fraction = ""] = number.split(".");
+  const padded = fraction.padEnd(zeros, "0");
+  const rest = padded.slice(zeros);
+  return integerPart + padded.slice(0, zeros) + (rest ? "." + rest : "");
+}
+
+/**
+ * Drop leading zeros and trailing fractional zeros ("050000.00" -> "50000")
+ */
+function canonicalNumber(number) {
+  const [integerPart, fraction = ""] = number.split(".");
+  const trimmedFraction = fraction.replace(/0+$/, "");
+  return (integerPart.replace(/^0+/, "") || "0") + (trimmedFraction ? "." + trimmedFraction : "");
+}
+
+/**
+ * Normalize claim text the same way as generate_claim_id in backend/db_utils.py
+ * (normalize_claim_text in backend/normalization_utils.py)
+ */
+function normalizeClaimText(text) {
+  if (!text) return "";
+  return text
+    .normalize("NFKC")
+    .replace(CLAIM_STRIPPED_PATTERN, "")
+    .replace(CLAIM_QUOTE_PATTERN, "")
+    .toLowerCase()
+    .replace(/([0-9]),(?=[0-9]{2,3}(?![0-9]))/g, "$1")
+    .replace(MAGNITUDE_PATTERN, (match, number, unit) => shiftDecimal(number, MAGNITUDE_ZEROS[unit]))
+    .replace(CURRENCY_BEFORE_NUMBER_PATTERN, (match, symbol, number) => `${number} ${CURRENCY_SYMBOLS[symbol]}`)
+    .replace(CURRENCY_AFTER_NUMBER_PATTERN, (match, number, symbol) => `${number} ${CURRENCY_SYMBOLS[symbol]}`)
+    .replace(CURRENCY_WORD_PATTERN, (match, word) => CURRENCY_WORDS[word])
+    .replace(/\s*(%|(?<![a-z0-9])per cent(?![a-z0-9]))/g, " percent")
+    .replace(new RegExp(CLAIM_NUMBER, "g"), (match) => canonicalNumber(match))
+    .replace(SIGN_PATTERN, (match, sign) => `${SIGN_WORDS[sign]} `)
+    .replace(COMPARATOR_PATTERN, (match, comparator) => ` ${COMPARATOR_WORDS[comparator]} `)
+    .replace(/(?<![0-9])\.|\.(?![0-9])/g, " ")
+    .replace(/[^\p{L}\p{M}\p{N}\s.]/gu, " ")
+    .replace(/\s+/g, " ")
+    .trim();
+}
+
+/**
+ * Get a cached verdict for a claim, if one is still fresh
+ */
+function getCachedResult(claimText) {
+  const key = normalizeClaimText(claimText);
+  const entry = resultCache.get(key);
+  if (!entry) return null;
+  if (Date.now() - entry.storedAt > RESULT_CACHE_TTL_MS) {
+    resultCache.delete(key);
+    return null;
+  }
+  // Re-insert to mark the entry as most recently used
+  resultCache.delete(key);
+  resultCache.set(key, entry);
+  return entry.data;
+}
+
+/**
+ * Cache a verdict, evicting the least recently used entries beyond the limit
+ */
+function setCachedResult(claimText, data) {
+  const key = normalizeClaimText(claimText);
+  resultCache.delete(key);
+  resultCache.set(key, { data, storedAt: Date.now() });
+  while (resultCache.size > RESULT_CACHE_MAX_ENTRIES) {
+    resultCache.delete(resultCache.keys().next().value);
+  }
+}
+
+/**
+ * Debounce analyze requests so repeated clicks or key presses start one analysis
+ */
+function scheduleAnalyzeClaim() {
+  clearTimeout(submitDebounceTimer);
+  submitDebounceTimer = setTimeout(handleAnalyzeClaim, SUBMIT_DEBOUNCE_MS);
+}
+
 /**
  * Handle the analyze claim button click
  */
@@ -73,6 +210,22 @@ async function handleAnalyzeClaim() {
   // Store claim text for feedback
   currentClaimForFeedback = claimText;
 
+  // Serve repeated claims from the local cache without a backend round trip
+  const cachedResult = getCachedResult(claimText);
+  if (cachedResult) {
+    console.log("Using cached analysis results:", cachedResult);
+    currentAnalysisController?.abort();
+    setLoadingState(false);
+    displayResults(cachedResult);
+    showFeedback();
+    return;
+  }
+
+  // Abort any analysis this one supersedes
+  currentAnalysisController?.abort();
+  const controller = new AbortController();
+  currentAnalysisController = controller;
+
   // Show loading state
   setLoadingState(true);
   hideResults();
@@ -81,8 +234,8 @@ async function handleAnalyzeClaim() {
   try {
     console.log("Analyzing claim:", claimText);
 
-    // Call the backend API
-    const response = await fetch(`${API_BASE_URL}/analyze_claim`, {
+    // Call the streaming backend API: the verdict and explanation are rendered as they arrive
+    const response = await fetch(`${API_BASE_URL}/analyze_claim/stream?${ANALYZE_RESPONSE_PARAMS}`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
@@ -90,15 +243,34 @@ async function handleAnalyzeClaim() {
       body: JSON.stringify({
         claim_text: claimText,
       }),
+      signal: controller.signal,
     });
 
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
 
-    const data = await response.json();
+    let data = null;
+    for await (const event of readAnalysisEvents(response)) {
+      if (event.type === "verdict") {
+        displayPartialVerdict(event.verdict);
+      } else if (event.type === "explanation") {
+        explanationText.textContent += event.delta;
+      } else if (event.type === "result") {
+        data = event.result;
+      } else if (event.type === "error") {
+        throw new Error(`Analysis error! status: ${event.status}`);
+      }
+    }
+    if (!data) {
+      throw new Error("Analysis stream ended without a result");
+    }
     console.log("Received analysis results:", data);
 
+    if (data.verdict && data.verdict !== "Error") {
+      setCachedResult(claimText, data);
+    }
+
     // Display the results
     displayResults(data);
     setLoadingState(false);
@@ -106,14 +278,59 @@ async function handleAnalyzeClaim() {
     // Show feedback section after successful analysis
     showFeedback();
   } catch (error) {
+    if (error.name === "AbortError") {
+      // Superseded by a newer analysis, which owns the loading state now
+      console.log("Analysis request aborted:", claimText);
+      return;
+    }
     console.error("Error analyzing claim:", error);
     showError(
       "An error occurred while analyzing the claim. Please check if the backend server is running and try again."
     );
     setLoadingState(false);
+  } finally {
+    if (currentAnalysisController === controller) {
+      currentAnalysisController = null;
+    }
   }
 }
 
+/**
+ * Read the NDJSON events of a streaming analysis response as they arrive
+ */
+async function* readAnalysisEvents(response) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (line.trim()) {
+        yield JSON.parse(line);
+      }
+    }
+    if (done) {
+      if (buffered.trim()) {
+        yield JSON.parse(buffered);
+      }
+      return;
+    }
+  }
+}
+
+/**
+ * Show a streamed verdict before its explanation and sources have arrived
+ */
+function displayPartialVerdict(verdict) {
+  verdictText.textContent = verdict || "Unknown";
+  verdictText.className = `verdict-text ${getVerdictClass(verdict)}`;
+  explanationText.textContent = "";
+  showResults();
+}
+
 /**
  * Handle feedback submission
  */
@@ -161,6 +378,11 @@ async function handleFeedback(feedbackType) {
       data.message || "Feedback submitted successfully!";
     feedbackMessage.className = "feedback-message feedback-success";
 
+    // A verdict marked inaccurate may be re-analyzed by the backend, so stop serving it locally
+    if (feedbackType === "inaccurate") {
+      resultCache.delete(normalizeClaimText(currentClaimForFeedback));
+    }
+
     // Keep buttons disabled after successful submission
     console.log(`Successfully submitted ${feedbackType} feedback`);
   } catch (error) {